@@ -0,0 +1,174 @@
+"""
+Microbenchmarks for building SDK objects from API payloads and serializing them.
+
+Usage:
+    python -m benchmarks.hydration [--repeat 5] [--number 100] [--case task] [--save] [--compare]
+
+For each case the report shows operations per second (best of --repeat runs),
+and, from a separate run under tracemalloc, the memory blocks and bytes each
+operation leaves allocated and the peak memory it needs. --save stores the
+results as a baseline (benchmarks/baselines/hydration.json by default) and
+--compare prints the change against a stored baseline, so runs can be
+diffed between releases.
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+
+from benchmarks import payloads
+from surge.projects import Project
+from surge.questions import Question
+from surge.tasks import Task
+from surge.teams import Team
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines",
+                                "hydration.json")
+
+
+def _fresh(payload):
+    # Hydration may modify the payload (Question.from_params drops option
+    # timestamps), so every call gets its own copy, made outside the timing
+    return lambda number: [copy.deepcopy(payload) for _ in range(number)]
+
+
+def _same(value):
+    return lambda number: [value] * number
+
+
+def _cases():
+    """Returns {name: (make_inputs, operation)}."""
+    task = payloads.tasks(1, num_responses=3)[0]
+    page = payloads.tasks(100, num_responses=3)
+    project = payloads.project(num_questions=10)
+    team = payloads.team(num_members=500)
+    project_object = Project(**copy.deepcopy(project))
+    question_object = project_object.questions[1]
+    question = project["questions"][1]
+    return {
+        "task": (_fresh(task), lambda t: Task(**t)),
+        "task_page_100":
+        (_fresh(page), lambda tasks: [Task(**t) for t in tasks]),
+        "project": (_fresh(project), lambda p: Project(**p)),
+        "question_from_params": (_fresh(question), Question.from_params),
+        "project_to_dict": (_same(project_object), Project.to_dict),
+        "project_to_json": (_same(project_object), Project.to_json),
+        "question_to_dict": (_same(question_object), Question.to_dict),
+        "team": (_fresh(team), lambda t: Team(**t)),
+    }
+
+
+def measure_speed(make_inputs, operation, repeat, number):
+    """Returns the best operations per second over repeat runs of number calls."""
+    best = None
+    for _ in range(repeat):
+        inputs = iter(make_inputs(number))
+        seconds = timeit.timeit(lambda: operation(next(inputs)), number=number)
+        best = seconds if best is None else min(best, seconds)
+    return number / best
+
+
+def measure_memory(make_inputs, operation, number):
+    """
+    Returns (blocks, bytes) left allocated per call, i.e. the size of the
+    objects built, and the peak bytes a single call needed.
+    """
+    inputs = make_inputs(number)
+    results = []
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        results.append(operation(inputs[0]))
+        _, peak = tracemalloc.get_traced_memory()
+        for value in inputs[1:]:
+            results.append(operation(value))
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    # The input copies and the results list are counted in the snapshots too
+    overhead = sys.getsizeof(results)
+    return blocks / number, (size - overhead) / number, peak - start_bytes
+
+
+def run(names, repeat, number):
+    cases = _cases()
+    results = {}
+    for name in names or cases:
+        make_inputs, operation = cases[name]
+        ops = measure_speed(make_inputs, operation, repeat, number)
+        blocks, retained, peak = measure_memory(make_inputs, operation,
+                                                min(number, 50))
+        results[name] = {
+            "ops_per_sec": ops,
+            "blocks_per_op": blocks,
+            "bytes_per_op": retained,
+            "peak_bytes": peak,
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=100)
+    parser.add_argument("--case", choices=sorted(_cases()), action="append")
+    parser.add_argument("--save",
+                        nargs="?",
+                        const=DEFAULT_BASELINE,
+                        help="Store the results as a baseline")
+    parser.add_argument("--compare",
+                        nargs="?",
+                        const=DEFAULT_BASELINE,
+                        help="Compare the results with a stored baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.case, args.repeat, args.number)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+
+    print(f"{'case':22} {'ops/s':>10} {'us/op':>9} {'blocks/op':>10} "
+          f"{'KiB/op':>9} {'peak KiB':>9}" +
+          (f" {'ops/s vs base':>14}" if baseline else ""))
+    for name, result in results.items():
+        line = (f"{name:22} {result['ops_per_sec']:10.1f} "
+                f"{1e6 / result['ops_per_sec']:9.1f} "
+                f"{result['blocks_per_op']:10.1f} "
+                f"{result['bytes_per_op'] / 1024:9.2f} "
+                f"{result['peak_bytes'] / 1024:9.2f}")
+        if name in baseline:
+            change = (result["ops_per_sec"] / baseline[name]["ops_per_sec"] -
+                      1)
+            line += f" {change:+14.1%}"
+        print(line)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as baseline_file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                baseline_file,
+                indent=2,
+                sort_keys=True)
+            baseline_file.write("\n")
+        print(f"saved baseline to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Measures the cost of `import surge` with `python -X importtime`.
+
+Usage:
+    python -m benchmarks.import_time [--runs 5] [--statement "import surge"] [--top 15] [--budget-ms 50]
+
+Each run uses a fresh interpreter. The report shows the median cumulative
+import time of the statement and the slowest modules it pulled in. With
+--budget-ms the script exits non-zero when the median exceeds the budget,
+so it can be used as a CI check.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = {
+    "import surge": "import surge",
+    "surge.Project": "import surge; surge.Project",
+}
+
+
+def parse_importtime(stderr: str):
+    """
+    Parse `-X importtime` output into a list of (module, depth, self_us, cumulative_us).
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split(
+            "|", 2)
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        rows.append((module.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(statement: str):
+    """
+    Run statement in a fresh interpreter and return the import rows it caused
+    and their total cost in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = parse_importtime(result.stderr)
+    # Everything up to the top-level `site` import happens at interpreter
+    # startup, before the statement runs.
+    for index, (module, depth, _, _) in enumerate(rows):
+        if module == "site" and depth == 0:
+            rows = rows[index + 1:]
+            break
+    total = sum(cumulative for _, depth, _, cumulative in rows if depth == 0)
+    return rows, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--statement", default=None)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    statements = ([args.statement]
+                  if args.statement else list(STATEMENTS.values()))
+    exit_code = 0
+    for statement in statements:
+        totals = []
+        rows = []
+        for _ in range(args.runs):
+            rows, total = measure(statement)
+            totals.append(total)
+        median_ms = statistics.median(totals) / 1000
+        print(
+            f"{statement!r}: median {median_ms:.1f} ms over {args.runs} runs")
+        slowest = sorted(rows, key=lambda row: row[2], reverse=True)
+        for module, _, self_us, cumulative_us in slowest[:args.top]:
+            print(f"  {self_us / 1000:8.2f} ms self "
+                  f"{cumulative_us / 1000:8.2f} ms cumulative  {module}")
+        if args.budget_ms is not None and median_ms > args.budget_ms:
+            print(f"  over budget of {args.budget_ms} ms")
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Compares the JSON codecs in surge.codec on typical API payloads.
+
+Usage:
+    python -m benchmarks.json_codecs [--repeat 5] [--number 20] [--payload tasks-1000]
+
+For each installed codec and payload, reports the best time per call of
+encoding (dumps, as used for request bodies) and decoding (loads, as used
+for response bodies), and the encoded size.
+"""
+import argparse
+import sys
+import timeit
+
+from benchmarks.payloads import PAYLOADS
+from surge.codec import available_codecs, get_codec
+
+
+def bench(codec, payload, repeat, number):
+    """Returns (encode_seconds, decode_seconds, encoded_bytes) per call."""
+    encoded = codec.dumps(payload)
+    encode = min(
+        timeit.repeat(lambda: codec.dumps(payload),
+                      repeat=repeat,
+                      number=number)) / number
+    decode = min(
+        timeit.repeat(lambda: codec.loads(encoded),
+                      repeat=repeat,
+                      number=number)) / number
+    return encode, decode, len(encoded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    parser.add_argument("--payload", choices=sorted(PAYLOADS), action="append")
+    args = parser.parse_args(argv)
+
+    codecs = available_codecs()
+    print(f"codecs: {', '.join(codecs)}")
+    for name in args.payload or PAYLOADS:
+        payload = PAYLOADS[name]()
+        print(f"\n{name}")
+        baseline = None
+        for codec_name in reversed(codecs):
+            encode, decode, size = bench(get_codec(codec_name), payload,
+                                         args.repeat, args.number)
+            if baseline is None:
+                baseline = encode + decode
+            print(f"  {codec_name:8} dumps {encode * 1000:8.3f} ms  "
+                  f"loads {decode * 1000:8.3f} ms  {size:>10} bytes  "
+                  f"{baseline / (encode + decode):5.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
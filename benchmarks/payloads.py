@@ -0,0 +1,62 @@
+"""
+Synthetic API payloads shaped like real Surge responses, for benchmarks.
+
+The shapes come from surge.testing, which the fake API server also uses.
+All generators are deterministic for a given size so results are comparable
+between runs.
+"""
+import random
+import uuid
+
+from surge.testing import TIMESTAMP, fake_project, fake_task
+
+
+def project(num_questions=10, seed=0):
+    """A project as returned by GET projects/{id}."""
+    return fake_project(random.Random(seed), num_questions=num_questions)
+
+
+def tasks(n=100, seed=0, text_words=50, num_responses=3):
+    """A page of n tasks, as returned by GET projects/{id}/tasks."""
+    rng = random.Random(seed)
+    return [
+        fake_task(rng, text_words=text_words, num_responses=num_responses)
+        for _ in range(n)
+    ]
+
+
+def team(num_members=500, seed=0):
+    """A team as returned by GET teams/{id}."""
+    rng = random.Random(seed)
+    return {
+        "id":
+        str(uuid.UUID(int=rng.getrandbits(128))),
+        "name":
+        "Benchmark team",
+        "description":
+        "A team of benchmark Surgers",
+        "created_at":
+        TIMESTAMP,
+        "members": [{
+            "id": str(uuid.UUID(int=rng.getrandbits(128)))
+        } for _ in range(num_members)],
+    }
+
+
+def task_rows(n=1000, seed=0, text_words=50):
+    """Rows of task data, as passed to Project.create_tasks."""
+    rng = random.Random(seed)
+    return [{
+        "id":
+        str(i),
+        "text":
+        " ".join(f"word{rng.randint(0, 9999)}" for _ in range(text_words)),
+    } for i in range(n)]
+
+
+PAYLOADS = {
+    "project": lambda: project(),
+    "tasks-10": lambda: tasks(10),
+    "tasks-1000": lambda: tasks(1000),
+    "task-rows-1000": lambda: task_rows(1000),
+}
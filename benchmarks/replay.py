@@ -0,0 +1,137 @@
+"""
+Records SDK workflows to a cassette and replays them to separate SDK time from network time.
+
+Usage:
+    python -m benchmarks.replay record traffic.jsonl.gz [--latency 0.02] [--workflow paginate]
+    python -m benchmarks.replay replay traffic.jsonl.gz [--with-latency] [--workflow paginate]
+
+`record` runs the workflows against a local FakeSurgeAPI (or against
+--base-url, with SURGE_API_KEY) and saves every request and response with
+its timing. `replay` runs the same workflows against the cassette without
+network access and reports, per endpoint, the network time that was
+recorded and the time spent in SDK code: building and encoding the request,
+decoding the response and hydrating objects from it. Compare the SDK column
+between two versions of the SDK to spot CPU regressions.
+
+Workflows run one request at a time so that SDK time can be attributed to
+the request it belongs to. The report workflow is skipped because report
+files are downloaded outside the API.
+"""
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.workflows import (
+    WORKFLOWS,
+    add_workflow_arguments,
+    fake_api,
+    run_workflow,
+)
+from surge.instrumentation import hooks
+from surge.transports import Cassette, RecordingTransport, ReplayTransport
+
+DEFAULT_WORKFLOWS = [name for name in WORKFLOWS if name != "report"]
+
+# Any URL works: replayed requests never leave the process
+REPLAY_BASE_URL = "http://replay.invalid/api"
+
+
+def record(args):
+    cassette = Cassette(args.cassette)
+    for name in args.workflow or DEFAULT_WORKFLOWS:
+        result = run_workflow(name,
+                              args.base_url,
+                              args,
+                              transport=RecordingTransport(cassette))
+        print(f"recorded {name}: {result['requests']} requests "
+              f"in {result['elapsed']:.2f}s")
+        if result["failure"] is not None:
+            print(f"  stopped early: {result['failure']!r}")
+    cassette.save()
+    size = os.path.getsize(args.cassette)
+    print(f"saved {len(cassette)} interactions to {args.cassette} "
+          f"({size / 1024:.1f} KiB)")
+
+
+def attribute(starts, replayed, finished):
+    """
+    Splits time between consecutive requests into per-route SDK time.
+
+    starts are the times at which `_base_request` emitted before_request and
+    replayed holds (route, network, transport start, transport end) for the
+    same requests, in the same order. The SDK time of a request is the time
+    from before_request until the transport was called (building and encoding
+    the request) plus the time from the transport returning until the next
+    request starts (decoding and hydrating the response).
+    """
+    totals = {}
+    for i, (route, network, started, ended) in enumerate(replayed):
+        next_start = starts[i + 1] if i + 1 < len(starts) else finished
+        sdk = (started - starts[i]) + (next_start - ended)
+        calls, network_total, sdk_total = totals.get(route, (0, 0.0, 0.0))
+        totals[route] = (calls + 1, network_total + network, sdk_total + sdk)
+    return totals
+
+
+def replay(args):
+    # One transport for all workflows, so that each gets the responses that
+    # were recorded for it
+    transport = ReplayTransport(args.cassette,
+                                latency=1.0 if args.with_latency else 0)
+    totals = {}
+    for name in args.workflow or DEFAULT_WORKFLOWS:
+        transport.replayed = []
+        starts = []
+        on_start = lambda event: starts.append(time.perf_counter())
+        hooks.register(before_request=on_start)
+        try:
+            result = run_workflow(name,
+                                  REPLAY_BASE_URL,
+                                  args,
+                                  transport=transport)
+            finished = time.perf_counter()
+        finally:
+            hooks.unregister(before_request=on_start)
+        if result["failure"] is not None:
+            print(f"{name} stopped early: {result['failure']!r}")
+        for route, (calls, network, sdk) in attribute(starts,
+                                                      transport.replayed,
+                                                      finished).items():
+            previous = totals.get(route, (0, 0.0, 0.0))
+            totals[route] = (previous[0] + calls, previous[1] + network,
+                             previous[2] + sdk)
+
+    print(f"{'endpoint':40} {'calls':>6} {'network ms':>11} {'sdk ms':>9} "
+          f"{'sdk/call ms':>12} {'sdk share':>9}")
+    for route, (calls, network, sdk) in sorted(totals.items()):
+        share = sdk / (sdk + network) if sdk + network else 0.0
+        print(f"{route:40} {calls:6} {network * 1000:11.1f} "
+              f"{sdk * 1000:9.1f} {sdk * 1000 / calls:12.3f} {share:9.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("mode", choices=("record", "replay"))
+    parser.add_argument("cassette")
+    parser.add_argument("--base-url",
+                        help="Record against this API instead of a local fake")
+    parser.add_argument("--with-latency",
+                        action="store_true",
+                        help="Wait as long as each request took when recorded")
+    add_workflow_arguments(parser, concurrency=1)
+    args = parser.parse_args(argv)
+
+    if args.mode == "replay":
+        replay(args)
+    elif args.base_url:
+        record(args)
+    else:
+        with fake_api(args) as base_url:
+            args.base_url = base_url
+            record(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
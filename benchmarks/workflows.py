@@ -0,0 +1,212 @@
+"""
+Runs SDK workflows against a local FakeSurgeAPI and reports throughput.
+
+Usage:
+    python -m benchmarks.workflows [--latency 0.02] [--error-rate 0] [--tasks 2000] [--workflow paginate]
+
+The fake API runs in a separate process so that its CPU time and memory are
+not counted. For each workflow the report shows the number of requests and
+errors, requests per second, p50/p99 request latency as seen by the SDK, and
+the peak memory allocated while it ran (measured with tracemalloc).
+"""
+import argparse
+import contextlib
+import multiprocessing
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.payloads import task_rows
+from surge.bulk import bounded_map
+from surge.client import SurgeClient
+from surge.testing import FakeSurgeAPI
+
+
+def _serve(config, connection):
+    api = FakeSurgeAPI(**config).start()
+    connection.send(api.base_url)
+    # Serve until the parent asks us to stop or goes away
+    try:
+        connection.recv()
+    except EOFError:
+        pass
+    api.stop()
+
+
+def retrieve(client, project, args):
+    for _ in range(args.requests):
+        client.projects.retrieve(project.id)
+
+
+def paginate(client, project, args):
+    page = 1
+    while True:
+        tasks = project.list_tasks(page=page, per_page=args.per_page)
+        if len(tasks) < args.per_page:
+            break
+        page += 1
+
+
+def bulk_upload(client, project, args):
+    rows = task_rows(args.tasks, text_words=args.text_words)
+    chunks = [
+        rows[i:i + args.chunk_size]
+        for i in range(0, len(rows), args.chunk_size)
+    ]
+    for _, _, error in bounded_map(project.create_tasks, chunks,
+                                   args.concurrency):
+        if error is not None:
+            raise error
+
+
+def report(client, project, args):
+    project.download_json()
+
+
+def rubrics(client, project, args):
+    items = [(f"Text number {i}", "Is it a number?")
+             for i in range(args.requests)]
+    client.rubrics.evaluate_many(items,
+                                 max_workers=args.concurrency,
+                                 cache=False,
+                                 raise_on_error=False)
+
+
+def team_sync(client, project, args):
+    team = client.teams.create("Benchmark", [])
+    desired = [f"surger-{i}" for i in range(args.requests * 10)]
+    team.sync_members(desired, chunk_size=10, max_workers=args.concurrency)
+
+
+WORKFLOWS = {
+    "retrieve": retrieve,
+    "paginate": paginate,
+    "bulk_upload": bulk_upload,
+    "report": report,
+    "rubrics": rubrics,
+    "team_sync": team_sync,
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_workflow(name, base_url, args, trace_memory=False, transport=None):
+    """
+    Returns a dict of results for one run of the named workflow. tracemalloc
+    slows everything down, so timings and memory are measured in separate runs.
+    """
+    client = SurgeClient(api_key="benchmark",
+                         base_url=base_url,
+                         pool=args.concurrency,
+                         transport=transport)
+    project = client.projects.create(f"Benchmark {name}")
+    latencies = []
+    errors = []
+    client.hooks.register(
+        after_response=lambda e: latencies.append(e.timings["total"]),
+        on_error=lambda e: errors.append(e))
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    failure = None
+    try:
+        WORKFLOWS[name](client, project, args)
+    except Exception as err:
+        failure = err
+    elapsed = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    client.close()
+
+    requests = len(latencies) + len(errors)
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "elapsed": elapsed,
+        "rps": requests / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "peak_bytes": peak,
+        "failure": failure,
+    }
+
+
+def add_workflow_arguments(parser, concurrency=8):
+    """Options shared by the benchmarks that run workflows."""
+    parser.add_argument("--workflow",
+                        choices=sorted(WORKFLOWS),
+                        action="append")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--text-words", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--chunk-size", type=int, default=250)
+    parser.add_argument("--concurrency", type=int, default=concurrency)
+
+
+@contextlib.contextmanager
+def fake_api(args):
+    """Runs a FakeSurgeAPI configured from args in a child process and yields its base URL."""
+    config = {
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "tasks_per_project": args.tasks,
+        "text_words": args.text_words,
+    }
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve,
+                                     args=(config, child),
+                                     daemon=True)
+    server.start()
+    try:
+        yield parent.recv()
+    finally:
+        parent.send("stop")
+        server.join(timeout=5)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_workflow_arguments(parser)
+    parser.add_argument("--no-memory",
+                        action="store_true",
+                        help="Skip the tracemalloc run of each workflow.")
+    args = parser.parse_args(argv)
+
+    with fake_api(args) as base_url:
+        print(f"fake API at {base_url} "
+              f"latency={args.latency}s error_rate={args.error_rate}")
+        print(f"{'workflow':12} {'requests':>8} {'errors':>6} {'req/s':>9} "
+              f"{'p50 ms':>8} {'p99 ms':>8} {'peak MiB':>9}")
+        for name in args.workflow or WORKFLOWS:
+            result = run_workflow(name, base_url, args)
+            peak = "-"
+            if not args.no_memory:
+                peak_bytes = run_workflow(name,
+                                          base_url,
+                                          args,
+                                          trace_memory=True)["peak_bytes"]
+                peak = f"{peak_bytes / 2**20:.2f}"
+            print(f"{name:12} {result['requests']:8} {result['errors']:6} "
+                  f"{result['rps']:9.1f} {result['p50'] * 1000:8.2f} "
+                  f"{result['p99'] * 1000:8.2f} {peak:>9}")
+            if result["failure"] is not None:
+                print(f"  stopped early: {result['failure']!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,70 @@
+import importlib
 import os
 
-from surge.projects import Project
-from surge.tasks import Task
-from surge.teams import Team
-from surge.reports import Report
-from surge.rubrics import Rubric
-
 api_key = os.environ.get("SURGE_API_KEY", None)
 base_url = os.environ.get("SURGE_BASE_URL", "https://app.surgehq.ai/api")
 default_headers = {}
+# (connect, read) timeout in seconds for each request, or a single number for
+# both. None uses surge.timeouts.DEFAULT_CONNECT_TIMEOUT / DEFAULT_READ_TIMEOUT.
+timeout = None
+# JSON library used for request and response bodies: "orjson", "ujson" or
+# "json". None picks the fastest one installed.
+json_codec = None
+# Request bodies of at least this many bytes are sent gzip-compressed with
+# "Content-Encoding: gzip". None (the default) never compresses.
+gzip_threshold = None
+# surge.transports.Transport that sends requests, e.g. to record or replay
+# traffic. None sends them directly with requests.
+transport = None
+# Concurrent identical GET requests (same endpoint, params and API key) share
+# one request and its result.
+coalesce_gets = True
+# surge.caching.ResponseCache that GET responses of read-mostly endpoints
+# (projects, teams, blueprints) are served from. None (the default) disables it.
+response_cache = None
+# surge.caching.TaskCache that completed tasks are stored in and that
+# Task.retrieve reads before making a request. None (the default) disables it.
+task_cache = None
+
+# Resources are imported on first access so that `import surge` stays cheap;
+# importing them pulls in requests, urllib3 and dateutil.
+_LAZY_ATTRIBUTES = {
+    "Project": "surge.projects",
+    "Task": "surge.tasks",
+    "Team": "surge.teams",
+    "Report": "surge.reports",
+    "Rubric": "surge.rubrics",
+    "SurgeClient": "surge.client",
+    "deadline": "surge.timeouts",
+}
+
+# Lets type checkers and IDEs resolve the lazy attributes without importing
+# typing at runtime
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from surge.projects import Project
+    from surge.tasks import Task
+    from surge.teams import Team
+    from surge.reports import Report
+    from surge.rubrics import Rubric
+    from surge.client import SurgeClient
+    from surge.timeouts import deadline
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    else:
+        try:
+            value = importlib.import_module(f"{__name__}.{name}")
+        except ModuleNotFoundError as err:
+            if err.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(
+                f"module {__name__!r} has no attribute {name!r}") from None
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
@@ -1,7 +1,18 @@
+import gzip
+import time
+
 import requests
+import urllib3
 
 import surge
-from surge.errors import SurgeRequestError, SurgeMissingAPIKeyError
+from surge import caching, instrumentation
+from surge.codec import get_codec
+from surge.errors import (
+    SurgeRequestError,
+    SurgeMissingAPIKeyError,
+    SurgeTimeoutError,
+)
+from surge.timeouts import remaining, request_timeout
 
 PROJECTS_ENDPOINT = "projects"
 TASKS_ENDPOINT = "tasks"
@@ -9,9 +20,54 @@ REPORTS_ENDPOINT = "projects"
 QUESTIONS_ENDPOINT = "items"
 TEAMS_ENDPOINT = "teams"
 
+# Level 6 compresses JSON almost as well as 9 at a fraction of the CPU time
+GZIP_COMPRESS_LEVEL = 6
+
+
+class _BodyEncoder(object):
+    """
+    Encodes request params as a JSON body with the configured codec, gzipping
+    bodies of at least gzip_threshold bytes.
+    """
+
+    def __init__(self, codec, gzip_threshold=None, event=None):
+        self.codec = codec
+        self.gzip_threshold = gzip_threshold
+        self.event = event
+
+    def kwargs(self, params, request_kwargs):
+        """Returns request_kwargs with params added as the request body."""
+        if params is None:
+            return request_kwargs
+        try:
+            body = self.codec.dumps(params)
+        except ValueError as err:
+            raise SurgeRequestError(
+                f"Invalid JSON in request body: {err}") from None
+        headers = dict(request_kwargs.get("headers") or {})
+        headers["Content-Type"] = "application/json"
+
+        if self.event is not None:
+            self.event.bytes_uncompressed = len(body)
+        if self.gzip_threshold is not None and len(
+                body) >= self.gzip_threshold:
+            body = gzip.compress(body,
+                                 compresslevel=GZIP_COMPRESS_LEVEL,
+                                 mtime=0)
+            headers["Content-Encoding"] = "gzip"
+        if self.event is not None:
+            # Also known when the request fails, unlike the response's body
+            self.event.bytes_sent = len(body)
+
+        return {**request_kwargs, "data": body, "headers": headers}
+
 
 class APIResource(object):
 
+    # Set on resource classes bound to a SurgeClient (see SurgeClient.bind).
+    # Unbound classes use the module-level configuration in `surge`.
+    _client = None
+
     def __init__(self, id=None):
         self.id = id
 
@@ -28,92 +84,231 @@ class APIResource(object):
                       params=None,
                       files=None,
                       api_key=None):
-        api_key_to_use = api_key or surge.api_key
+        client = cls._client
+        if client is not None:
+            api_key_to_use = api_key or client.api_key
+        else:
+            api_key_to_use = api_key or surge.api_key
         if api_key_to_use is None:
             raise SurgeMissingAPIKeyError
 
         if files is not None and method != "post":
             raise SurgeRequestError("Can only uploadfiles to a POST request")
 
-        try:
-            url = f"{surge.base_url}/{api_endpoint}"
-            header_kwargs = {}
-            if surge.default_headers:
-                header_kwargs["headers"] = dict(surge.default_headers)
-
-            # GET request
-            if method == "get":
-                response = requests.get(url,
-                                        auth=(api_key_to_use, ""),
-                                        params=params,
-                                        **header_kwargs)
-
-            # POST request
-            elif method == "post":
-                if files is not None:
-                    response = requests.post(url,
-                                             auth=(api_key_to_use, ""),
-                                             files=files,
-                                             json=params,
-                                             **header_kwargs)
-                else:
-                    response = requests.post(url,
-                                             auth=(api_key_to_use, ""),
-                                             json=params,
-                                             **header_kwargs)
-
-            # PUT request
-            elif method == "put":
-                if params is not None and len(params):
-                    response = requests.put(url,
-                                            auth=(api_key_to_use, ""),
-                                            json=params,
-                                            **header_kwargs)
-                else:
-                    response = requests.put(url,
-                                            auth=(api_key_to_use, ""),
-                                            **header_kwargs)
-
-            elif method == "delete":
-                response = requests.delete(url,
-                                           auth=(api_key_to_use, ""),
-                                           **header_kwargs)
-
-            elif method == "patch":
-                response = requests.patch(url,
-                                          auth=(api_key_to_use, ""),
-                                          json=params,
-                                          **header_kwargs)
+        # Only build a RequestEvent when someone is listening
+        active_hooks = [
+            h for h in (instrumentation.hooks,
+                        client.hooks if client is not None else None) if h
+        ]
+        event = None
+        started = None
 
+        try:
+            request_kwargs = {}
+            if client is not None:
+                # The client's session carries its headers and connection pool
+                url = f"{client.base_url}/{api_endpoint}"
+                http = client.session
+                if client.limiter is not None:
+                    client.limiter.acquire()
+                timeout = client.timeout
+                codec = get_codec(client.json_codec)
+                gzip_threshold = client.gzip_threshold
+                transport = client.transport
             else:
-                raise SurgeRequestError("Invalid HTTP method.")
+                url = f"{surge.base_url}/{api_endpoint}"
+                http = requests
+                if surge.default_headers:
+                    request_kwargs["headers"] = dict(surge.default_headers)
+                timeout = surge.timeout
+                codec = get_codec()
+                gzip_threshold = surge.gzip_threshold
+                transport = surge.transport
+
+            if transport is not None:
+                http = transport.session(http)
+
+            if active_hooks:
+                event = instrumentation.RequestEvent(method, api_endpoint, url)
+                for h in active_hooks:
+                    h.emit("before_request", event)
+
+            # Cap the timeouts by what is left of the current surge.deadline()
+            request_kwargs["timeout"] = request_timeout(timeout)
+
+            started = time.perf_counter()
+            encoder = _BodyEncoder(codec, gzip_threshold, event)
+            response = cls._send(http, method, url, (api_key_to_use, ""),
+                                 params, files, request_kwargs, encoder)
+            received = time.perf_counter()
 
             # Raise exception if there is an http error
             response.raise_for_status()
 
             # If no errors, return response as json
-            return response.json()
+            try:
+                response_json = codec.loads(response.content)
+            except ValueError as err:
+                raise SurgeRequestError(
+                    f"Invalid JSON in response: {err}") from None
+
+            if event is not None:
+                event.record_response(response, started, received,
+                                      time.perf_counter())
+                for h in active_hooks:
+                    h.emit("after_response", event)
+            return response_json
+
+        except Exception as err:
+            error = cls._request_error(err)
+            if event is not None:
+                event.error = error
+                if started is not None:
+                    event.timings["total"] = time.perf_counter() - started
+                response = getattr(err, "response", None)
+                if response is not None:
+                    event.status = response.status_code
+                    event.bytes_received = len(response.content or b"")
+                for h in active_hooks:
+                    h.emit("on_error", event)
+            raise error from None
+
+        finally:
+            # Even a failed write may have been applied by the server
+            response_cache = cls._response_cache()
+            if response_cache is not None and caching.is_write(
+                    method, api_endpoint):
+                response_cache.invalidate_for_write(api_endpoint)
+
+    @staticmethod
+    def _send(http, method, url, auth, params, files, request_kwargs, encoder):
+        # GET request
+        if method == "get":
+            return http.get(url, auth=auth, params=params, **request_kwargs)
 
-        except requests.exceptions.HTTPError as err:
+        # POST request
+        elif method == "post":
+            if files is not None:
+                return http.post(url,
+                                 auth=auth,
+                                 files=files,
+                                 json=params,
+                                 **request_kwargs)
+            return http.post(url,
+                             auth=auth,
+                             **encoder.kwargs(params, request_kwargs))
+
+        # PUT request
+        elif method == "put":
+            if params is not None and len(params):
+                return http.put(url,
+                                auth=auth,
+                                **encoder.kwargs(params, request_kwargs))
+            return http.put(url, auth=auth, **request_kwargs)
+
+        elif method == "delete":
+            return http.delete(url, auth=auth, **request_kwargs)
+
+        elif method == "patch":
+            return http.patch(url,
+                              auth=auth,
+                              **encoder.kwargs(params, request_kwargs))
+
+        raise SurgeRequestError("Invalid HTTP method.")
+
+    @staticmethod
+    def _request_error(err):
+        """Convert an exception raised while making a request into a SurgeRequestError."""
+        if isinstance(err, SurgeRequestError):
+            return err
+
+        if isinstance(err, requests.exceptions.Timeout):
+            return SurgeTimeoutError(f"Request timed out: {err}")
+
+        # A read timeout on the last retry surfaces as a ConnectionError
+        if isinstance(err, requests.exceptions.ConnectionError) and isinstance(
+                getattr(err.args[0] if err.args else None, "reason", None),
+                urllib3.exceptions.TimeoutError):
+            return SurgeTimeoutError(f"Request timed out: {err}")
+
+        if isinstance(err, requests.exceptions.HTTPError):
             message = err.args[0]
             message = f"{message}. {err.response.text}"
-            raise SurgeRequestError(message) from None
+            return SurgeRequestError(message,
+                                     status_code=err.response.status_code)
 
-        except requests.exceptions.JSONDecodeError as err:
+        if isinstance(err, requests.exceptions.JSONDecodeError):
             message = err.args[0]
-            raise SurgeRequestError(message) from None
+            return SurgeRequestError(message)
 
-        except Exception as err:
-            # Generic exception handling
-            raise SurgeRequestError
+        # Generic exception handling
+        return SurgeRequestError()
+
+    @classmethod
+    def _response_cache(cls):
+        client = cls._client
+        return (client.response_cache
+                if client is not None else surge.response_cache)
+
+    @classmethod
+    def _cache_scope(cls, api_key: str = None):
+        # Cached results are only shared by requests to the same API with the same key
+        client = cls._client
+        if client is not None:
+            return caching.cache_scope(client.base_url, api_key
+                                       or client.api_key)
+        return caching.cache_scope(surge.base_url, api_key or surge.api_key)
 
     @classmethod
     def get(cls, api_endpoint, params=None, api_key=None):
         method = "get"
-        return cls._base_request(method,
-                                 api_endpoint,
-                                 params=params,
-                                 api_key=api_key)
+        client = cls._client
+        coalesce = (client.coalesce_gets
+                    if client is not None else surge.coalesce_gets)
+        response_cache = cls._response_cache()
+        # Writes sent as GET (e.g. deleting a project) are never shared or cached
+        if (not coalesce and response_cache is None) or caching.is_write(
+                method, api_endpoint):
+            return cls._base_request(method,
+                                     api_endpoint,
+                                     params=params,
+                                     api_key=api_key)
+
+        if client is not None:
+            flights = client.single_flight
+            key = (client.base_url, api_endpoint, caching.content_hash(params),
+                   api_key or client.api_key)
+        else:
+            flights = caching.single_flight
+            key = (surge.base_url, api_endpoint, caching.content_hash(params),
+                   api_key or surge.api_key)
+
+        if response_cache is not None:
+            route = instrumentation.endpoint_route(api_endpoint)
+            cached = response_cache.get(route, key)
+            if cached is not None:
+                return cached
+            generation = response_cache.generation
+
+        # Identical GETs already in flight are joined instead of repeated
+        if coalesce:
+            response_json = flights.do(
+                key,
+                lambda: cls._base_request(
+                    method, api_endpoint, params=params, api_key=api_key),
+                timeout=remaining())
+        else:
+            response_json = cls._base_request(method,
+                                              api_endpoint,
+                                              params=params,
+                                              api_key=api_key)
+
+        if response_cache is not None:
+            response_cache.set(route,
+                               key,
+                               response_json,
+                               generation=generation)
+        return response_json
 
     @classmethod
     def post(cls, api_endpoint, params=None, api_key=None, files=None):
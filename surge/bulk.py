@@ -0,0 +1,435 @@
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from surge.codec import get_codec
+from surge.errors import SurgeTimeoutError
+from surge.timeouts import remaining
+
+DEFAULT_MAX_WORKERS = 8
+
+# HTTP statuses that mean a request was too large or the server is overloaded,
+# so smaller chunks should be sent
+OVERLOAD_STATUSES = (408, 413, 429, 502, 503, 504)
+
+# Overload statuses with which the server rejects a request before acting on
+# it, so the rows can safely be resent. After a timeout, 408, 502 or 504 the
+# rows may already have been created.
+REJECTED_STATUSES = (413, 429, 503)
+
+
+def bounded_map(fn, items, max_workers: int = DEFAULT_MAX_WORKERS):
+    """
+    Calls fn on each item using a pool of threads and lazily yields
+    (item, result, error) tuples in input order.
+
+    At most `2 * max_workers` items are read ahead of the consumer, so items
+    can be a generator over an arbitrarily large input.
+    """
+    max_workers = max(1, max_workers)
+
+    def call(item):
+        try:
+            return fn(item), None
+        except Exception as err:
+            return None, err
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in items:
+            # Run each call in a copy of the caller's context so that
+            # settings such as surge.deadline() apply inside the workers
+            context = contextvars.copy_context()
+            pending.append((item, executor.submit(context.run, call, item)))
+            if len(pending) >= 2 * max_workers:
+                item, future = pending.popleft()
+                yield (item, *future.result())
+        while pending:
+            item, future = pending.popleft()
+            yield (item, *future.result())
+
+
+class BulkResult(object):
+    """Outcome of a bulk operation: what succeeded, what failed and how fast."""
+
+    def __init__(self):
+        self.succeeded = []
+        self.failed = []
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def __repr__(self):
+        return (f"<surge.BulkResult succeeded={len(self.succeeded)} "
+                f"failed={len(self.failed)} elapsed={self.elapsed:.2f}s "
+                f"rate={self.rate:.1f}/s>")
+
+    def add_success(self, result):
+        self.succeeded.append(result)
+
+    def add_failure(self, item, error):
+        self.failed.append((item, error))
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+        return self
+
+    @property
+    def total(self):
+        return len(self.succeeded) + len(self.failed)
+
+    @property
+    def elapsed(self):
+        end = self.finished_at if self.finished_at is not None else time.monotonic(
+        )
+        return end - self.started_at
+
+    @property
+    def rate(self):
+        """Completed operations per second."""
+        elapsed = self.elapsed
+        return self.total / elapsed if elapsed > 0 else 0.0
+
+
+class Checkpoint(object):
+    """
+    Persists how many leading input records have been processed, so that an
+    interrupted bulk run can skip them when it is restarted. Extra state
+    (e.g. the size of an output file at that point) can be saved with the offset.
+
+    The checkpoint is written atomically (to a temporary file which then
+    replaces the checkpoint file) every `save_every` records.
+    """
+
+    def __init__(self, path: str, save_every: int = 100):
+        self.path = path
+        self.save_every = max(1, save_every)
+        self.offset, self.state = self.load()
+        self._unsaved = 0
+
+    def __repr__(self):
+        return f"<surge.Checkpoint path=\"{self.path}\" offset={self.offset}>"
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0, {}
+        offset = data.pop("offset", 0)
+        return offset, data
+
+    def advance(self, offset: int, **state):
+        self.offset = offset
+        self.state.update(state)
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"offset": self.offset, **self.state}, f)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+
+class AdaptiveChunker(object):
+    """
+    Chooses how many rows to send in each request of a bulk upload, AIMD-style:
+    the chunk grows by `step` rows after every fast, successful request, and is
+    multiplied by `backoff` when a request is slow, times out or is rejected as
+    too large. Chunks never exceed `max_bytes` of serialized JSON.
+
+    The controller is thread-safe, so concurrent upload workers can share one.
+
+    Arguments:
+        initial_rows (int, optional): Rows in the first chunk.
+        min_rows (int, optional): Smallest chunk.
+        max_rows (int, optional): Largest chunk.
+        max_bytes (int, optional): Largest serialized size of a chunk.
+        step (int, optional): Rows added after each successful request.
+        backoff (float, optional): Factor applied to the chunk size on overload.
+        target_latency (float, optional): Requests slower than this many seconds shrink the chunk.
+        resend_timeouts (bool, optional): Also resend chunks whose request timed out or failed
+            with 408, 502 or 504. The server may have created their tasks already, so this can
+            create duplicates. By default only chunks rejected with 413, 429 or 503 are resent.
+
+    Errors raised once the current surge.deadline() has expired are not
+    treated as overload, and don't change the chunk size.
+    """
+
+    def __init__(self,
+                 initial_rows: int = 100,
+                 min_rows: int = 1,
+                 max_rows: int = 5_000,
+                 max_bytes: int = 5 * 1024 * 1024,
+                 step: int = 50,
+                 backoff: float = 0.5,
+                 target_latency: float = 10.0,
+                 resend_timeouts: bool = False,
+                 json_codec: str = None):
+        self.min_rows = max(1, min_rows)
+        self.max_rows = max(self.min_rows, max_rows)
+        self.max_bytes = max_bytes
+        self.step = step
+        self.backoff = backoff
+        self.target_latency = target_latency
+        self.resend_timeouts = resend_timeouts
+        self.chunk_rows = min(max(initial_rows, self.min_rows), self.max_rows)
+        # Lowered below max_bytes when a chunk is rejected as too large
+        self.chunk_bytes = max_bytes
+        self.chunks = 0
+        self.rows = 0
+        self.bytes = 0
+        self.increases = 0
+        self.decreases = 0
+        self.overloads = 0
+        # Most recent decisions, as dicts with the chunk that was measured
+        self.decisions = deque(maxlen=1000)
+        self._codec = get_codec(json_codec)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"<surge.AdaptiveChunker chunk_rows={self.chunk_rows} "
+                f"chunk_bytes={self.chunk_bytes} chunks={self.chunks}>")
+
+    def row_size(self, row):
+        """Serialized size of a row, including the separator."""
+        return len(self._codec.dumps(row)) + 1
+
+    def take(self, rows, pending: deque):
+        """
+        Reads the next chunk, first from the pending deque of (row, size) pairs
+        and then from the rows iterator. Returns a list of (row, size) pairs,
+        empty once both are exhausted. A row that doesn't fit in a chunk by
+        itself is sent alone; other rows that don't fit are left in pending.
+        """
+        with self._lock:
+            limit_rows = self.chunk_rows
+            limit_bytes = self.chunk_bytes
+        chunk = []
+        total = 0
+        while len(chunk) < limit_rows:
+            if pending:
+                row, size = pending.popleft()
+            else:
+                row = next(rows, _END)
+                if row is _END:
+                    break
+                size = self.row_size(row)
+            if chunk and total + size > limit_bytes:
+                pending.appendleft((row, size))
+                break
+            chunk.append((row, size))
+            total += size
+        return chunk
+
+    @staticmethod
+    def is_overload(error):
+        return isinstance(error, SurgeTimeoutError) or getattr(
+            error, "status_code", None) in OVERLOAD_STATUSES
+
+    def can_resend(self, error):
+        """Whether rows whose request failed with error can't have been created."""
+        if self.resend_timeouts:
+            return self.is_overload(error)
+        return getattr(error, "status_code", None) in REJECTED_STATUSES
+
+    @staticmethod
+    def deadline_expired():
+        left = remaining()
+        return left is not None and left <= 0
+
+    def record(self, rows: int, nbytes: int, latency: float, error=None):
+        """
+        Updates the chunk size from the outcome of a request. Returns True if
+        the rows should be resent in smaller chunks.
+        """
+        # The request failed because the caller ran out of time, which says
+        # nothing about the server
+        expired = error is not None and self.deadline_expired()
+        with self._lock:
+            overload = (error is not None and not expired
+                        and self.is_overload(error))
+            if error is None:
+                self.chunks += 1
+                self.rows += rows
+                self.bytes += nbytes
+            if overload:
+                self.overloads += 1
+                # Shrink below the failed chunk so that resending it makes progress
+                self.chunk_rows = max(
+                    self.min_rows,
+                    int(min(self.chunk_rows, rows) * self.backoff))
+                self.chunk_bytes = max(1, int(nbytes * self.backoff))
+                self.decreases += 1
+                outcome = "overload"
+            elif error is None and latency > self.target_latency:
+                self.chunk_rows = max(self.min_rows,
+                                      int(self.chunk_rows * self.backoff))
+                self.decreases += 1
+                outcome = "slow"
+            elif error is None:
+                self.chunk_rows = min(self.max_rows,
+                                      self.chunk_rows + self.step)
+                self.chunk_bytes = min(
+                    self.max_bytes,
+                    self.chunk_bytes + max(1, self.max_bytes // 10))
+                self.increases += 1
+                outcome = "ok"
+            elif expired:
+                outcome = "deadline"
+            else:
+                outcome = "error"
+            self.decisions.append({
+                "rows": rows,
+                "bytes": nbytes,
+                "latency": latency,
+                "outcome": outcome,
+                "chunk_rows": self.chunk_rows,
+                "chunk_bytes": self.chunk_bytes,
+            })
+            return overload and rows > 1 and self.can_resend(error)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "chunk_rows": self.chunk_rows,
+                "chunk_bytes": self.chunk_bytes,
+                "chunks": self.chunks,
+                "rows": self.rows,
+                "bytes": self.bytes,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "overloads": self.overloads,
+            }
+
+
+def pipelined_upload(upload,
+                     rows,
+                     chunker: AdaptiveChunker = None,
+                     max_workers: int = DEFAULT_MAX_WORKERS,
+                     queue_size: int = None):
+    """
+    Uploads rows with a producer/consumer pipeline and lazily yields a
+    (row, result) pair for each row as its chunk is committed, in completion
+    order.
+
+    A producer thread reads rows into chunks sized by chunker and puts them
+    on a queue holding at most queue_size chunks (2 * max_workers by default),
+    and max_workers threads call upload(list_of_rows) on them, which must
+    return one result per row. Memory use is bounded by the queues whatever
+    the number of rows. Chunks the chunker considers rejected for their size
+    are split and resent.
+
+    On the first error no more rows are read and queued chunks are dropped,
+    but the chunks being uploaded are finished and every committed result is
+    yielded before the error is raised. When the consumer stops iterating the
+    threads are stopped before the generator returns.
+    """
+    chunker = chunker or AdaptiveChunker()
+    max_workers = max(1, max_workers)
+    chunks = queue.Queue(maxsize=queue_size or 2 * max_workers)
+    results = queue.Queue(maxsize=2 * max_workers)
+    # stop: the consumer is gone. failed: a chunk failed, so only the chunks
+    # being uploaded are finished and their results still delivered.
+    stop = threading.Event()
+    failed = threading.Event()
+
+    def put(q, item, until=stop):
+        # Gives up once the pipeline is stopping instead of blocking forever
+        while not stop.is_set() and not until.is_set():
+            try:
+                q.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            rows_iter = iter(rows)
+            pending = deque()
+            while not stop.is_set() and not failed.is_set():
+                chunk = chunker.take(rows_iter, pending)
+                if not chunk or not put(chunks, chunk, until=failed):
+                    break
+        except Exception as err:
+            failed.set()
+            put(results, _Failure(err))
+        for _ in range(max_workers):
+            put(chunks, _END, until=failed)
+
+    def send(chunk):
+        nbytes = sum(size for _, size in chunk)
+        started = time.monotonic()
+        batch = [row for row, _ in chunk]
+        try:
+            uploaded = upload(batch)
+        except Exception as err:
+            if not chunker.record(len(chunk), nbytes,
+                                  time.monotonic() - started, err):
+                raise
+            half = len(chunk) // 2
+            send(chunk[:half])
+            send(chunk[half:])
+            return
+        chunker.record(len(chunk), nbytes, time.monotonic() - started)
+        put(results, list(zip(batch, uploaded)))
+
+    def work():
+        try:
+            while not stop.is_set() and not failed.is_set():
+                try:
+                    chunk = chunks.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if chunk is _END or failed.is_set():
+                    break
+                send(chunk)
+        except Exception as err:
+            failed.set()
+            put(results, _Failure(err))
+        put(results, _END)
+
+    # Run the threads in a copy of the caller's context so that settings
+    # such as surge.deadline() apply inside them
+    threads = [
+        threading.Thread(target=contextvars.copy_context().run,
+                         args=(fn, ),
+                         daemon=True)
+        for fn in [produce] + [work] * max_workers
+    ]
+    for thread in threads:
+        thread.start()
+    error = None
+    try:
+        finished = 0
+        while finished < max_workers:
+            item = results.get()
+            if item is _END:
+                finished += 1
+            elif isinstance(item, _Failure):
+                error = error or item.error
+            else:
+                yield from item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if error is not None:
+        raise error
+
+
+class _Failure(object):
+
+    def __init__(self, error):
+        self.error = error
+
+
+_END = object()
@@ -0,0 +1,526 @@
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from surge.codec import get_codec
+from surge.errors import SurgeTimeoutError
+from surge.instrumentation import ID_SEGMENT_PATTERN, endpoint_route
+
+DEFAULT_ELIGIBILITY_TTL = 5 * 60
+DEFAULT_TASK_CACHE_BYTES = 1024 * 1024 * 1024
+
+
+class TTLCache(object):
+    """
+    Thread-safe in-memory cache whose entries expire `ttl` seconds after they
+    are set. Once `maxsize` entries are stored, the least recently used entry
+    is evicted. A ttl of None means entries never expire.
+    """
+
+    def __init__(self, ttl: float = None, maxsize: int = 10_000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"<surge.TTLCache size={len(self)} hits={self.hits} "
+                f"misses={self.misses}>")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, record=False) is not _MISSING
+
+    def get(self, key, default=None, record: bool = True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    if record:
+                        self.hits += 1
+                    return value
+                del self._entries[key]
+            if record:
+                self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Removes every entry whose key satisfies predicate(key)."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class DiskCache(object):
+    """
+    Persistent cache backed by a SQLite file. Values must be JSON serializable.
+    It has the same get/set interface as TTLCache, so either can be passed
+    wherever the SDK accepts a cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS entries "
+                               "(key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def __repr__(self):
+        return (f"<surge.DiskCache path=\"{self.path}\" hits={self.hits} "
+                f"misses={self.misses}>")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, record=False) is not _MISSING
+
+    def get(self, key, default=None, record: bool = True):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?",
+                                     (key, )).fetchone()
+            if record:
+                if row is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)",
+                (key, json.dumps(value)))
+
+    def invalidate(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key, ))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        self._conn.close()
+
+
+def cache_scope(base_url: str, api_key: str):
+    """
+    Identifies the API and account that cached data was fetched with, without
+    storing the API key itself.
+    """
+    return content_hash(base_url, api_key)
+
+
+class TaskCache(object):
+    """
+    Persistent cache of completed tasks, backed by a SQLite file and keyed by
+    task id. Once all of a task's responses are in, its data no longer
+    changes, so Task.retrieve can be answered from disk across runs. When the
+    stored JSON exceeds max_bytes, the least recently used tasks are evicted.
+
+    Tasks are stored under a scope (see `cache_scope`), so that one file
+    shared by several API keys or environments only serves each task to the
+    base URL and API key it was fetched with.
+
+    Arguments:
+        path (str): SQLite file to store the tasks in. It is created if needed.
+        max_bytes (int, optional): Maximum total size of the stored task JSON.
+        json_codec (str, optional): Codec used to store the tasks. Defaults to the fastest one installed.
+    """
+
+    def __init__(self,
+                 path: str,
+                 max_bytes: int = DEFAULT_TASK_CACHE_BYTES,
+                 json_codec: str = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._codec = get_codec(json_codec)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scoped_tasks (scope TEXT NOT NULL, "
+                "task_id TEXT NOT NULL, data BLOB NOT NULL, "
+                "size INTEGER NOT NULL, used_at REAL NOT NULL, "
+                "PRIMARY KEY (scope, task_id))")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS scoped_tasks_id "
+                               "ON scoped_tasks (task_id)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS scoped_tasks_used_at "
+                "ON scoped_tasks (used_at)")
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM scoped_tasks").fetchone()[0]
+
+    def __repr__(self):
+        return (f"<surge.TaskCache path=\"{self.path}\" size={self.size} "
+                f"hits={self.hits} misses={self.misses}>")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM scoped_tasks").fetchone()[0]
+
+    def __contains__(self, task_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM scoped_tasks WHERE task_id = ?",
+                (task_id, )).fetchone() is not None
+
+    @property
+    def size(self):
+        """Total bytes of task JSON stored."""
+        return self._size
+
+    @staticmethod
+    def is_complete(task_json):
+        return bool(task_json.get("is_complete"))
+
+    def get(self, task_id: str, scope: str = ""):
+        """Returns the JSON of a task stored under scope, or None."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT data FROM scoped_tasks WHERE scope = ? AND task_id = ?",
+                (scope, task_id)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE scoped_tasks SET used_at = ? "
+                "WHERE scope = ? AND task_id = ?",
+                (time.time(), scope, task_id))
+        return self._codec.loads(row[0])
+
+    def put(self, task_json, scope: str = ""):
+        """Stores a task if it is complete. Returns whether it was stored."""
+        if not self.is_complete(task_json):
+            return False
+        return self.put_many([task_json], scope) == 1
+
+    def put_many(self, tasks_json, scope: str = ""):
+        """Stores the complete tasks among tasks_json. Returns how many were stored."""
+        now = time.time()
+        rows = {}
+        for task_json in tasks_json:
+            if self.is_complete(task_json):
+                data = self._codec.dumps(task_json)
+                rows[str(task_json["id"])] = (scope, str(task_json["id"]),
+                                              data, len(data), now)
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            replaced = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM scoped_tasks "
+                f"WHERE scope = ? AND task_id IN ({','.join('?' * len(rows))})",
+                [scope, *rows]).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scoped_tasks "
+                "(scope, task_id, data, size, used_at) VALUES (?, ?, ?, ?, ?)",
+                rows.values())
+            self._size += sum(row[3] for row in rows.values()) - replaced
+            self._evict()
+        return len(rows)
+
+    def _evict(self):
+        # Drops the least recently used tasks until the cache fits
+        while self._size > self.max_bytes:
+            victims = self._conn.execute(
+                "SELECT scope, task_id, size FROM scoped_tasks "
+                "ORDER BY used_at LIMIT 100").fetchall()
+            if not victims:
+                break
+            freed = 0
+            for scope, task_id, size in victims:
+                self._conn.execute(
+                    "DELETE FROM scoped_tasks WHERE scope = ? AND task_id = ?",
+                    (scope, task_id))
+                self.evictions += 1
+                freed += size
+                if self._size - freed <= self.max_bytes:
+                    break
+            self._size -= freed
+
+    def invalidate(self, task_id: str):
+        """Drops a task from every scope."""
+        with self._lock, self._conn:
+            freed = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM scoped_tasks "
+                "WHERE task_id = ?", (task_id, )).fetchone()[0]
+            self._conn.execute("DELETE FROM scoped_tasks WHERE task_id = ?",
+                               (task_id, ))
+            self._size -= freed
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM scoped_tasks")
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def close(self):
+        self._conn.close()
+
+
+# Seconds that responses of each endpoint stay in a ResponseCache, by route
+# (see surge.instrumentation.endpoint_route). Other endpoints are not cached.
+DEFAULT_RESPONSE_TTLS = {
+    "projects/{id}": 60,
+    "projects/{id}/copies": 300,
+    "projects/blueprints": 300,
+    "teams/list": 60,
+    "teams/{id}": 60,
+}
+
+# Routes of requests that change data although they are sent as GET
+GET_WRITE_ROUTES = frozenset({"projects/{id}/delete"})
+
+# Writes to the first collection can change what the second returns, e.g.
+# updating a question changes the project that contains it
+RELATED_COLLECTIONS = {
+    "items": ("projects", ),
+}
+
+
+def is_write(method: str, api_endpoint: str):
+    """Whether a request can change data, and so must invalidate cached responses."""
+    return method != "get" or endpoint_route(api_endpoint) in GET_WRITE_ROUTES
+
+
+class ResponseCache(object):
+    """
+    Cache of parsed GET responses for read-mostly endpoints, in front of
+    APIResource.get. Entries expire after the TTL of their endpoint and the
+    least recently used ones are evicted beyond maxsize. Requests that write
+    through the SDK invalidate the entries they can affect.
+
+    Arguments:
+        ttls (dict, optional): Seconds to cache each route for, e.g. {"teams/{id}": 30}.
+            Defaults to DEFAULT_RESPONSE_TTLS.
+        maxsize (int, optional): Maximum number of cached responses.
+    """
+
+    def __init__(self, ttls: dict = None, maxsize: int = 10_000):
+        self.ttls = dict(DEFAULT_RESPONSE_TTLS if ttls is None else ttls)
+        # Hits and misses by route
+        self.stats = {}
+        self._cache = TTLCache(maxsize=maxsize)
+        # Incremented by every write, so that a response fetched while a
+        # write was in progress is not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"<surge.ResponseCache size={len(self._cache)} "
+                f"hits={self.hits} misses={self.misses}>")
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def hits(self):
+        return sum(stats["hits"] for stats in self.stats.values())
+
+    @property
+    def misses(self):
+        return sum(stats["misses"] for stats in self.stats.values())
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def _count(self, route, outcome):
+        with self._lock:
+            stats = self.stats.setdefault(route, {"hits": 0, "misses": 0})
+            stats[outcome] += 1
+
+    def get(self, route: str, key):
+        """Returns a copy of the cached response for key, or None."""
+        if route not in self.ttls:
+            return None
+        value = self._cache.get(key, _MISSING, record=False)
+        if value is _MISSING:
+            self._count(route, "misses")
+            return None
+        self._count(route, "hits")
+        return copy.deepcopy(value)
+
+    def set(self, route: str, key, value, generation: int = None):
+        """
+        Caches value for key, unless a write happened since `generation` was read.
+        """
+        ttl = self.ttls.get(route)
+        if ttl is None:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._cache.set(key, copy.deepcopy(value), ttl=ttl)
+
+    def invalidate_for_write(self, endpoint: str):
+        """
+        Drops the entries a write to endpoint can affect: those mentioning the
+        object ids in endpoint, and the collection-level entries (lists) of
+        the collections it belongs to.
+        """
+        segments = endpoint.strip("/").split("/")
+        collections = {segments[0], *RELATED_COLLECTIONS.get(segments[0], ())}
+        ids = {s for s in segments if ID_SEGMENT_PATTERN.search(s)}
+
+        def affected(key):
+            entry_segments = key[1].strip("/").split("/")
+            if entry_segments[0] not in collections:
+                return False
+            entry_ids = {
+                s
+                for s in entry_segments if ID_SEGMENT_PATTERN.search(s)
+            }
+            # Writes to another collection (e.g. items) or to a collection
+            # itself (e.g. creating a project) may affect any entry
+            if not entry_ids or not ids or segments[0] != entry_segments[0]:
+                return True
+            return bool(entry_ids & ids)
+
+        with self._lock:
+            self._generation += 1
+            self._cache.invalidate_where(affected)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.stats = {}
+
+
+class _Flight(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.followers = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight,
+    other callers with the same key wait for it and share its outcome instead
+    of making their own. Followers get deep copies of the leader's result, so
+    callers never share mutable objects.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"<surge.SingleFlight calls={self.calls} "
+                f"coalesced={self.coalesced}>")
+
+    def do(self, key, fn, timeout: float = None):
+        """
+        Returns fn(), or the result of an identical call already in flight.
+        A follower that waits longer than timeout seconds raises SurgeTimeoutError.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+                leader = True
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+                leader = False
+
+        if leader:
+            try:
+                result = fn()
+            except BaseException as err:
+                flight.error = err
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                    followers = flight.followers
+                # Copy before returning: the caller may modify its result
+                # while followers are copying theirs
+                if followers and flight.error is None:
+                    flight.result = copy.deepcopy(result)
+                flight.done.set()
+            return result
+
+        if not flight.done.wait(None if timeout is None else max(0, timeout)):
+            raise SurgeTimeoutError(
+                "Timed out waiting for an identical request in flight")
+        if flight.error is not None:
+            raise flight.error
+        return copy.deepcopy(flight.result)
+
+
+def content_hash(*parts):
+    """Returns a stable SHA-256 hex digest of JSON-serializable parts."""
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+_MISSING = object()
+
+# Results of Project.workable_by_surgers, keyed by (cache_scope, project_id,
+# surger_id) so that results are not shared across API keys or base URLs.
+# Project.update and Team.add_surgers / remove_surgers invalidate affected entries.
+eligibility_cache = TTLCache(ttl=DEFAULT_ELIGIBILITY_TTL, maxsize=500_000)
+
+# Results of Rubric.evaluate_many, keyed by a content hash of the inputs
+rubric_cache = TTLCache(maxsize=100_000)
+
+# Task objects returned by Task.retrieve_many, keyed by the cache_scope of the
+# request and the task id, so that each task is hydrated into a single shared
+# object per API key while it is in use
+task_identity_map = weakref.WeakValueDictionary()
+
+# GET requests in flight through the module-level configuration; see
+# surge.coalesce_gets
+single_flight = SingleFlight()
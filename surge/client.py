@@ -0,0 +1,237 @@
+import threading
+import weakref
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import surge
+from surge.api_resource import APIResource
+from surge.caching import (DEFAULT_ELIGIBILITY_TTL, ResponseCache,
+                           SingleFlight, TTLCache)
+from surge.errors import SurgeTimeoutError
+from surge.instrumentation import Hooks
+from surge.projects import Project
+from surge.questions import Question
+from surge.reports import Report
+from surge.rubrics import Rubric
+from surge.tasks import Task
+from surge.teams import Team
+from surge.timeouts import DeadlineRetry, DeadlineTimeout, remaining
+
+DEFAULT_POOL_SIZE = 10
+
+# Nested resource classes that are rebound along with their owner, e.g. so
+# that Project.list_tasks on a bound Project returns bound Tasks.
+NESTED_RESOURCES = ("Question", "Report", "Task")
+
+
+class RateLimiter(object):
+    """
+    Token bucket allowing `rate` requests per second on average, with bursts of
+    up to `burst` requests. `acquire` blocks until a request may be sent, or
+    raises a SurgeTimeoutError if that is after the current surge.deadline().
+    """
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<surge.RateLimiter rate={self.rate} burst={self.burst}>"
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            left = remaining()
+            if left is not None and wait >= left:
+                raise SurgeTimeoutError(
+                    "The rate limit allows no request before the deadline.")
+            time.sleep(wait)
+
+
+class _DeadlineAdapter(HTTPAdapter):
+    """HTTPAdapter whose retries are bounded by the current surge.deadline()."""
+
+    def send(self, request, timeout=None, **kwargs):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = DeadlineTimeout(connect=connect, read=read)
+        return super().send(request, timeout=timeout, **kwargs)
+
+
+def _bound_from_params(cls, params):
+    # Question.from_params picks the concrete Question subclass from the
+    # params, so bind whichever class it returns to the same client.
+    question = Question.from_params.__func__(cls, params)
+    question.__class__ = cls._client.bind(type(question))
+    return question
+
+
+class SurgeClient(object):
+    """
+    A Surge API client with its own API key, base URL, headers and connection pool.
+
+    Resources accessed through a client (`client.projects`, `client.tasks`, ...) behave
+    exactly like `surge.Project`, `surge.Task`, ... but send their requests with the
+    client's configuration instead of the module-level `surge.api_key`,
+    `surge.base_url` and `surge.default_headers`. Objects they return stay bound
+    to the client, so several clients can be used in parallel in one process.
+
+    Usage:
+        client = surge.SurgeClient(api_key="...")
+        project = client.projects.retrieve("076d207b-c207-41ca-b73a-5822fe2248ab")
+        tasks = project.list_tasks()
+
+    Arguments:
+        api_key (str, optional): API key. Defaults to `surge.api_key`.
+        base_url (str, optional): API base URL. Defaults to `surge.base_url`.
+        headers (dict, optional): Headers sent with every request. Defaults to `surge.default_headers`.
+        pool (int or requests.Session, optional): Maximum number of pooled connections,
+            or a Session to use as is.
+        retry (int or urllib3.util.Retry, optional): Retry policy passed to the HTTP adapter.
+            Retries stop once the current `surge.deadline()` has passed.
+        limiter (RateLimiter, optional): Object whose `acquire()` is called before each request.
+        timeout (float or tuple, optional): (connect, read) timeout in seconds for each request.
+            Defaults to `surge.timeout`.
+        json_codec (str, optional): "orjson", "ujson" or "json". Defaults to `surge.json_codec`.
+        gzip_threshold (int, optional): Gzip-compress request bodies of at least this many bytes.
+            Defaults to `surge.gzip_threshold`.
+        transport (surge.transports.Transport, optional): Sends the requests, e.g. a
+            RecordingTransport or ReplayTransport. Defaults to `surge.transport`.
+        coalesce_gets (bool, optional): Let concurrent identical GET requests share one request.
+            Defaults to `surge.coalesce_gets`.
+        response_cache (ResponseCache or bool, optional): Serve GET responses of read-mostly
+            endpoints from this cache; True creates one with the default TTLs.
+            Defaults to `surge.response_cache`.
+        task_cache (TaskCache, optional): Persistent cache of completed tasks used by
+            Task.retrieve and filled by Task.list. Defaults to `surge.task_cache`.
+    """
+
+    def __init__(self,
+                 api_key: str = None,
+                 base_url: str = None,
+                 headers: dict = None,
+                 pool=None,
+                 retry=None,
+                 limiter=None,
+                 timeout=None,
+                 json_codec: str = None,
+                 gzip_threshold: int = None,
+                 transport=None,
+                 coalesce_gets: bool = None,
+                 response_cache=None,
+                 task_cache=None):
+        self.api_key = api_key or surge.api_key
+        self.base_url = (base_url or surge.base_url).rstrip("/")
+        self.limiter = limiter
+        self.timeout = surge.timeout if timeout is None else timeout
+        self.json_codec = json_codec or surge.json_codec
+        self.gzip_threshold = (surge.gzip_threshold
+                               if gzip_threshold is None else gzip_threshold)
+        self.transport = transport or surge.transport
+        self.coalesce_gets = (surge.coalesce_gets
+                              if coalesce_gets is None else coalesce_gets)
+        self.single_flight = SingleFlight()
+        if response_cache is True:
+            response_cache = ResponseCache()
+        elif response_cache is None:
+            response_cache = surge.response_cache
+        # False disables a module-level cache for this client
+        self.response_cache = (None
+                               if response_cache is False else response_cache)
+        self.task_cache = (surge.task_cache
+                           if task_cache is None else task_cache)
+        # Tasks returned by Task.retrieve_many, keyed by (scope, id)
+        self.task_identity_map = weakref.WeakValueDictionary()
+        # Instrumentation callbacks for this client's requests only; see
+        # surge.instrumentation.Hooks
+        self.hooks = Hooks()
+
+        if isinstance(pool, requests.Session):
+            self.session = pool
+        else:
+            pool_size = pool or DEFAULT_POOL_SIZE
+            adapter = _DeadlineAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=DeadlineRetry.from_retry(retry))
+            self.session = requests.Session()
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self.session.headers.update(surge.default_headers if headers is
+                                    None else headers)
+
+        self.eligibility_cache = TTLCache(ttl=DEFAULT_ELIGIBILITY_TTL,
+                                          maxsize=500_000)
+        self.rubric_cache = TTLCache(maxsize=100_000)
+
+        self._bound = {}
+        self._bind_lock = threading.RLock()
+
+        self.projects = self.bind(Project)
+        self.tasks = self.bind(Task)
+        self.teams = self.bind(Team)
+        self.reports = self.bind(Report)
+        self.rubrics = self.bind(Rubric)
+        self.questions = self.bind(Question)
+
+    def __repr__(self):
+        return f"<surge.SurgeClient base_url=\"{self.base_url}\">"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def bind(self, resource_cls):
+        """
+        Returns a subclass of resource_cls whose requests go through this client.
+        """
+        if not issubclass(resource_cls, APIResource):
+            raise TypeError(f"{resource_cls!r} is not an APIResource")
+        if resource_cls._client is self:
+            return resource_cls
+
+        with self._bind_lock:
+            bound = self._bound.get(resource_cls)
+            if bound is not None:
+                return bound
+
+            namespace = {
+                "_client": self,
+                "__module__": resource_cls.__module__,
+                "__qualname__": resource_cls.__qualname__,
+            }
+            if hasattr(resource_cls, "eligibility_cache"):
+                namespace["eligibility_cache"] = self.eligibility_cache
+            if issubclass(resource_cls, Rubric):
+                namespace["cache"] = self.rubric_cache
+            if issubclass(resource_cls, Question):
+                namespace["from_params"] = classmethod(_bound_from_params)
+
+            bound = type(resource_cls.__name__, (resource_cls, ), namespace)
+            self._bound[resource_cls] = bound
+
+            for name in NESTED_RESOURCES:
+                nested = getattr(resource_cls, name, None)
+                if isinstance(nested, type) and issubclass(
+                        nested, APIResource):
+                    setattr(bound, name, self.bind(nested))
+            return bound
@@ -0,0 +1,147 @@
+import json
+import math
+
+import surge
+
+# Fastest first; the first codec whose library is installed is used by default
+CODEC_PREFERENCE = ("orjson", "ujson", "json")
+
+
+class JSONCodec(object):
+    """Encodes request bodies and decodes response bodies."""
+
+    name = None
+
+    def __repr__(self):
+        return f"<surge.JSONCodec {self.name}>"
+
+    def dumps(self, obj) -> bytes:
+        raise NotImplementedError
+
+    def dumps_str(self, obj) -> str:
+        return self.dumps(obj).decode("utf-8")
+
+    def loads(self, data):
+        raise NotImplementedError
+
+
+class StdlibJSONCodec(JSONCodec):
+    name = "json"
+
+    def dumps(self, obj) -> bytes:
+        return self.dumps_str(obj).encode("utf-8")
+
+    def dumps_str(self, obj) -> str:
+        # NaN and Infinity aren't valid JSON, so they are rejected like
+        # requests does, rather than sent as NaN or null
+        return json.dumps(obj, allow_nan=False)
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._fallback = StdlibJSONCodec()
+
+    def dumps(self, obj) -> bytes:
+        try:
+            body = self._orjson.dumps(obj,
+                                      option=self._orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # e.g. integers larger than 64 bits, which orjson rejects
+            return self._fallback.dumps(obj)
+        # orjson writes NaN and Infinity as null; only look for them when
+        # the body has a null
+        if b"null" in body:
+            _check_finite(obj)
+        return body
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+        self._fallback = StdlibJSONCodec()
+
+    def dumps(self, obj) -> bytes:
+        return self.dumps_str(obj).encode("utf-8")
+
+    def dumps_str(self, obj) -> str:
+        try:
+            return self._ujson.dumps(obj, ensure_ascii=False)
+        except (TypeError, OverflowError):
+            return self._fallback.dumps_str(obj)
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+
+def _check_finite(obj):
+    """Raises ValueError if obj contains NaN or an infinite float."""
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                raise ValueError(
+                    "Out of range float values are not JSON compliant")
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+
+CODECS = {
+    "orjson": OrjsonCodec,
+    "ujson": UjsonCodec,
+    "json": StdlibJSONCodec,
+}
+
+_instances = {}
+
+
+def available_codecs():
+    """Names of the codecs whose libraries are installed, fastest first."""
+    names = []
+    for name in CODEC_PREFERENCE:
+        try:
+            _load(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def _load(name):
+    codec = _instances.get(name)
+    if codec is None:
+        if name not in CODECS:
+            raise ValueError(f"Unknown JSON codec {name!r}. "
+                             f"Expected one of {sorted(CODECS)}.")
+        codec = _instances[name] = CODECS[name]()
+    return codec
+
+
+def get_codec(name: str = None):
+    """
+    Returns the codec called name, or the one configured with `surge.json_codec`.
+    When neither is set, the fastest installed codec is used.
+    """
+    name = name or surge.json_codec
+    if name is not None:
+        return _load(name)
+
+    codec = _instances.get(None)
+    if codec is None:
+        codec = _instances[None] = _load(available_codecs()[0])
+    return codec
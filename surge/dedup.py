@@ -0,0 +1,228 @@
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+
+
+def task_fingerprint(task_data) -> bytes:
+    """
+    SHA-256 digest of a task row's canonical JSON (sorted keys, no
+    whitespace), so rows with the same fields in any order match.
+    """
+    encoded = json.dumps(task_data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).digest()
+
+
+class BloomFilter(object):
+    """
+    Compact probabilistic set of fingerprints. It never misses a fingerprint
+    that was added, but reports about `error_rate` of new ones as already
+    seen. 10 million fingerprints at a 0.1% error rate take about 18 MB.
+
+    Arguments:
+        capacity (int): Number of fingerprints the filter is sized for.
+        error_rate (float, optional): False positive rate once capacity is reached.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(
+            8, int(-capacity * math.log(error_rate) / math.log(2)**2))
+        self.num_hashes = max(
+            1, round(self.num_bits / max(1, capacity) * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"<surge.BloomFilter capacity={self.capacity} "
+                f"bits={self.num_bits} hashes={self.num_hashes}>")
+
+    def _positions(self, fingerprint: bytes):
+        # Double hashing from two independent 64-bit parts of the digest
+        h1 = int.from_bytes(fingerprint[:8], "little")
+        h2 = int.from_bytes(fingerprint[8:16], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, fingerprint: bytes):
+        return all(self._bits[p >> 3] & (1 << (p & 7))
+                   for p in self._positions(fingerprint))
+
+    def add(self, fingerprint: bytes):
+        """Adds a fingerprint. Returns True if it was (probably) not seen before."""
+        added = False
+        with self._lock:
+            for p in self._positions(fingerprint):
+                mask = 1 << (p & 7)
+                if not self._bits[p >> 3] & mask:
+                    self._bits[p >> 3] |= mask
+                    added = True
+        return added
+
+
+class HashIndex(object):
+    """
+    Exact, persistent set of fingerprints backed by a SQLite file, so rows
+    uploaded by earlier runs are recognized too. Inserts are committed every
+    `commit_every` fingerprints and on `flush()` / `close()`.
+
+    Arguments:
+        path (str): SQLite file to store the fingerprints in. It is created if needed.
+        commit_every (int, optional): Number of new fingerprints per transaction.
+    """
+
+    def __init__(self, path: str, commit_every: int = 10_000):
+        self.path = path
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS fingerprints "
+                               "(fingerprint BLOB PRIMARY KEY) WITHOUT ROWID")
+
+    def __repr__(self):
+        return f"<surge.HashIndex path=\"{self.path}\">"
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def __contains__(self, fingerprint: bytes):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM fingerprints WHERE fingerprint = ?",
+                (fingerprint, )).fetchone() is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, fingerprint: bytes):
+        """Adds a fingerprint. Returns True if it was not seen before."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO fingerprints (fingerprint) VALUES (?)",
+                (fingerprint, ))
+            if cursor.rowcount == 0:
+                return False
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_every:
+                self._conn.commit()
+                self._uncommitted = 0
+            return True
+
+    def discard(self, fingerprint: bytes):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM fingerprints WHERE fingerprint = ?",
+                (fingerprint, ))
+            self._uncommitted += 1
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._conn.close()
+        self._closed = True
+
+
+class Deduplicator(object):
+    """
+    Drops task rows whose fields were already seen, before they are uploaded.
+
+    Rows are fingerprinted with `task_fingerprint` and checked against `seen`:
+    a BloomFilter (compact, in memory, may drop a few unique rows) or a
+    HashIndex (exact and persistent across runs). By default an in-memory
+    set is used, which is exact but takes about 100 bytes per distinct row.
+
+    A row let through is only pending until `commit()` records it in `seen`
+    once its task was created; `rollback()` lets the pending rows through
+    again. Use it as a context manager to roll back and close `seen` on exit.
+
+    Arguments:
+        seen (BloomFilter, HashIndex or set, optional): Fingerprints of the rows already uploaded.
+    """
+
+    def __init__(self, seen=None):
+        self.seen = set() if seen is None else seen
+        self.rows = 0
+        self.dropped = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<surge.Deduplicator rows={self.rows} dropped={self.dropped}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_new(self, task_data):
+        """
+        Counts a row. Returns False if an identical row was uploaded or is
+        pending, otherwise marks the row as pending.
+        """
+        fingerprint = task_fingerprint(task_data)
+        with self._lock:
+            self.rows += 1
+            if fingerprint in self._pending or fingerprint in self.seen:
+                self.dropped += 1
+                return False
+            self._pending.add(fingerprint)
+            return True
+
+    def filter(self, tasks_data):
+        """Lazily yields the rows of tasks_data that weren't seen before."""
+        for task_data in tasks_data:
+            if self.is_new(task_data):
+                yield task_data
+
+    def commit(self, tasks_data):
+        """Records rows whose tasks were created, so later runs drop them."""
+        with self._lock:
+            for task_data in tasks_data:
+                fingerprint = task_fingerprint(task_data)
+                self._pending.discard(fingerprint)
+                self.seen.add(fingerprint)
+
+    def forget(self, task_data):
+        """
+        Lets a row through again, e.g. after its upload failed. Rows can't be
+        removed from a BloomFilter once committed.
+        """
+        fingerprint = task_fingerprint(task_data)
+        with self._lock:
+            self._pending.discard(fingerprint)
+            discard = getattr(self.seen, "discard", None)
+            if discard is not None:
+                discard(fingerprint)
+
+    def rollback(self):
+        """Lets every pending row through again."""
+        with self._lock:
+            self._pending.clear()
+
+    def flush(self):
+        """Writes the committed fingerprints to a persistent `seen`."""
+        flush = getattr(self.seen, "flush", None)
+        if flush is not None:
+            flush()
+
+    def close(self):
+        self.rollback()
+        close = getattr(self.seen, "close", None)
+        if close is not None:
+            close()
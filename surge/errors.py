@@ -1,8 +1,12 @@
 class SurgeRequestError(Exception):
     """Catch-all exception for errors that occur when making a request"""
 
-    def __init__(self, message="Something went wrong with the API request."):
+    def __init__(self,
+                 message="Something went wrong with the API request.",
+                 status_code=None):
         self.message = message
+        # HTTP status of the response, if the server answered with an error
+        self.status_code = status_code
         super().__init__(self.message)
 
 
@@ -50,3 +54,24 @@ class SurgeTaskDataError(Exception):
     ):
         self.message = message
         super().__init__(self.message)
+
+
+class SurgeTaskValidationError(SurgeTaskDataError):
+    """Raise when task data fails client-side validation against a Project"""
+
+    def __init__(self, errors=None, message=None):
+        self.errors = errors or []
+        if message is None:
+            message = f"{len(self.errors)} invalid task(s): " + "; ".join(
+                f"row {index}: {', '.join(problems)}"
+                for index, problems in self.errors[:10])
+            if len(self.errors) > 10:
+                message += f"; ... and {len(self.errors) - 10} more"
+        super().__init__(message)
+
+
+class SurgeTimeoutError(SurgeRequestError):
+    """Raise when a request times out or a surge.deadline() has passed"""
+
+    def __init__(self, message="The request deadline was exceeded."):
+        super().__init__(message)
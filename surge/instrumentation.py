@@ -0,0 +1,308 @@
+import re
+import threading
+import time
+import warnings
+
+# Path segments that contain a digit (UUIDs, numeric ids) are replaced by
+# "{id}" so that metrics are grouped per endpoint rather than per object.
+ID_SEGMENT_PATTERN = re.compile(r"\d")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+
+
+def endpoint_route(api_endpoint: str):
+    """Returns the endpoint with object ids replaced, e.g. "projects/{id}/tasks"."""
+    return "/".join("{id}" if ID_SEGMENT_PATTERN.search(segment) else segment
+                    for segment in api_endpoint.split("/"))
+
+
+def server_time(response):
+    """
+    Server processing time in seconds, from the Server-Timing or X-Runtime
+    response headers, or None if the server didn't report it.
+    """
+    headers = response.headers
+    server_timing = headers.get("Server-Timing")
+    if server_timing:
+        total = 0.0
+        for metric in server_timing.split(","):
+            match = re.search(r"dur=([\d.]+)", metric)
+            if match:
+                total += float(match.group(1)) / 1000
+        return total
+    runtime = headers.get("X-Runtime")
+    if runtime:
+        try:
+            return float(runtime)
+        except ValueError:
+            return None
+    return None
+
+
+class RequestEvent(object):
+    """
+    Describes one API request. The same object is passed to the before_request,
+    after_response and on_error hooks, and is filled in as the request progresses.
+
+    Timings are in seconds:
+        headers: from sending the request until the response headers were parsed
+            (connection setup, upload and server time)
+        server: time the server reports it spent, when available
+        network: headers minus server, when server time is available
+        download: reading the response body
+        decode: parsing the JSON body
+        total: the whole request, as seen by the caller
+    """
+
+    def __init__(self, method: str, endpoint: str, url: str = None):
+        self.method = method
+        self.endpoint = endpoint
+        self.route = endpoint_route(endpoint)
+        self.url = url
+        self.status = None
+        self.bytes_sent = 0
+        # Size of the JSON body before gzip compression (see surge.gzip_threshold)
+        self.bytes_uncompressed = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.timings = {}
+        self.error = None
+        self.started_at = time.time()
+
+    def __repr__(self):
+        return (f"<surge.RequestEvent {self.method.upper()} {self.route} "
+                f"status={self.status} total={self.timings.get('total')}>")
+
+    @property
+    def bytes_saved(self):
+        """Request body bytes saved by gzip compression."""
+        return max(0, self.bytes_uncompressed - self.bytes_sent)
+
+    def record_response(self, response, started, received, decoded):
+        self.status = response.status_code
+        body = getattr(response.request, "body", None)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.bytes_sent = len(body) if isinstance(body, bytes) else 0
+        self.bytes_received = len(response.content or b"")
+        retries = getattr(getattr(response, "raw", None), "retries", None)
+        self.retries = len(getattr(retries, "history", None) or ())
+
+        headers_time = response.elapsed.total_seconds()
+        self.timings["headers"] = headers_time
+        self.timings["download"] = max(0.0, received - started - headers_time)
+        self.timings["decode"] = decoded - received
+        self.timings["total"] = decoded - started
+        server = server_time(response)
+        if server is not None:
+            self.timings["server"] = server
+            self.timings["network"] = max(0.0, headers_time - server)
+
+
+class Hooks(object):
+    """
+    Registry of instrumentation callbacks. Each callback is called with a RequestEvent.
+    Exceptions raised by callbacks are turned into warnings so that they never
+    break the request being observed.
+
+    The module-level `surge.instrumentation.hooks` observes every request;
+    a SurgeClient's `hooks` only observe that client's requests.
+    """
+
+    EVENTS = ("before_request", "after_response", "on_error")
+
+    def __init__(self):
+        self.before_request = []
+        self.after_response = []
+        self.on_error = []
+
+    def __bool__(self):
+        return bool(self.before_request or self.after_response
+                    or self.on_error)
+
+    def register(self,
+                 before_request=None,
+                 after_response=None,
+                 on_error=None):
+        """Add callbacks for any of the three events."""
+        for name, callback in zip(self.EVENTS,
+                                  (before_request, after_response, on_error)):
+            if callback is not None:
+                getattr(self, name).append(callback)
+
+    def unregister(self,
+                   before_request=None,
+                   after_response=None,
+                   on_error=None):
+        for name, callback in zip(self.EVENTS,
+                                  (before_request, after_response, on_error)):
+            if callback is not None and callback in getattr(self, name):
+                getattr(self, name).remove(callback)
+
+    def emit(self, name: str, event: RequestEvent):
+        for callback in list(getattr(self, name)):
+            try:
+                callback(event)
+            except Exception as err:
+                warnings.warn(
+                    f"Surge {name} hook {callback!r} failed: {err!r}")
+
+
+hooks = Hooks()
+
+
+class EndpointMetrics(object):
+    """Counters and a latency histogram for one (method, route) pair."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.statuses = {}
+
+    def observe(self, event: RequestEvent):
+        self.count += 1
+        if event.error is not None:
+            self.errors += 1
+        status = str(event.status) if event.status is not None else "error"
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes_sent += event.bytes_sent
+        self.bytes_saved += event.bytes_saved
+        self.bytes_received += event.bytes_received
+        self.retries += event.retries
+
+        seconds = event.timings.get("total")
+        if seconds is None:
+            return
+        self.total_seconds += seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_seconds": self.total_seconds,
+            "bytes_sent": self.bytes_sent,
+            "bytes_saved": self.bytes_saved,
+            "bytes_received": self.bytes_received,
+            "retries": self.retries,
+            "statuses": dict(self.statuses),
+            "buckets": dict(zip(self.buckets, self.bucket_counts)),
+        }
+
+
+class MetricsCollector(object):
+    """
+    In-memory metrics for Surge API requests: per-endpoint request counts,
+    errors, bytes, retries and latency histograms.
+
+    Usage:
+        metrics = MetricsCollector().install()
+        ...
+        print(metrics.to_prometheus())
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.endpoints = {}
+        self._lock = threading.Lock()
+        self._hooks = None
+
+    def __repr__(self):
+        return f"<surge.MetricsCollector endpoints={len(self.endpoints)}>"
+
+    def install(self, hooks_to_use: Hooks = None):
+        """Start collecting from hooks_to_use (the module-level hooks by default)."""
+        self._hooks = hooks_to_use if hooks_to_use is not None else hooks
+        self._hooks.register(after_response=self.record, on_error=self.record)
+        return self
+
+    def uninstall(self):
+        if self._hooks is not None:
+            self._hooks.unregister(after_response=self.record,
+                                   on_error=self.record)
+            self._hooks = None
+
+    def record(self, event: RequestEvent):
+        key = (event.method, event.route)
+        with self._lock:
+            metrics = self.endpoints.get(key)
+            if metrics is None:
+                metrics = self.endpoints[key] = EndpointMetrics(self.buckets)
+            metrics.observe(event)
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+
+    def snapshot(self):
+        """Returns the collected metrics as a dict keyed by "METHOD route"."""
+        with self._lock:
+            return {
+                f"{method.upper()} {route}": metrics.to_dict()
+                for (method, route), metrics in self.endpoints.items()
+            }
+
+    def to_prometheus(self, prefix: str = "surge_client"):
+        """Returns the collected metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        with self._lock:
+            items = sorted(self.endpoints.items())
+
+            header("request_duration_seconds", "histogram",
+                   "Duration of Surge API requests.")
+            for (method, route), metrics in items:
+                labels = f'method="{method}",endpoint="{route}"'
+                for bound, count in zip(metrics.buckets,
+                                        metrics.bucket_counts):
+                    lines.append(f"{prefix}_request_duration_seconds_bucket"
+                                 f'{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{prefix}_request_duration_seconds_bucket"
+                             f'{{{labels},le="+Inf"}} {metrics.count}')
+                lines.append(f"{prefix}_request_duration_seconds_sum"
+                             f"{{{labels}}} {metrics.total_seconds}")
+                lines.append(f"{prefix}_request_duration_seconds_count"
+                             f"{{{labels}}} {metrics.count}")
+
+            header("requests_total", "counter",
+                   "Surge API requests by response status.")
+            for (method, route), metrics in items:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(
+                        f"{prefix}_requests_total"
+                        f'{{method="{method}",endpoint="{route}",status="{status}"}} {count}'
+                    )
+
+            for name, attribute, help_text in (
+                ("request_errors_total", "errors",
+                 "Surge API requests that raised an error."),
+                ("request_bytes_sent_total", "bytes_sent",
+                 "Request body bytes sent to the Surge API."),
+                ("request_bytes_saved_total", "bytes_saved",
+                 "Request body bytes saved by gzip compression."),
+                ("request_bytes_received_total", "bytes_received",
+                 "Response body bytes received from the Surge API."),
+                ("request_retries_total", "retries",
+                 "Retries made by the HTTP adapter."),
+            ):
+                header(name, "counter", help_text)
+                for (method, route), metrics in items:
+                    lines.append(
+                        f'{prefix}_{name}{{method="{method}",endpoint="{route}"}} '
+                        f"{getattr(metrics, attribute)}")
+
+        return "\n".join(lines) + "\n"
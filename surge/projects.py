@@ -9,9 +9,12 @@ from surge.errors import (
     SurgeMissingAttributeError,
 )
 from surge.api_resource import PROJECTS_ENDPOINT, APIResource
+from surge.bulk import DEFAULT_MAX_WORKERS, bounded_map
+from surge.caching import eligibility_cache
 from surge.questions import Question
 from surge.reports import Report
 from surge.tasks import Task
+from surge.validation import TaskValidator
 from surge import utils
 
 
@@ -20,6 +23,8 @@ class Project(APIResource):
     Question = Question
     Report = Report
     Task = Task
+    TaskValidator = TaskValidator
+    eligibility_cache = eligibility_cache
 
     def __init__(self, **kwargs):
         super().__init__()
@@ -332,38 +337,158 @@ class Project(APIResource):
                               per_page=per_page,
                               api_key=api_key)
 
+    def task_validator(self):
+        """
+        Compiles a TaskValidator from this project's fields template and questions.
+
+        Returns:
+            validator: TaskValidator object
+        """
+        return self.TaskValidator.from_project(self)
+
+    def validate_tasks(self, tasks_data):
+        """
+        Checks task rows against this project without making any requests.
+
+        Arguments:
+            tasks_data (iterable): dicts that map each task field to its value. Consumed lazily.
+
+        Returns:
+            errors (list): list of (row_index, problems) tuples, one for each invalid row.
+        """
+        return self.task_validator().validate(tasks_data)
+
     def create_tasks(self,
                      tasks_data: list,
                      launch=False,
-                     api_key: str = None):
+                     api_key: str = None,
+                     validate: bool = False):
         """
         Creates new Task objects for this project.
 
         Arguments:
             tasks_data (list): list of dicts that map each task field to its value
                 e.g. [{"website": "surgehq.ai"}, {"website":"twitch.tv"}]
+            validate (bool, optional): Check every row against the project locally before uploading.
 
         Returns:
             tasks (list): list of Task objects
         """
+        validator = self.task_validator() if validate else None
         return self.Task.create_many(self.id,
                                      tasks_data,
                                      launch,
-                                     api_key=api_key)
+                                     api_key=api_key,
+                                     validator=validator)
 
-    def create_tasks_from_csv(self, file_path: str, api_key: str = None):
+    def create_tasks_in_chunks(self,
+                               tasks_data,
+                               launch=False,
+                               chunker=None,
+                               dedup=None,
+                               api_key: str = None):
+        """
+        Creates new Task objects for this project, uploading them in adaptively sized chunks.
+        See `Task.create_in_chunks`.
+
+        Arguments:
+            tasks_data (iterable): dicts that map each task field to its value, read lazily.
+            chunker (AdaptiveChunker, optional): Chooses the chunk sizes and records its decisions.
+            dedup (Deduplicator, optional): Drops rows identical to ones already uploaded.
+
+        Returns:
+            result: BulkResult with the created Task objects and any failures.
+        """
+        return self.Task.create_in_chunks(self.id,
+                                          tasks_data,
+                                          launch,
+                                          chunker=chunker,
+                                          dedup=dedup,
+                                          api_key=api_key)
+
+    def create_tasks_streaming(self,
+                               tasks_data,
+                               launch=False,
+                               max_workers: int = DEFAULT_MAX_WORKERS,
+                               queue_size: int = None,
+                               chunker=None,
+                               dedup=None,
+                               api_key: str = None):
+        """
+        Creates new Task objects for this project from an iterator of any size, uploading
+        chunks concurrently. See `Task.create_streaming`.
+
+        Arguments:
+            tasks_data (iterable): dicts that map each task field to its value, read lazily.
+            max_workers (int, optional): Number of upload threads.
+            queue_size (int, optional): Maximum number of chunks waiting to be uploaded.
+            chunker (AdaptiveChunker, optional): Chooses the chunk sizes and records its decisions.
+            dedup (Deduplicator, optional): Drops rows identical to ones already uploaded.
+
+        Returns:
+            created (generator): (task_data, task_id) pairs, in the order they were committed.
+        """
+        return self.Task.create_streaming(self.id,
+                                          tasks_data,
+                                          launch,
+                                          max_workers=max_workers,
+                                          queue_size=queue_size,
+                                          chunker=chunker,
+                                          dedup=dedup,
+                                          api_key=api_key)
+
+    def create_tasks_from_csv(self,
+                              file_path: str,
+                              api_key: str = None,
+                              validate: bool = False):
         """
         Creates new Task objects for this project from a local CSV file.
         The header of the CSV file must specify the fields that are used in your Tasks.
 
         Arguments:
             file_path (str): path to CSV file.
+            validate (bool, optional): Check every row against the project locally before uploading.
 
         Returns:
             tasks (list): list of Task objects
         """
         tasks_data = utils.load_tasks_data_from_csv(file_path)
-        return self.create_tasks(tasks_data, api_key=api_key)
+        return self.create_tasks(tasks_data,
+                                 api_key=api_key,
+                                 validate=validate)
+
+    def set_gold_standards_from_csv(self,
+                                    file_path: str,
+                                    task_id_column: str = "task_id",
+                                    answer_columns: list = None,
+                                    max_workers: int = DEFAULT_MAX_WORKERS,
+                                    api_key: str = None):
+        """
+        Set gold standard answers for tasks in this project from a local CSV file.
+        The file is streamed, so it can be larger than memory.
+
+        Arguments:
+            file_path (str): path to CSV file.
+            task_id_column (str, optional): Column holding the task ID.
+            answer_columns (list, optional): Columns holding the answers, in question order.
+                Defaults to every other column, in the order of the CSV header.
+            max_workers (int, optional): Maximum number of requests in flight.
+
+        Returns:
+            result: BulkResult with the updated Task objects and any failures.
+        """
+
+        def gold_standards():
+            for row in utils.iter_tasks_data_from_csv(file_path):
+                columns = answer_columns or [
+                    key for key in row.keys() if key != task_id_column
+                ]
+                yield row[task_id_column], [row[c] for c in columns]
+
+        return self.Task.set_gold_standards(self.id,
+                                            gold_standards(),
+                                            max_workers=max_workers,
+                                            api_key=api_key)
 
     def update(
         self,
@@ -415,8 +540,17 @@ class Project(APIResource):
 
         endpoint = f"{PROJECTS_ENDPOINT}/{self.id}"
         response_json = self.put(endpoint, params, api_key=api_key)
+        # Drop the project's entries for every API key, as in TaskCache.invalidate
+        self.eligibility_cache.invalidate_where(lambda key: key[1] == self.id)
         return self.__class__(**response_json)
 
+    @classmethod
+    def _fetch_workable(cls, project_id, surger_id, api_key: str = None):
+        endpoint = f"{PROJECTS_ENDPOINT}/{project_id}/workable_by_surger"
+        params = {"surger_id": surger_id}
+        response_json = cls.get(endpoint, params, api_key=api_key)
+        return response_json.get("workable", False)
+
     def workable_by_surger(self, surger_id, api_key: str = None):
         """
         Checks if a specific Surger can work on this project.
@@ -427,10 +561,55 @@ class Project(APIResource):
         Returns:
             workable (bool): True if surger can work on this project, False otherwise.
         """
-        endpoint = f"{PROJECTS_ENDPOINT}/{self.id}/workable_by_surger"
-        params = {"surger_id": surger_id}
-        response_json = self.get(endpoint, params, api_key=api_key)
-        return response_json.get("workable", False)
+        return self._fetch_workable(self.id, surger_id, api_key=api_key)
+
+    @classmethod
+    def workable_by_surgers(cls,
+                            projects,
+                            surger_ids,
+                            max_workers: int = DEFAULT_MAX_WORKERS,
+                            use_cache: bool = True,
+                            api_key: str = None):
+        """
+        Checks which Surgers can work on which projects, for every (project, surger) pair.
+
+        Pairs are checked concurrently, and results are memoized in `Project.eligibility_cache`
+        for a few minutes. Entries are invalidated when `Project.update`, `Team.add_surgers`
+        or `Team.remove_surgers` are called.
+
+        Arguments:
+            projects (list): Project objects or project IDs.
+            surger_ids (list): IDs of surgers.
+            max_workers (int, optional): Maximum number of requests in flight.
+            use_cache (bool, optional): Set to False to ignore and not update the cache.
+
+        Returns:
+            workable (dict): maps each (project_id, surger_id) pair to True or False.
+        """
+        project_ids = [getattr(p, "id", p) for p in projects]
+        surger_ids = list(surger_ids)
+        scope = cls._cache_scope(api_key)
+        results = {}
+        missing = []
+        for project_id in dict.fromkeys(project_ids):
+            for surger_id in dict.fromkeys(surger_ids):
+                key = (project_id, surger_id)
+                workable = cls.eligibility_cache.get(
+                    (scope, *key)) if use_cache else None
+                if workable is None:
+                    missing.append(key)
+                else:
+                    results[key] = workable
+
+        for key, workable, error in bounded_map(
+                lambda key: cls._fetch_workable(*key, api_key=api_key),
+                missing, max_workers):
+            if error is not None:
+                raise error
+            results[key] = workable
+            if use_cache:
+                cls.eligibility_cache.set((scope, *key), workable)
+        return results
 
     def save_report(
         self,
@@ -207,7 +207,7 @@ class Question(APIResource):
 
         endpoint = f"{QUESTIONS_ENDPOINT}/{self.id}"
         response_json = self.put(endpoint, params, api_key=api_key)
-        return Question.from_params(response_json)
+        return self.from_params(response_json)
 
 
 class FreeResponseQuestion(Question):
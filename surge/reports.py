@@ -4,11 +4,13 @@ import urllib
 import tempfile
 import shutil
 import io
-import json
 import warnings
 
+import surge
 from surge.api_resource import REPORTS_ENDPOINT, APIResource
+from surge.codec import get_codec
 from surge.errors import SurgeRequestError
+from surge.timeouts import check_deadline, request_timeout
 
 
 class Report(APIResource):
@@ -58,7 +60,9 @@ class Report(APIResource):
                 default_file_name = (
                     "project_{project_id}_results.{file_ext}.gzip".format(
                         project_id=project_id, file_ext=file_ext))
-                with urllib.request.urlopen(response.url) as response:
+                _, read_timeout = request_timeout(cls._timeout())
+                with urllib.request.urlopen(response.url,
+                                            timeout=read_timeout) as response:
                     with tempfile.NamedTemporaryFile() as tmp_file:
                         shutil.copyfileobj(response, tmp_file)
                         tmp_file.flush()
@@ -77,9 +81,11 @@ class Report(APIResource):
                             file.close()
                 return data
 
-            # Wait two seconds before polling again
+            # Wait two seconds before polling again, or less if the current
+            # surge.deadline() expires sooner
             elif response.status == "CREATING":
-                sleep(2)
+                left = check_deadline()
+                sleep(2 if left is None else min(2, left))
                 continue
             else:
                 raise ValueError(
@@ -90,6 +96,16 @@ class Report(APIResource):
             "Report failed to generate within {poll_time} seconds".format(
                 poll_time=poll_time))
 
+    @classmethod
+    def _timeout(cls):
+        client = cls._client
+        return client.timeout if client is not None else surge.timeout
+
+    @classmethod
+    def _json_codec(cls):
+        client = cls._client
+        return client.json_codec if client is not None else None
+
     @classmethod
     def download_json(cls,
                       project_id: str,
@@ -113,8 +129,7 @@ class Report(APIResource):
             poll_time=poll_time,
             api_key=api_key,
         )
-        bytesio.seek(0)
-        return json.load(bytesio)
+        return get_codec(cls._json_codec()).loads(bytesio.getvalue())
 
     @classmethod
     def request(cls, project_id: str, type: str, api_key: str = None):
@@ -1,8 +1,55 @@
+import json
+import os
+import time
+
 from surge.api_resource import APIResource
+from surge.bulk import DEFAULT_MAX_WORKERS, Checkpoint, bounded_map
+from surge.caching import content_hash, rubric_cache
+
+
+class RubricScore(object):
+    """Aggregated result of grading one text against several rubrics."""
+
+    def __init__(self, text_for_grading: str, results: dict, elapsed: float):
+        self.text_for_grading = text_for_grading
+        self.results = results
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (f"<surge.RubricScore score={self.score:.2f} "
+                f"passed={len(self.passed)}/{len(self.results)} "
+                f"elapsed={self.elapsed:.2f}s>")
+
+    @property
+    def passed(self):
+        return [name for name, r in self.results.items() if r["answer"]]
+
+    @property
+    def failed(self):
+        return [name for name, r in self.results.items() if not r["answer"]]
+
+    @property
+    def score(self):
+        """Fraction of rubrics the text meets, between 0 and 1."""
+        return len(self.passed) / len(self.results) if self.results else 0.0
+
+    @property
+    def latencies(self):
+        """Seconds taken by each rubric's evaluation request."""
+        return {name: r["latency"] for name, r in self.results.items()}
+
+    def to_dict(self):
+        return {
+            "score": self.score,
+            "elapsed": self.elapsed,
+            "results": self.results,
+        }
 
 
 class Rubric(APIResource):
 
+    cache = rubric_cache
+
     @classmethod
     def evaluate(
         cls,
@@ -35,3 +82,233 @@ class Rubric(APIResource):
 
         response_json = cls.post(endpoint, params, api_key=api_key)
         return response_json
+
+    @classmethod
+    def evaluate_criteria(
+        cls,
+        text_for_grading: str,
+        rubrics,
+        prompt: str = None,
+        max_workers: int = None,
+        api_key: str = None,
+    ):
+        """
+        Evaluate one text against many rubrics concurrently, so the total latency
+        is close to that of the slowest evaluation rather than the sum of all of them.
+
+        Arguments:
+            text_for_grading (str): The text content to be graded.
+            rubrics (list or dict): rubric texts, or a dict mapping criterion names to rubric texts.
+            prompt (str, optional): Additional instructions for how to grade the text.
+            max_workers (int, optional): Maximum number of requests in flight.
+                Defaults to one per rubric.
+
+        Returns:
+            score: RubricScore with the answer, explanation and latency of each criterion.
+        """
+        if not isinstance(rubrics, dict):
+            rubrics = {rubric_text: rubric_text for rubric_text in rubrics}
+
+        def evaluate_timed(rubric_text):
+            start = time.monotonic()
+            response = cls.evaluate(text_for_grading,
+                                    rubric_text,
+                                    prompt=prompt,
+                                    api_key=api_key)
+            return response, time.monotonic() - start
+
+        start = time.monotonic()
+        results = {}
+        for name, timed_response, error in bounded_map(
+                lambda name: evaluate_timed(rubrics[name]), rubrics,
+                max_workers or len(rubrics)):
+            if error is not None:
+                raise error
+            response, latency = timed_response
+            results[name] = {
+                "answer": response.get("answer"),
+                "explanation": response.get("explanation"),
+                "latency": latency,
+            }
+        return RubricScore(text_for_grading, results, time.monotonic() - start)
+
+    @staticmethod
+    def _normalize_item(item):
+        if isinstance(item, dict):
+            return (item["text_for_grading"], item["rubric_text"],
+                    item.get("prompt"))
+        text_for_grading, rubric_text, *prompt = item
+        return (text_for_grading, rubric_text, prompt[0] if prompt else None)
+
+    @classmethod
+    def evaluate_many(
+        cls,
+        items,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        cache=None,
+        raise_on_error: bool = True,
+        api_key: str = None,
+    ):
+        """
+        Evaluate many texts against rubrics concurrently.
+
+        Identical (text_for_grading, rubric_text, prompt) items are only graded once, and
+        results are stored in a cache keyed by a hash of the inputs so that they are never
+        graded again. By default the in-memory `Rubric.cache` is used; pass a
+        `surge.caching.DiskCache` to keep results across runs, or `cache=False` to disable caching.
+
+        Arguments:
+            items (iterable): dicts with `text_for_grading`, `rubric_text` and optionally `prompt`,
+                or (text_for_grading, rubric_text[, prompt]) tuples.
+            max_workers (int, optional): Maximum number of requests in flight.
+            cache (optional): TTLCache or DiskCache to use, or False to disable caching.
+            raise_on_error (bool, optional): If False, a failed evaluation is returned as its
+                exception instead of being raised.
+
+        Returns:
+            list: One result dict (see `evaluate`) per item, in input order.
+        """
+        if cache is None:
+            cache = cls.cache
+        use_cache = cache is not False
+        keyed_items = [(content_hash(*item), item)
+                       for item in map(cls._normalize_item, items)]
+
+        results = {}
+        to_grade = {}
+        for key, item in keyed_items:
+            if key in results or key in to_grade:
+                continue
+            cached = cache.get(key) if use_cache else None
+            if cached is not None:
+                results[key] = cached
+            else:
+                to_grade[key] = item
+
+        for (key, item), response, error in bounded_map(
+                lambda pair: cls.evaluate(*pair[1], api_key=api_key),
+                to_grade.items(), max_workers):
+            if error is not None:
+                if raise_on_error:
+                    raise error
+                results[key] = error
+                continue
+            results[key] = response
+            if use_cache:
+                cache.set(key, response)
+
+        return [results[key] for key, _ in keyed_items]
+
+    @classmethod
+    def _evaluate_cached(cls, item, cache, api_key: str = None):
+        key = content_hash(*item)
+        if cache is not False:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        response = cls.evaluate(*item, api_key=api_key)
+        if cache is not False:
+            cache.set(key, response)
+        return response
+
+    @classmethod
+    def grade_jsonl(
+        cls,
+        input_path: str,
+        output_path: str,
+        rubrics,
+        text_key: str = "text",
+        prompt: str = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        checkpoint_path: str = None,
+        cache=None,
+        api_key: str = None,
+    ):
+        """
+        Grade every text in a JSONL file against one or more rubrics and write the results to another JSONL file.
+
+        The input is read lazily and evaluations run concurrently, but output lines are
+        written and flushed in input order, one per input line:
+
+            {"line": 0, "id": ..., "results": [{"rubric": ..., "answer": ..., "explanation": ...}, ...]}
+
+        The `id` of the input record is copied when present. If `checkpoint_path` is set, progress
+        is saved there and a rerun resumes after the last line written, truncating any output
+        written after the checkpoint so no line is duplicated. A failed evaluation stops the run.
+
+        Arguments:
+            input_path (str): JSONL file with one record per line.
+            output_path (str): JSONL file the results are written to.
+            rubrics (list or dict): rubric texts, or a dict mapping rubric names to rubric texts.
+            text_key (str, optional): Key of the text to grade in each input record.
+            prompt (str, optional): Additional instructions for how to grade the texts.
+            max_workers (int, optional): Maximum number of requests in flight.
+            checkpoint_path (str, optional): File used to save and resume progress.
+            cache (optional): TTLCache or DiskCache to use, or False to disable caching.
+                Defaults to `Rubric.cache`.
+
+        Returns:
+            int: Number of input lines graded by this run.
+        """
+        if not isinstance(rubrics, dict):
+            rubrics = {rubric_text: rubric_text for rubric_text in rubrics}
+        rubrics = list(rubrics.items())
+        if cache is None:
+            cache = cls.cache
+
+        checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+        offset = checkpoint.offset if checkpoint else 0
+        if offset == 0:
+            open(output_path, "w").close()
+        else:
+            os.truncate(output_path, checkpoint.state["output_position"])
+
+        def evaluations():
+            with open(input_path, "rb") as input_file:
+                input_file.seek(
+                    checkpoint.state.get("input_position", 0) if offset else 0)
+                line = offset
+                for raw_line in iter(input_file.readline, b""):
+                    if not raw_line.strip():
+                        continue
+                    record = json.loads(raw_line)
+                    position = input_file.tell()
+                    for index, (name, rubric_text) in enumerate(rubrics):
+                        yield (line, record, position, index, name,
+                               (record[text_key], rubric_text, prompt))
+                    line += 1
+
+        graded = 0
+        results = []
+        try:
+            with open(output_path, "a") as output:
+                for (line, record, position, index, name,
+                     item), response, error in bounded_map(
+                         lambda e: cls._evaluate_cached(e[5], cache, api_key),
+                         evaluations(), max_workers):
+                    if error is not None:
+                        raise error
+                    results.append({
+                        "rubric": name,
+                        "answer": response.get("answer"),
+                        "explanation": response.get("explanation"),
+                    })
+                    if index < len(rubrics) - 1:
+                        continue
+
+                    output_record = {"line": line}
+                    if isinstance(record, dict) and "id" in record:
+                        output_record["id"] = record["id"]
+                    output_record["results"] = results
+                    output.write(json.dumps(output_record) + "\n")
+                    output.flush()
+                    results = []
+                    graded += 1
+                    if checkpoint:
+                        checkpoint.advance(line + 1,
+                                           input_position=position,
+                                           output_position=output.tell())
+        finally:
+            if checkpoint:
+                checkpoint.save()
+        return graded
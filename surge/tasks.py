@@ -1,7 +1,18 @@
+import threading
+import time
+from collections import deque
+
 import dateutil.parser
 
-from surge.errors import SurgeMissingIDError, SurgeTaskDataError
+import surge
+from surge import caching
+from surge.dedup import Deduplicator
+from surge.errors import (SurgeMissingIDError, SurgeTaskDataError,
+                          SurgeTimeoutError)
 from surge.api_resource import PROJECTS_ENDPOINT, TASKS_ENDPOINT, APIResource
+from surge.bulk import (DEFAULT_MAX_WORKERS, AdaptiveChunker, BulkResult,
+                        Checkpoint, bounded_map, pipelined_upload)
+from surge import utils
 from surge.responses import TaskResponse
 
 
@@ -66,9 +77,52 @@ class Task(APIResource):
             'answers': gold_standard_answers
         }
         response_json = self.post(endpoint, data, api_key=api_key)
+        self._invalidate_cached()
         self.__dict__.update(response_json)
         return self
 
+    @classmethod
+    def set_gold_standards(cls,
+                           project_id: str,
+                           gold_standards,
+                           max_workers: int = DEFAULT_MAX_WORKERS,
+                           api_key: str = None):
+        '''
+        Set gold standard answers for many tasks, with bounded concurrency.
+
+        Arguments:
+            project_id (str): ID of the project the tasks belong to.
+            gold_standards (dict or iterable): Maps each task to its gold standard answers, either as a
+                dict or as an iterable of (task, answers) pairs, which is consumed lazily.
+                A task can be a Task object, which is updated in place, or a task ID.
+                Answers are a list with one answer per question, or a dict with the keyword
+                arguments of `set_gold_standard` (`gold_standard_answers`, `is_gold_standard`, `explanations`).
+            max_workers (int, optional): Maximum number of requests in flight.
+
+        Returns:
+            result: BulkResult whose `succeeded` holds the updated Task objects and whose
+                `failed` holds (task, error) pairs.
+        '''
+        if isinstance(gold_standards, dict):
+            gold_standards = gold_standards.items()
+
+        def set_one(pair):
+            task, answers = pair
+            if not isinstance(task, Task):
+                task = cls(id=task, project_id=project_id)
+            if isinstance(answers, dict):
+                return task.set_gold_standard(**answers, api_key=api_key)
+            return task.set_gold_standard(answers, api_key=api_key)
+
+        result = BulkResult()
+        for (task, _), updated, error in bounded_map(set_one, gold_standards,
+                                                     max_workers):
+            if error is None:
+                result.add_success(updated)
+            else:
+                result.add_failure(task, error)
+        return result.finish()
+
     def create_response(self, answers, worker_id=None, api_key: str = None):
         '''
         Add a worker response for this task.
@@ -81,7 +135,114 @@ class Task(APIResource):
             raise SurgeMissingIDError
         endpoint = f"{TASKS_ENDPOINT}/{self.id}/create-response"
         data = {'answers': answers, 'worker_id': worker_id}
-        return self.post(endpoint, data, api_key=api_key)
+        response_json = self.post(endpoint, data, api_key=api_key)
+        self._invalidate_cached()
+        return response_json
+
+    def _invalidate_cached(self):
+        task_cache = self._task_cache()
+        if task_cache is not None:
+            task_cache.invalidate(str(self.id))
+
+    @classmethod
+    def create_responses(cls,
+                         project_id: str,
+                         records,
+                         max_workers: int = DEFAULT_MAX_WORKERS,
+                         checkpoint_path: str = None,
+                         save_every: int = 1,
+                         api_key: str = None):
+        '''
+        Add worker responses for many tasks, e.g. to ingest model predictions.
+
+        Records are read lazily and at most a few per worker are held in memory.
+        If `checkpoint_path` is set, each record is saved there as processed as soon as its
+        request finishes, along with the positions of the records that failed. A rerun with
+        the same input and checkpoint retries the failed records and skips the others.
+
+        Creating a response isn't idempotent: a record is posted again on resume if the run
+        was killed after its request but before the checkpoint was saved. With the default
+        `save_every=1` that is at most one record per worker; a larger value saves less often
+        and can duplicate up to `save_every` more responses.
+
+        Arguments:
+            project_id (str): ID of the project the tasks belong to.
+            records (iterable or str): dicts with `task_id`, `answers` and optionally `worker_id`,
+                or the path to a JSONL file containing one such record per line.
+            max_workers (int, optional): Maximum number of requests in flight.
+            checkpoint_path (str, optional): File used to save and resume progress.
+            save_every (int, optional): Number of finished records between checkpoint saves.
+
+        Returns:
+            result: BulkResult whose `succeeded` holds the API responses and whose
+                `failed` holds (record, error) pairs.
+        '''
+        if isinstance(records, str):
+            records = utils.iter_jsonl(records)
+
+        checkpoint = (Checkpoint(checkpoint_path, save_every=save_every)
+                      if checkpoint_path else None)
+        state = checkpoint.state if checkpoint else {}
+        offset = checkpoint.offset if checkpoint else 0
+        # Positions of the records that failed, in this run or an earlier one,
+        # and of the records after offset that were already processed
+        failed = set(state.get("failed", []))
+        completed = set(state.get("completed", []))
+        retry = set(failed)
+        lock = threading.Lock()
+
+        def pending():
+            for index, record in enumerate(records):
+                if (index >= offset
+                        and index not in completed) or index in retry:
+                    yield index, record
+
+        def finished(index, error):
+            # Called by the workers as each request finishes, so that requests
+            # in flight when the run is interrupted are saved too
+            nonlocal offset
+            with lock:
+                if error is None:
+                    failed.discard(index)
+                else:
+                    failed.add(index)
+                if index >= offset:
+                    completed.add(index)
+                while offset in completed:
+                    completed.remove(offset)
+                    offset += 1
+                if checkpoint:
+                    checkpoint.advance(offset,
+                                       failed=sorted(failed),
+                                       completed=sorted(completed))
+
+        def create_one(indexed):
+            index, record = indexed
+            task = cls(id=record["task_id"], project_id=project_id)
+            try:
+                response = task.create_response(
+                    record["answers"],
+                    worker_id=record.get("worker_id"),
+                    api_key=api_key)
+            except Exception as err:
+                finished(index, err)
+                raise
+            finished(index, None)
+            return response
+
+        result = BulkResult()
+        try:
+            for (_, record), response, error in bounded_map(
+                    create_one, pending(), max_workers):
+                if error is None:
+                    result.add_success(response)
+                else:
+                    result.add_failure(record, error)
+        finally:
+            if checkpoint:
+                with lock:
+                    checkpoint.save()
+        return result.finish()
 
     @classmethod
     def create(cls, project_id: str, api_key: str = None, **params):
@@ -105,7 +266,8 @@ class Task(APIResource):
                     project_id: str,
                     tasks_data: list,
                     launch: bool,
-                    api_key: str = None):
+                    api_key: str = None,
+                    validator=None):
         '''
         Creates new Task objects for a given project.
 
@@ -113,6 +275,8 @@ class Task(APIResource):
             project_id (str): ID of the project to which the tasks are added.
             tasks_data (list): list of dicts that map each task field to its value.
                 e.g. [{"website": "surgehq.ai"}, {"website":"twitch.tv"}]
+            validator (TaskValidator, optional): If set, every row is checked locally
+                and a SurgeTaskValidationError listing all invalid rows is raised before any request is made.
 
         Returns:
             tasks (list): list of Task objects
@@ -120,6 +284,9 @@ class Task(APIResource):
         if type(tasks_data) is not list or len(tasks_data) == 0:
             raise SurgeTaskDataError
 
+        if validator is not None:
+            validator.check(tasks_data)
+
         if not all(isinstance(t, dict) for t in tasks_data):
             raise SurgeTaskDataError
 
@@ -129,6 +296,150 @@ class Task(APIResource):
         tasks = [cls(**task_json) for task_json in response_json]
         return tasks
 
+    @classmethod
+    def create_in_chunks(cls,
+                         project_id: str,
+                         tasks_data,
+                         launch: bool = False,
+                         chunker: AdaptiveChunker = None,
+                         dedup: Deduplicator = None,
+                         api_key: str = None):
+        '''
+        Creates new Task objects for a given project, uploading them in chunks whose size
+        adapts to the request latency and errors observed (see `surge.bulk.AdaptiveChunker`).
+        A chunk the server rejects without acting on it (413, 429 or 503) is resent in
+        smaller chunks; see `AdaptiveChunker.resend_timeouts` for timeouts.
+
+        Once the current `surge.deadline()` expires the upload stops: the chunk being sent
+        and any row already read for the next one are recorded as failed, and the
+        remaining input is left unread.
+
+        Arguments:
+            project_id (str): ID of the project to which the tasks are added.
+            tasks_data (iterable): dicts that map each task field to its value, read lazily.
+            chunker (AdaptiveChunker, optional): Chooses the chunk sizes and records its decisions.
+                Pass one in to inspect them, or to share what it learned between uploads.
+            dedup (Deduplicator, optional): Drops rows identical to ones already uploaded, and counts
+                them in `dedup.dropped`. Only the rows of created tasks are committed to it, and
+                it is flushed before returning.
+
+        Returns:
+            result: BulkResult whose `succeeded` holds the created Task objects and whose
+                `failed` holds (task_data, error) pairs.
+        '''
+        chunker = chunker or AdaptiveChunker()
+        if dedup is not None:
+            tasks_data = dedup.filter(tasks_data)
+        rows = iter(tasks_data)
+        pending = deque()
+        result = BulkResult()
+        try:
+            while not chunker.deadline_expired():
+                chunk = chunker.take(rows, pending)
+                if not chunk:
+                    break
+                tasks_chunk = [row for row, _ in chunk]
+                nbytes = sum(size for _, size in chunk)
+                started = time.monotonic()
+                try:
+                    tasks = cls.create_many(project_id,
+                                            tasks_chunk,
+                                            launch,
+                                            api_key=api_key)
+                except Exception as err:
+                    if chunker.record(len(chunk), nbytes,
+                                      time.monotonic() - started, err):
+                        pending.extendleft(reversed(chunk))
+                        continue
+                    for task_data in tasks_chunk:
+                        result.add_failure(task_data, err)
+                        if dedup is not None:
+                            dedup.forget(task_data)
+                    continue
+                chunker.record(len(chunk), nbytes, time.monotonic() - started)
+                if dedup is not None:
+                    dedup.commit(tasks_chunk)
+                for task in tasks:
+                    result.add_success(task)
+            if pending:
+                error = SurgeTimeoutError()
+                for task_data, _ in pending:
+                    result.add_failure(task_data, error)
+        finally:
+            if dedup is not None:
+                # Rows read but not created can be uploaded again
+                dedup.rollback()
+                dedup.flush()
+        return result.finish()
+
+    @classmethod
+    def create_streaming(cls,
+                         project_id: str,
+                         tasks_data,
+                         launch: bool = False,
+                         max_workers: int = DEFAULT_MAX_WORKERS,
+                         queue_size: int = None,
+                         chunker: AdaptiveChunker = None,
+                         dedup: Deduplicator = None,
+                         api_key: str = None):
+        '''
+        Creates new Task objects for a given project from an iterator of any size, and
+        yields a (task_data, task_id) pair for each created task as its chunk is committed.
+
+        Rows are read by a producer thread into a bounded queue of chunks, which
+        `max_workers` threads upload concurrently (see `surge.bulk.pipelined_upload`),
+        so memory use stays flat however many rows there are. On the first failed chunk
+        no more rows are read, the chunks being uploaded are finished, and the error is
+        raised once every created task has been yielded. Rows that weren't yielded
+        weren't created.
+
+        Arguments:
+            project_id (str): ID of the project to which the tasks are added.
+            tasks_data (iterable): dicts that map each task field to its value, read lazily.
+            max_workers (int, optional): Number of upload threads.
+            queue_size (int, optional): Maximum number of chunks waiting to be uploaded.
+            chunker (AdaptiveChunker, optional): Chooses the chunk sizes and records its decisions.
+            dedup (Deduplicator, optional): Drops rows identical to ones already uploaded, and counts
+                them in `dedup.dropped`. Only the rows of created tasks are committed to it, and
+                it is flushed once the generator is exhausted or closed.
+
+        Returns:
+            created (generator): (task_data, task_id) pairs, in the order they were committed.
+        '''
+
+        def upload(tasks_chunk):
+            tasks = cls.create_many(project_id,
+                                    tasks_chunk,
+                                    launch,
+                                    api_key=api_key)
+            if dedup is not None:
+                dedup.commit(tasks_chunk)
+            return [task.id for task in tasks]
+
+        if dedup is None:
+            return pipelined_upload(upload,
+                                    tasks_data,
+                                    chunker=chunker,
+                                    max_workers=max_workers,
+                                    queue_size=queue_size)
+        return cls._deduplicated_upload(
+            dedup,
+            pipelined_upload(upload,
+                             dedup.filter(tasks_data),
+                             chunker=chunker,
+                             max_workers=max_workers,
+                             queue_size=queue_size))
+
+    @staticmethod
+    def _deduplicated_upload(dedup, created):
+        try:
+            yield from created
+        finally:
+            # Stop the pipeline first, so that no chunk commits afterwards
+            created.close()
+            dedup.rollback()
+            dedup.flush()
+
     @classmethod
     def list(cls,
              project_id: str,
@@ -150,6 +461,9 @@ class Task(APIResource):
         endpoint = f"{PROJECTS_ENDPOINT}/{project_id}/{TASKS_ENDPOINT}"
         params = {"page": page, "per_page": per_page}
         response_json = cls.get(endpoint, params, api_key=api_key)
+        task_cache = cls._task_cache()
+        if task_cache is not None:
+            task_cache.put_many(response_json, cls._cache_scope(api_key))
         tasks = [cls(**task_json) for task_json in response_json]
         return tasks
 
@@ -161,9 +475,78 @@ class Task(APIResource):
         Arguments:
             task_id (str): ID of task.
 
+        Completed tasks are read from the task cache, if one is configured
+        (see `surge.task_cache`), without making a request.
+
         Returns:
             task: Task object
         '''
+        task_cache = cls._task_cache()
+        if task_cache is not None:
+            scope = cls._cache_scope(api_key)
+            task_json = task_cache.get(str(task_id), scope)
+            if task_json is not None:
+                return cls(**task_json)
+
         endpoint = f"{TASKS_ENDPOINT}/{task_id}"
         response_json = cls.get(endpoint, api_key=api_key)
+        if task_cache is not None:
+            task_cache.put(response_json, scope)
         return cls(**response_json)
+
+    @classmethod
+    def retrieve_many(cls,
+                      task_ids,
+                      max_workers: int = DEFAULT_MAX_WORKERS,
+                      refresh: bool = False,
+                      api_key: str = None):
+        '''
+        Retrieves many tasks, with bounded concurrency.
+
+        Each distinct ID is fetched once. Tasks are kept in an identity map for as long as
+        they are referenced, so every call with the same base URL and API key returns the
+        same Task object for a given ID; IDs already in the map are not fetched again unless
+        `refresh` is set, in which case the existing objects are updated in place.
+
+        Arguments:
+            task_ids (iterable): IDs of the tasks.
+            max_workers (int, optional): Maximum number of requests in flight.
+            refresh (bool, optional): Fetch tasks that are already in the identity map too.
+
+        Returns:
+            tasks (list): Task objects in the order of task_ids, repeated for repeated IDs.
+        '''
+        task_ids = [str(task_id) for task_id in task_ids]
+        identity_map = cls._identity_map()
+        # Tasks fetched with another API key or base URL are never shared
+        scope = cls._cache_scope(api_key)
+        tasks = {}
+        missing = []
+        for task_id in dict.fromkeys(task_ids):
+            task = identity_map.get((scope, task_id))
+            if task is None or refresh:
+                missing.append(task_id)
+            if task is not None:
+                tasks[task_id] = task
+
+        for task_id, fetched, error in bounded_map(
+                lambda task_id: cls.retrieve(task_id, api_key=api_key),
+                missing, max_workers):
+            if error is not None:
+                raise error
+            task = identity_map.setdefault((scope, task_id), fetched)
+            if task is not fetched:
+                task.__dict__.update(fetched.__dict__)
+            tasks[task_id] = task
+        return [tasks[task_id] for task_id in task_ids]
+
+    @classmethod
+    def _identity_map(cls):
+        client = cls._client
+        return (client.task_identity_map
+                if client is not None else caching.task_identity_map)
+
+    @classmethod
+    def _task_cache(cls):
+        client = cls._client
+        return client.task_cache if client is not None else surge.task_cache
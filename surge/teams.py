@@ -2,10 +2,16 @@ import dateutil.parser
 
 from surge.errors import SurgeMissingIDError
 from surge.api_resource import TEAMS_ENDPOINT, APIResource
+from surge.bulk import bounded_map
+from surge.caching import eligibility_cache
+
+DEFAULT_SYNC_CHUNK_SIZE = 1000
 
 
 class Team(APIResource):
 
+    eligibility_cache = eligibility_cache
+
     def __init__(self, **kwargs):
         super().__init__()
         self.__dict__.update(kwargs)
@@ -49,7 +55,13 @@ class Team(APIResource):
 
         endpoint = f"{TEAMS_ENDPOINT}/{self.id}"
         response_json = self.put(endpoint, params, api_key=api_key)
-        return Team(**response_json)
+        return self.__class__(**response_json)
+
+    def _invalidate_eligibility(self, surger_ids):
+        # Team membership decides which projects a Surger can work on
+        surger_ids = set(surger_ids)
+        self.eligibility_cache.invalidate_where(
+            lambda key: key[2] in surger_ids)
 
     def add_surgers(self, surger_ids, api_key: str = None):
         '''
@@ -64,7 +76,8 @@ class Team(APIResource):
         endpoint = f"{TEAMS_ENDPOINT}/{self.id}/add_surgers"
         params = {"surger_ids": surger_ids}
         response_json = self.post(endpoint, params, api_key=api_key)
-        return Team(**response_json)
+        self._invalidate_eligibility(surger_ids)
+        return self.__class__(**response_json)
 
     def remove_surgers(self, surger_ids, api_key: str = None):
         '''
@@ -79,7 +92,60 @@ class Team(APIResource):
         endpoint = f"{TEAMS_ENDPOINT}/{self.id}/remove_surgers"
         params = {"surger_ids": surger_ids}
         response_json = self.post(endpoint, params, api_key=api_key)
-        return Team(**response_json)
+        self._invalidate_eligibility(surger_ids)
+        return self.__class__(**response_json)
+
+    def member_ids(self):
+        '''
+        Returns the set of Surger IDs in this team, as last loaded from the API.
+        '''
+        return {
+            member["id"] if isinstance(member, dict) else member
+            for member in getattr(self, "members", None) or []
+        }
+
+    def sync_members(self,
+                     desired_ids,
+                     chunk_size: int = DEFAULT_SYNC_CHUNK_SIZE,
+                     max_workers: int = 1,
+                     refresh: bool = False,
+                     api_key: str = None):
+        '''
+        Make the team's membership match desired_ids, sending only the Surgers that
+        need to be added or removed, in chunks of at most chunk_size IDs.
+
+        Arguments:
+            desired_ids (iterable): Surger IDs that should be in the team.
+            chunk_size (int, optional): Maximum number of IDs per add/remove request.
+            max_workers (int, optional): Number of chunks sent in parallel.
+            refresh (bool, optional): Retrieve the current membership first instead of
+                using the members this Team object was loaded with.
+
+        Returns:
+            team: Team object returned by the last request, or this team if it was already in sync.
+        '''
+        current = self
+        if refresh or not hasattr(self, "members"):
+            current = self.retrieve(self.id, api_key=api_key)
+
+        current_ids = current.member_ids()
+        desired_ids = set(desired_ids)
+        to_remove = sorted(current_ids - desired_ids)
+        to_add = sorted(desired_ids - current_ids)
+
+        changes = [(self.remove_surgers, to_remove[i:i + chunk_size])
+                   for i in range(0, len(to_remove), chunk_size)]
+        changes += [(self.add_surgers, to_add[i:i + chunk_size])
+                    for i in range(0, len(to_add), chunk_size)]
+
+        team = current
+        for _, response, error in bounded_map(
+                lambda change: change[0](change[1], api_key=api_key), changes,
+                max_workers):
+            if error is not None:
+                raise error
+            team = response
+        return team
 
     @classmethod
     def create(cls,
@@ -114,7 +180,7 @@ class Team(APIResource):
         '''
         endpoint = f"{TEAMS_ENDPOINT}/list"
         response_json = cls.get(endpoint, api_key=api_key)
-        tasks = [Team(**team_data) for team_data in response_json]
+        tasks = [cls(**team_data) for team_data in response_json]
         return tasks
 
     @classmethod
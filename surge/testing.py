@@ -0,0 +1,641 @@
+"""
+A local stand-in for the Surge API, for offline tests and benchmarks.
+
+FakeSurgeAPI serves the endpoints the SDK uses (projects, tasks, reports,
+items, teams and evaluate_rubric) from memory, with configurable latency,
+error injection and payload sizes.
+
+Usage:
+    with FakeSurgeAPI(latency=0.02, tasks_per_project=1000) as api:
+        client = surge.SurgeClient(api_key="test", base_url=api.base_url)
+        project = client.projects.create("Benchmark")
+        tasks = project.list_tasks(per_page=100)
+"""
+import csv
+import gzip
+import io
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from surge.instrumentation import endpoint_route
+
+# Generated task ids are the project id with the task number in the low bits,
+# so tasks can be served without being stored.
+_TASK_NUMBER_BITS = 64
+_TASK_NUMBER_MASK = (1 << _TASK_NUMBER_BITS) - 1
+
+QUESTION_TYPES = ("free_response", "multiple_choice", "checkbox")
+TIMESTAMP = "2021-06-01T12:00:00.000Z"
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128)))
+
+
+def _text(rng, words):
+    return " ".join(f"word{rng.randint(0, 9999)}" for _ in range(words))
+
+
+def fake_question(rng, index=0):
+    """Question params as returned inside a project, for Question.from_params."""
+    question_type = QUESTION_TYPES[index % len(QUESTION_TYPES)]
+    params = {
+        "id": _uuid(rng),
+        "text": _text(rng, 12),
+        "label": f"Question {index}",
+        "type": question_type,
+        "required": True,
+        "preexisting_annotations": None,
+        "shown_by_item_option_id": None,
+        "hidden_by_item_option_id": None,
+        "holistic": False,
+        "require_tie_breaker": False,
+        "column_header": None,
+    }
+    if question_type != "free_response":
+        params["options"] = [f"Option {i}" for i in range(4)]
+        params["options_objects"] = [{
+            "id": _uuid(rng),
+            "text": f"Option {i}",
+            "created_at": TIMESTAMP,
+            "updated_at": TIMESTAMP,
+        } for i in range(4)]
+    return params
+
+
+def fake_project(rng, project_id=None, name=None, num_questions=3, **params):
+    """A project as returned by GET projects/{id}."""
+    return {
+        "id": project_id or _uuid(rng),
+        "name": name or _text(rng, 4),
+        "created_at": TIMESTAMP,
+        "description": _text(rng, 40),
+        "instructions": _text(rng, 200),
+        "num_tasks": 0,
+        "num_tasks_completed": 0,
+        "status": "unlaunched",
+        "fields_template": "<p>{{text}}</p>",
+        "questions": [fake_question(rng, i) for i in range(num_questions)],
+        "tags": [],
+        "link_to_work_on_task": "https://app.surgehq.ai/workers/tasks",
+        **params,
+    }
+
+
+def fake_task(rng,
+              task_id=None,
+              project_id=None,
+              fields=None,
+              text_words=50,
+              num_responses=1):
+    """A task with responses, as returned by GET tasks/{id}."""
+    if fields is None:
+        fields = {"text": _text(rng, text_words)}
+    responses = [{
+        "id": _uuid(rng),
+        "data": {
+            "Question 0": _text(rng, 10),
+            "Question 1": rng.choice(("Option 0", "Option 1")),
+        },
+        "completed_at": TIMESTAMP,
+        "worker_id": _uuid(rng),
+    } for _ in range(num_responses)]
+    return {
+        "id": task_id or _uuid(rng),
+        "project_id": project_id or _uuid(rng),
+        "created_at": TIMESTAMP,
+        "is_complete": num_responses > 0,
+        "fields": fields,
+        "responses": responses,
+    }
+
+
+def _stable_bool(*parts):
+    # Deterministic across runs, unlike hash() on str
+    return sum(map(ord, "".join(parts))) % 2 == 0
+
+
+class FakeSurgeAPI(object):
+    """
+    In-memory Surge API served over HTTP on localhost from a background thread.
+
+    Arguments:
+        host (str, optional): Interface to listen on.
+        port (int, optional): Port to listen on. 0 picks a free port.
+        latency (float, optional): Seconds each request waits before responding.
+        jitter (float, optional): Extra random latency of up to this many seconds.
+        error_rate (float, optional): Fraction of requests answered with error_status instead.
+        error_status (int, optional): HTTP status of injected errors.
+        tasks_per_project (int, optional): Number of completed tasks every project starts with.
+        text_words (int, optional): Number of words in each generated task's text.
+        responses_per_task (int, optional): Number of responses on each generated task.
+        questions_per_project (int, optional): Number of questions on each created project.
+        report_polls (int, optional): Number of report requests answered with "CREATING"
+            before a report is ready.
+        seed (int, optional): Seed for generated data and injected errors.
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 error_status: int = 500,
+                 tasks_per_project: int = 100,
+                 text_words: int = 50,
+                 responses_per_task: int = 1,
+                 questions_per_project: int = 3,
+                 report_polls: int = 0,
+                 seed: int = 0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.tasks_per_project = tasks_per_project
+        self.text_words = text_words
+        self.responses_per_task = responses_per_task
+        self.questions_per_project = questions_per_project
+        self.report_polls = report_polls
+        self.seed = seed
+
+        self.projects = {}
+        self.tasks = {}
+        self.project_task_ids = {}
+        self.teams = {}
+        self.reports = {}
+        self.requests = {}
+        self.errors_injected = 0
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    def __repr__(self):
+        return f"<surge.FakeSurgeAPI base_url=\"{self.base_url}\">"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @property
+    def url(self):
+        if self._httpd is None:
+            return None
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self):
+        """Value for `surge.base_url` or `SurgeClient(base_url=...)`."""
+        return f"{self.url}/api" if self._httpd is not None else None
+
+    def start(self):
+        handler = type("Handler", (_Handler, ), {"api": self})
+        self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        args=(0.05, ),
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def add_project(self, name: str = None, **params):
+        """Create a project directly, without a request."""
+        with self._lock:
+            # Project ids leave the low bits free for generated task numbers
+            project_id = str(
+                uuid.UUID(int=self._rng.getrandbits(64) << _TASK_NUMBER_BITS))
+            project = fake_project(random.Random(project_id),
+                                   project_id=project_id,
+                                   name=name,
+                                   num_questions=self.questions_per_project,
+                                   **params)
+            project["num_tasks"] = project[
+                "num_tasks_completed"] = self.tasks_per_project
+            self.projects[project_id] = project
+            self.project_task_ids[project_id] = []
+        return project
+
+    def add_team(self, name: str = None, members=None, description=None):
+        with self._lock:
+            team = {
+                "id": _uuid(self._rng),
+                "name": name or "Team",
+                "description": description,
+                "created_at": TIMESTAMP,
+                "members": [{
+                    "id": member
+                } for member in members or []],
+            }
+            self.teams[team["id"]] = team
+        return team
+
+    def generated_task(self, project_id: str, number: int):
+        """Task number (1-based) of the tasks every project starts with."""
+        task_id = str(uuid.UUID(int=uuid.UUID(project_id).int | number))
+        return fake_task(random.Random(task_id),
+                         task_id=task_id,
+                         project_id=project_id,
+                         text_words=self.text_words,
+                         num_responses=self.responses_per_task)
+
+    def get_task(self, task_id: str):
+        task = self.tasks.get(task_id)
+        if task is not None:
+            return task
+        try:
+            task_int = uuid.UUID(task_id).int
+        except ValueError:
+            return None
+        number = task_int & _TASK_NUMBER_MASK
+        project_id = str(uuid.UUID(int=task_int - number))
+        if project_id in self.projects and 0 < number <= self.tasks_per_project:
+            return self.generated_task(project_id, number)
+        return None
+
+    def list_tasks(self, project_id: str, page: int, per_page: int):
+        start = (page - 1) * per_page
+        stop = start + per_page
+        generated = range(start + 1, min(stop, self.tasks_per_project) + 1)
+        tasks = [self.generated_task(project_id, n) for n in generated]
+        created = self.project_task_ids[project_id]
+        offset = max(0, start - self.tasks_per_project)
+        for task_id in created[offset:offset + per_page - len(tasks)]:
+            tasks.append(self.tasks[task_id])
+        return tasks
+
+    def create_task(self, project_id: str, fields: dict):
+        with self._lock:
+            task = fake_task(self._rng,
+                             project_id=project_id,
+                             fields=fields,
+                             num_responses=0)
+            self.tasks[task["id"]] = task
+            self.project_task_ids[project_id].append(task["id"])
+            self.projects[project_id]["num_tasks"] += 1
+        return task
+
+    def report_data(self, project_id: str, report_type: str):
+        tasks = self.list_tasks(project_id, 1, 1 << 62)
+        if "csv" not in report_type:
+            return json.dumps(tasks).encode()
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["task_id", "text", "worker_id", "response"])
+        for task in tasks:
+            for response in task["responses"]:
+                writer.writerow([
+                    task["id"], task["fields"].get("text"),
+                    response["worker_id"],
+                    json.dumps(response["data"])
+                ])
+        return output.getvalue().encode()
+
+    def _record(self, method, path):
+        route = f"{method} {endpoint_route(path)}"
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            inject = self.error_rate and self._rng.random() < self.error_rate
+            if inject:
+                self.errors_injected += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter)
+                                    if self.jitter else 0.0)
+        return inject, delay
+
+
+class _NotFound(Exception):
+    pass
+
+
+def _route(method, pattern):
+
+    def decorator(fn):
+        fn.route = (method, re.compile(pattern))
+        return fn
+
+    return decorator
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Request handler; `api` is set to the FakeSurgeAPI on a per-server subclass.
+    Routes are tried in the order they are defined, so specific patterns must
+    come before general ones.
+    """
+
+    api = None
+    routes = ()
+    # Keep-alive, so that connection pooling behaves as against the real API.
+    # Without TCP_NODELAY, delayed ACKs add ~40ms to every keep-alive response.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        if not raw:
+            return {}
+        return json.loads(raw)
+
+    def _send(self, status, body: bytes, content_type, runtime=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if runtime is not None:
+            self.send_header("X-Runtime", f"{runtime:.6f}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data, runtime=None):
+        self._send(status,
+                   json.dumps(data).encode(), "application/json", runtime)
+
+    def _handle(self, method):
+        started = time.perf_counter()
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        try:
+            body = self._read_body()
+        except ValueError:
+            self._send_json(400, {"error": "Invalid JSON"})
+            return
+
+        if parts.path.startswith("/reports/"):
+            self._download_report(parts.path[len("/reports/"):])
+            return
+
+        path = parts.path[len("/api/"):] if parts.path.startswith(
+            "/api/") else parts.path.lstrip("/")
+        inject, delay = self.api._record(method, path)
+        if delay:
+            time.sleep(delay)
+        if inject:
+            self._send_json(self.api.error_status, {"error": "Injected error"},
+                            time.perf_counter() - started)
+            return
+
+        for fn in self.routes:
+            route_method, pattern = fn.route
+            match = pattern.fullmatch(path) if route_method == method else None
+            if match is None:
+                continue
+            try:
+                status, data = fn(self,
+                                  *match.groups(),
+                                  query=query,
+                                  body=body)
+            except _NotFound:
+                break
+            self._send_json(status, data, time.perf_counter() - started)
+            return
+        self._send_json(404, {"error": "Not found"},
+                        time.perf_counter() - started)
+
+    def _project(self, project_id):
+        project = self.api.projects.get(project_id)
+        if project is None:
+            raise _NotFound
+        return project
+
+    def _team(self, team_id):
+        team = self.api.teams.get(team_id)
+        if team is None:
+            raise _NotFound
+        return team
+
+    # Projects
+
+    @_route("GET", r"projects(?:/shared|/blueprints)?")
+    def list_projects(self, query, body):
+        page = int(query.get("page", ["1"])[0])
+        projects = list(self.api.projects.values())
+        return 200, projects[(page - 1) * 100:page * 100]
+
+    @_route("POST", r"projects")
+    def create_project(self, query, body):
+        body = {k: v for k, v in body.items() if k != "questions"}
+        return 200, self.api.add_project(**body)
+
+    @_route("GET", r"projects/([^/]+)")
+    def retrieve_project(self, project_id, query, body):
+        return 200, self._project(project_id)
+
+    @_route("PUT", r"projects/([^/]+)")
+    def update_project(self, project_id, query, body):
+        project = self._project(project_id)
+        project.update(body)
+        return 200, project
+
+    @_route("GET", r"projects/([^/]+)/copies")
+    def list_copies(self, project_id, query, body):
+        self._project(project_id)
+        return 200, []
+
+    @_route("PUT", r"projects/([^/]+)/(launch|pause|resume|cancel)")
+    def change_status(self, project_id, action, query, body):
+        project = self._project(project_id)
+        project["status"] = {
+            "launch": "in_progress",
+            "pause": "paused",
+            "resume": "in_progress",
+            "cancel": "canceled",
+        }[action]
+        return 200, project
+
+    @_route("GET", r"projects/([^/]+)/delete")
+    def delete_project(self, project_id, query, body):
+        self._project(project_id)
+        del self.api.projects[project_id]
+        return 200, {"success": True}
+
+    @_route("GET", r"projects/([^/]+)/workable_by_surger")
+    def workable_by_surger(self, project_id, query, body):
+        self._project(project_id)
+        surger_id = query.get("surger_id", [""])[0]
+        return 200, {"workable": _stable_bool(project_id, surger_id)}
+
+    # Tasks
+
+    @_route("GET", r"projects/([^/]+)/tasks")
+    def list_tasks(self, project_id, query, body):
+        self._project(project_id)
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["100"])[0])
+        return 200, self.api.list_tasks(project_id, page, per_page)
+
+    @_route("POST", r"projects/([^/]+)/tasks")
+    def create_task(self, project_id, query, body):
+        self._project(project_id)
+        return 200, self.api.create_task(project_id, body.get("fields", {}))
+
+    @_route("POST", r"projects/([^/]+)/tasks/create_tasks")
+    def create_tasks(self, project_id, query, body):
+        self._project(project_id)
+        tasks = body.get("tasks")
+        if not isinstance(tasks, list):
+            return 400, {"error": "tasks must be a list"}
+        return 200, [self.api.create_task(project_id, t) for t in tasks]
+
+    @_route("GET", r"tasks/([^/]+)")
+    def retrieve_task(self, task_id, query, body):
+        task = self.api.get_task(task_id)
+        if task is None:
+            raise _NotFound
+        return 200, task
+
+    @_route("POST", r"tasks/([^/]+)/gold-standards")
+    def set_gold_standard(self, task_id, query, body):
+        return 200, {
+            "id": task_id,
+            "is_gold_standard": body.get("is_gold_standard", True),
+            "gold_standard_answers": body.get("answers"),
+        }
+
+    @_route("POST", r"tasks/([^/]+)/create-response")
+    def create_response(self, task_id, query, body):
+        return 200, {"success": True, "task_id": task_id}
+
+    # Reports
+
+    @_route("POST", r"projects/([^/]+)/report")
+    def request_report(self, project_id, query, body):
+        self._project(project_id)
+        report_type = body.get("report_type", "export_json")
+        key = (project_id, report_type)
+        with self.api._lock:
+            polls = self.api.reports.get(key, 0)
+            self.api.reports[key] = polls + 1
+        if polls < self.api.report_polls:
+            return 200, {
+                "status": "CREATING",
+                "job_id": f"{project_id}:{report_type}"
+            }
+        self.api.reports.pop(key, None)
+        return 200, {
+            "status": "READY",
+            "url": f"{self.api.url}/reports/{project_id}/{report_type}",
+            "expires_in_seconds": 3600,
+        }
+
+    @_route("GET", r"projects/([^/]+)/report_status")
+    def report_status(self, project_id, query, body):
+        self._project(project_id)
+        return 200, {"status": "COMPLETED", "job_id": query.get("job_id")}
+
+    def _download_report(self, path):
+        project_id, _, report_type = path.partition("/")
+        if project_id not in self.api.projects:
+            self._send_json(404, {"error": "Not found"})
+            return
+        data = gzip.compress(self.api.report_data(project_id, report_type),
+                             compresslevel=1)
+        self._send(200, data, "application/gzip")
+
+    # Questions
+
+    @_route("PUT", r"items/([^/]+)")
+    def update_question(self, question_id, query, body):
+        for project in self.api.projects.values():
+            for question in project["questions"]:
+                if question["id"] == question_id:
+                    question.update(body)
+                    return 200, question
+        raise _NotFound
+
+    # Teams
+
+    @_route("POST", r"teams")
+    def create_team(self, query, body):
+        return 200, self.api.add_team(body.get("name"), body.get("members"),
+                                      body.get("description"))
+
+    @_route("GET", r"teams/list")
+    def list_teams(self, query, body):
+        return 200, list(self.api.teams.values())
+
+    @_route("GET", r"teams/([^/]+)")
+    def retrieve_team(self, team_id, query, body):
+        return 200, self._team(team_id)
+
+    @_route("PUT", r"teams/([^/]+)")
+    def update_team(self, team_id, query, body):
+        team = self._team(team_id)
+        team.update(body)
+        return 200, team
+
+    @_route("DELETE", r"teams/([^/]+)")
+    def delete_team(self, team_id, query, body):
+        self._team(team_id)
+        del self.api.teams[team_id]
+        return 200, {"success": True}
+
+    @_route("POST", r"teams/([^/]+)/(add_surgers|remove_surgers)")
+    def change_members(self, team_id, action, query, body):
+        team = self._team(team_id)
+        with self.api._lock:
+            members = [m["id"] for m in team["members"]]
+            changed = body.get("surger_ids", [])
+            if action == "add_surgers":
+                members += [s for s in changed if s not in members]
+            else:
+                members = [m for m in members if m not in set(changed)]
+            team["members"] = [{"id": m} for m in members]
+        return 200, team
+
+    # Rubrics
+
+    @_route("POST", r"evaluate_rubric")
+    def evaluate_rubric(self, query, body):
+        text = body.get("text_for_grading", "")
+        rubric = body.get("rubric_text", "")
+        answer = _stable_bool(text, rubric)
+        return 200, {
+            "answer":
+            answer,
+            "explanation":
+            f"The text {'meets' if answer else 'fails'} "
+            f"the rubric."
+        }
+
+
+_Handler.routes = tuple(fn for fn in vars(_Handler).values()
+                        if hasattr(fn, "route"))
@@ -0,0 +1,124 @@
+import contextvars
+import copy
+import time
+from contextlib import contextmanager
+
+from urllib3.util import Retry, Timeout
+
+from surge.errors import SurgeTimeoutError
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 120
+
+# Absolute time.monotonic() value at which the innermost deadline expires
+_deadline = contextvars.ContextVar("surge_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Bound the total time spent by every Surge request made inside the block.
+
+    Each request's connect and read timeouts are capped by the time left, and a
+    request started after the deadline fails immediately with a SurgeTimeoutError.
+    This covers pagination loops and report polling alike. A SurgeClient also
+    caps each of its retries (see DeadlineRetry) and its rate limiter's waits
+    by the time left. Nested deadlines can only shorten the time available.
+    Bulk helpers copy the deadline into their worker threads.
+
+    Usage:
+        with surge.deadline(30):
+            project = surge.Project.retrieve(project_id)
+            project.save_report("export_csv", "results.csv")
+    """
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline, or None if there is none."""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+def check_deadline():
+    """Raise a SurgeTimeoutError if the current deadline has passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise SurgeTimeoutError
+    return left
+
+
+def request_timeout(timeout):
+    """
+    Returns the (connect, read) timeout for a request, capped by the current deadline.
+    """
+    if timeout is None:
+        connect, read = DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+    elif isinstance(timeout, (int, float)):
+        connect, read = timeout, timeout
+    else:
+        connect, read = timeout
+    left = check_deadline()
+    if left is not None:
+        connect = min(connect, left) if connect is not None else left
+        read = min(read, left) if read is not None else left
+    return connect, read
+
+
+class DeadlineTimeout(Timeout):
+    """
+    urllib3 Timeout that is capped by the current deadline again for each
+    attempt, since urllib3 reuses the timeout of a request for its retries.
+    """
+
+    def clone(self):
+        connect, read = request_timeout((self._connect, self._read))
+        return Timeout(connect=connect, read=read, total=self.total)
+
+
+class DeadlineRetry(Retry):
+    """
+    urllib3 Retry policy that stops retrying once the current deadline has
+    passed, raising a SurgeTimeoutError, and never sleeps past it.
+    """
+
+    @classmethod
+    def from_retry(cls, retry):
+        """Returns retry (an int or a Retry) as a DeadlineRetry."""
+        if isinstance(retry, cls):
+            return retry
+        if not retry:
+            # Like requests' default, re-raise read errors as they are
+            return cls(0, read=False)
+        retry = Retry.from_int(retry)
+        # Retry.new() copies the policy but keeps its class
+        deadline_retry = copy.copy(retry)
+        deadline_retry.__class__ = cls
+        return deadline_retry
+
+    def increment(self, *args, **kwargs):
+        check_deadline()
+        return super().increment(*args, **kwargs)
+
+    def get_backoff_time(self):
+        return _cap(super().get_backoff_time())
+
+    def get_retry_after(self, response):
+        return _cap(super().get_retry_after(response))
+
+
+def _cap(seconds):
+    left = remaining()
+    if seconds is None or left is None:
+        return seconds
+    return max(0, min(seconds, left))
@@ -0,0 +1,333 @@
+"""
+Pluggable HTTP transports for APIResource requests, with record and replay.
+
+A transport sits between `_base_request` and the HTTP library: the request is
+built, encoded and compressed as usual, then handed to the transport, and the
+response it returns is decoded and hydrated as usual. Set `surge.transport`,
+or pass `transport` to a SurgeClient.
+
+Usage:
+    # Record real traffic, including how long each request took
+    with RecordingTransport("traffic.jsonl.gz") as recorder:
+        client = surge.SurgeClient(api_key="...", transport=recorder)
+        run_workflow(client)
+
+    # Replay it later without network access, with or without the latencies
+    client = surge.SurgeClient(api_key="test",
+                               transport=ReplayTransport("traffic.jsonl.gz"))
+    run_workflow(client)
+"""
+import datetime
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from surge.caching import content_hash
+from surge.errors import SurgeRequestError
+from surge.instrumentation import endpoint_route, server_time
+
+CASSETTE_VERSION = 1
+
+# Response headers kept in cassettes; the rest are not used by the SDK
+RECORDED_HEADERS = ("Content-Type", "Server-Timing", "X-Runtime")
+
+
+def request_key(method: str, url: str, kwargs: dict):
+    """
+    Identifies a request by method, path and decoded body or query params, so
+    that recordings replay against any base URL and with any JSON codec or
+    compression setting.
+    """
+    path = urlsplit(url).path
+    params = kwargs.get("params")
+    body = kwargs.get("json")
+    data = kwargs.get("data")
+    if data is not None:
+        if (kwargs.get("headers") or {}).get("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        body = json.loads(data)
+    return content_hash(method.lower(), path, params, body)
+
+
+class Transport(object):
+    """Sends requests with the HTTP library unchanged. Subclasses override `request`."""
+
+    def request(self, http, method: str, url: str, **kwargs):
+        return getattr(http, method)(url, **kwargs)
+
+    def session(self, http):
+        """Returns an object with the request methods of http that go through this transport."""
+        return _TransportSession(self, http)
+
+
+class _TransportSession(object):
+
+    def __init__(self, transport, http):
+        self._transport = transport
+        self._http = http
+
+    def get(self, url, **kwargs):
+        return self._transport.request(self._http, "get", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._transport.request(self._http, "post", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self._transport.request(self._http, "put", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self._transport.request(self._http, "patch", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._transport.request(self._http, "delete", url, **kwargs)
+
+
+class Interaction(object):
+    """One recorded request and its response."""
+
+    def __init__(self,
+                 method: str,
+                 path: str,
+                 key: str,
+                 status: int,
+                 body: str,
+                 headers: dict = None,
+                 elapsed: float = 0.0,
+                 server: float = None):
+        self.method = method
+        self.path = path
+        self.key = key
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        # Seconds the HTTP call took when recorded, including the download
+        self.elapsed = elapsed
+        # Seconds the server reported spending, when it did
+        self.server = server
+
+    def __repr__(self):
+        return (f"<surge.Interaction {self.method.upper()} {self.path} "
+                f"status={self.status} elapsed={self.elapsed:.3f}>")
+
+    @property
+    def route(self):
+        return endpoint_route(self.path.split("/api/", 1)[-1].lstrip("/"))
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "path": self.path,
+            "key": self.key,
+            "status": self.status,
+            "headers": self.headers,
+            "body": self.body,
+            "elapsed": round(self.elapsed, 6),
+            "server": self.server,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class Cassette(object):
+    """
+    Recorded interactions, stored as JSON Lines with a header line. Paths ending
+    in ".gz" are gzip-compressed.
+    """
+
+    def __init__(self, path: str = None, interactions=None):
+        self.path = path
+        self.interactions = list(interactions or [])
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<surge.Cassette {self.path} interactions={len(self.interactions)}>"
+
+    def __len__(self):
+        return len(self.interactions)
+
+    @staticmethod
+    def _open(path, mode):
+        if path.endswith(".gz"):
+            return gzip.open(path, mode + "t", encoding="utf-8")
+        return open(path, mode, encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str):
+        with cls._open(path, "r") as cassette_file:
+            header = json.loads(next(cassette_file))
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(
+                    f"Unsupported cassette version {header.get('version')!r}")
+            interactions = [
+                Interaction.from_dict(json.loads(line))
+                for line in cassette_file if line.strip()
+            ]
+        return cls(path, interactions)
+
+    def append(self, interaction: Interaction):
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def save(self, path: str = None):
+        path = path or self.path
+        header = {
+            "version": CASSETTE_VERSION,
+            "recorded_at":
+            datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "interactions": len(self.interactions),
+        }
+        with self._lock, self._open(path, "w") as cassette_file:
+            cassette_file.write(json.dumps(header) + "\n")
+            for interaction in self.interactions:
+                cassette_file.write(
+                    json.dumps(interaction.to_dict(), separators=(",", ":")) +
+                    "\n")
+
+
+class RecordingTransport(Transport):
+    """
+    Sends requests with the HTTP library and records each request and response
+    into a Cassette, saved on `save()` or when used as a context manager exits.
+    """
+
+    def __init__(self, cassette):
+        self.cassette = cassette if isinstance(
+            cassette, Cassette) else Cassette(cassette)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
+
+    def save(self, path: str = None):
+        self.cassette.save(path)
+
+    def request(self, http, method: str, url: str, **kwargs):
+        key = request_key(method, url, kwargs)
+        started = time.perf_counter()
+        response = getattr(http, method)(url, **kwargs)
+        content = response.content
+        elapsed = time.perf_counter() - started
+
+        self.cassette.append(
+            Interaction(
+                method=method,
+                path=urlsplit(url).path,
+                key=key,
+                status=response.status_code,
+                body=content.decode("utf-8", errors="replace"),
+                headers={
+                    name: response.headers[name]
+                    for name in RECORDED_HEADERS if name in response.headers
+                },
+                elapsed=elapsed,
+                server=server_time(response),
+            ))
+        return response
+
+
+class ReplayedResponse(object):
+    """The parts of a requests.Response that the SDK uses, built from an Interaction."""
+
+    def __init__(self, interaction: Interaction, url: str, body=None):
+        self.interaction = interaction
+        self.url = url
+        self.status_code = interaction.status
+        self.headers = CaseInsensitiveDict(interaction.headers)
+        self.content = interaction.body.encode("utf-8")
+        self.elapsed = datetime.timedelta(seconds=interaction.elapsed)
+        self.request = SimpleNamespace(method=interaction.method.upper(),
+                                       url=url,
+                                       body=body)
+        self.raw = None
+
+    def __repr__(self):
+        return f"<surge.ReplayedResponse [{self.status_code}]>"
+
+    @property
+    def text(self):
+        return self.interaction.body
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} {kind} Error: for url: {self.url}",
+                response=self)
+
+
+class ReplayTransport(Transport):
+    """
+    Answers requests from a Cassette without touching the network.
+
+    Requests are matched on method, path and body or query params; identical
+    requests get the recorded responses in the order they were recorded. When
+    no recording matches exactly, the next unused recording for the same method
+    and path is used, and otherwise a SurgeRequestError is raised.
+
+    Arguments:
+        cassette (str or Cassette): Cassette or path of a cassette file.
+        latency (bool or float, optional): Wait as long as each request took when it
+            was recorded; a float scales the recorded latencies.
+    """
+
+    def __init__(self, cassette, latency=False):
+        if not isinstance(cassette, Cassette):
+            cassette = Cassette.load(cassette)
+        self.cassette = cassette
+        self.latency = 1.0 if latency is True else float(latency or 0)
+        # ("METHOD route", network seconds, replay start, replay end) for
+        # each request
+        self.replayed = []
+
+        self._by_key = defaultdict(deque)
+        self._by_path = defaultdict(deque)
+        for interaction in cassette.interactions:
+            self._by_key[interaction.key].append(interaction)
+            self._by_path[(interaction.method,
+                           interaction.path)].append(interaction)
+        self._used = set()
+        self._lock = threading.Lock()
+
+    def _next(self, queue):
+        while queue:
+            interaction = queue.popleft()
+            if id(interaction) not in self._used:
+                self._used.add(id(interaction))
+                return interaction
+        return None
+
+    def match(self, method: str, url: str, kwargs: dict):
+        key = request_key(method, url, kwargs)
+        with self._lock:
+            interaction = self._next(self._by_key[key]) or self._next(
+                self._by_path[(method, urlsplit(url).path)])
+        if interaction is None:
+            raise SurgeRequestError(
+                f"No recorded response for {method.upper()} {url}")
+        return interaction
+
+    def request(self, http, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        interaction = self.match(method, url, kwargs)
+        if self.latency:
+            time.sleep(interaction.elapsed * self.latency)
+        response = ReplayedResponse(interaction, url, kwargs.get("data"))
+        with self._lock:
+            self.replayed.append(
+                (f"{method.upper()} {interaction.route}", interaction.elapsed,
+                 started, time.perf_counter()))
+        return response
@@ -1,9 +1,11 @@
 import csv
+import json
 
 
-def load_tasks_data_from_csv(file_path: str):
-    tasks_data = []
-
+def iter_tasks_data_from_csv(file_path: str):
+    """
+    Lazily yields one dict per row of a CSV file, keyed by the header row.
+    """
     with open(file_path) as csvfile:
         reader = csv.reader(csvfile)
         headers = next(reader, None)
@@ -13,6 +15,18 @@ def load_tasks_data_from_csv(file_path: str):
             data = {}
             for i in range(len(headers)):
                 data[headers[i]] = row[i]
-            tasks_data.append(data)
+            yield data
+
+
+def load_tasks_data_from_csv(file_path: str):
+    return list(iter_tasks_data_from_csv(file_path))
+
 
-    return tasks_data
+def iter_jsonl(file_path: str):
+    """
+    Lazily yields the JSON object on each non-empty line of a JSONL file.
+    """
+    with open(file_path) as jsonl_file:
+        for line in jsonl_file:
+            if line.strip():
+                yield json.loads(line)
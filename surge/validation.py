@@ -0,0 +1,88 @@
+import re
+
+from surge.errors import SurgeTaskValidationError
+
+# Matches {{field}} placeholders, allowing whitespace inside the braces.
+# Handlebars block helpers, comments and partials ({{#if x}}, {{/if}},
+# {{^}}, {{!note}}, {{> partial}}, {{else}}) are not fields.
+FIELD_PLACEHOLDER_PATTERN = re.compile(
+    r"\{\{\s*(?![#/^!>])(?!else\s*\}\})([^{}\s]+)\s*\}\}")
+
+
+class TaskValidator(object):
+    """
+    Checks task rows locally before they are uploaded with
+    `Task.create_many` / `Project.create_tasks`.
+
+    A validator is compiled once from a Project (or an explicit set of field
+    names) and can then check any number of rows. Rows are consumed lazily so
+    arbitrarily large inputs can be validated with constant memory, apart
+    from the list of errors that is collected.
+    """
+
+    def __init__(self, required_fields=None):
+        self.required_fields = frozenset(required_fields or [])
+
+    def __repr__(self):
+        return f"<surge.TaskValidator required_fields={sorted(self.required_fields)}>"
+
+    @staticmethod
+    def fields_in_template(fields_template: str):
+        """Returns the field names referenced by {{placeholders}} in a template."""
+        if not fields_template:
+            return set()
+        return set(FIELD_PLACEHOLDER_PATTERN.findall(fields_template))
+
+    @classmethod
+    def from_project(cls, project):
+        """
+        Compile a validator from a Project's fields template and questions.
+
+        Arguments:
+            project (Project): Project the tasks will be added to.
+
+        Returns:
+            validator: TaskValidator object
+        """
+        fields_template = getattr(project, "fields_template", None) or getattr(
+            project, "fields_text", None)
+        required_fields = cls.fields_in_template(fields_template)
+        for question in getattr(project, "questions", None) or []:
+            field = getattr(question, "preexisting_annotations", None)
+            if field:
+                required_fields.add(field)
+        return cls(required_fields)
+
+    def validate_row(self, row):
+        """
+        Returns a list of problems with a single row. An empty list means the row is valid.
+        """
+        if not isinstance(row, dict):
+            return [f"expected a dict, got {type(row).__name__}"]
+        missing = self.required_fields.difference(row.keys())
+        return [f"missing field '{field}'" for field in sorted(missing)]
+
+    def iter_errors(self, tasks_data):
+        """
+        Lazily yields (row_index, problems) for every invalid row in tasks_data.
+        """
+        required_fields = self.required_fields
+        for index, row in enumerate(tasks_data):
+            # Fast path: a dict that contains every required key is valid
+            if isinstance(row, dict) and required_fields.issubset(row.keys()):
+                continue
+            yield index, self.validate_row(row)
+
+    def validate(self, tasks_data):
+        """
+        Validate every row and return the list of (row_index, problems) for invalid rows.
+        """
+        return list(self.iter_errors(tasks_data))
+
+    def check(self, tasks_data):
+        """
+        Validate every row, raising a SurgeTaskValidationError listing all invalid rows.
+        """
+        errors = self.validate(tasks_data)
+        if errors:
+            raise SurgeTaskValidationError(errors)
@@ -0,0 +1,266 @@
+import asyncio
+import hashlib
+import inspect
+import json
+from collections import OrderedDict
+
+from surge.tasks import Task
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+class WebhookEvent(object):
+    """A single callback delivered to a WebhookReceiver."""
+
+    def __init__(self, task: Task, raw: dict, key: str):
+        self.task = task
+        self.raw = raw
+        self.key = key
+
+    @property
+    def responses(self):
+        return getattr(self.task, "responses", [])
+
+    @property
+    def response(self):
+        """The most recently completed TaskResponse, if any."""
+        responses = self.responses
+        if not responses:
+            return None
+        return max(responses, key=lambda r: r.completed_at)
+
+    def __repr__(self):
+        return f"<surge.WebhookEvent task={self.task.id} key={self.key}>"
+
+
+class WebhookReceiver(object):
+    """
+    Embeddable asyncio HTTP server that receives the POSTs Surge sends to a
+    project's `callback_url`.
+
+    Each payload is parsed into a Task (with its TaskResponse objects) and
+    redeliveries of an already seen task state are acknowledged but dropped.
+    Events are either passed to `handler` (a function or coroutine function)
+    or put on a bounded `queue`. When the queue is full the receiver answers
+    503 so that the sender retries later instead of buffering without limit.
+
+    Usage:
+        async with WebhookReceiver(port=8080) as receiver:
+            async for event in receiver.events():
+                print(event.task.id, event.response)
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 path: str = "/",
+                 handler=None,
+                 queue_size: int = 1000,
+                 dedupe_size: int = 100_000,
+                 max_concurrency: int = 100):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.handler = handler
+        self.queue = asyncio.Queue(
+            maxsize=queue_size) if handler is None else None
+        self.dedupe_size = dedupe_size
+        self.max_concurrency = max_concurrency
+        self.stats = {
+            "received": 0,
+            "accepted": 0,
+            "duplicates": 0,
+            "rejected": 0,
+            "errors": 0,
+        }
+        self._seen = OrderedDict()
+        self._semaphore = None
+        self._server = None
+
+    async def start(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._handle_connection,
+                                                  self.host, self.port)
+        # Resolve the real port when an ephemeral one (0) was requested
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}{self.path}"
+
+    async def events(self):
+        """Yield events from the queue as they arrive."""
+        if self.queue is None:
+            raise RuntimeError(
+                "events() is not available when a handler is set.")
+        while True:
+            event = await self.queue.get()
+            try:
+                yield event
+            finally:
+                self.queue.task_done()
+
+    @staticmethod
+    def parse_payload(payload: dict):
+        """Convert a callback payload into a WebhookEvent."""
+        task_json = payload.get("task", payload)
+        task = Task(**dict(task_json))
+        response_ids = sorted(r.id for r in getattr(task, "responses", []))
+        key = hashlib.sha256(
+            json.dumps([task.id, response_ids]).encode("utf-8")).hexdigest()
+        return WebhookEvent(task, payload, key)
+
+    def _is_duplicate(self, key):
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return True
+        return False
+
+    def _remember(self, key):
+        self._seen[key] = True
+        if len(self._seen) > self.dedupe_size:
+            self._seen.popitem(last=False)
+
+    async def _dispatch(self, event):
+        if self.handler is None:
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                return False
+            return True
+
+        async with self._semaphore:
+            result = self.handler(event)
+            if inspect.isawaitable(result):
+                await result
+        return True
+
+    async def _process(self, method, target, body):
+        if target.split("?", 1)[0] != self.path:
+            return 404
+        if method != "POST":
+            return 405
+
+        self.stats["received"] += 1
+        try:
+            event = self.parse_payload(json.loads(body))
+        except Exception:
+            self.stats["rejected"] += 1
+            return 400
+
+        if self._is_duplicate(event.key):
+            self.stats["duplicates"] += 1
+            return 200
+
+        # Claim the key before dispatching so concurrent redeliveries of the
+        # same state are dropped, and release it if the event wasn't taken.
+        self._remember(event.key)
+        try:
+            accepted = await self._dispatch(event)
+        except Exception:
+            self._seen.pop(event.key, None)
+            self.stats["errors"] += 1
+            return 503
+        if not accepted:
+            self._seen.pop(event.key, None)
+            return 503
+
+        self.stats["accepted"] += 1
+        return 200
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, keep_alive=False)
+                    break
+                if len(head) > MAX_HEADER_BYTES:
+                    await self._respond(writer, 413, keep_alive=False)
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, keep_alive=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if version == "HTTP/1.0":
+                    keep_alive = headers.get("connection",
+                                             "").lower() == "keep-alive"
+
+                if "content-length" not in headers:
+                    if method == "POST":
+                        await self._respond(writer, 411, keep_alive=False)
+                        break
+                    body = b""
+                else:
+                    try:
+                        length = int(headers["content-length"])
+                    except ValueError:
+                        length = -1
+                    if length < 0:
+                        await self._respond(writer, 400, keep_alive=False)
+                        break
+                    if length > MAX_BODY_BYTES:
+                        await self._respond(writer, 413, keep_alive=False)
+                        break
+                    body = await reader.readexactly(length)
+
+                status = await self._process(method, target, body)
+                await self._respond(writer, status, keep_alive=keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _respond(writer, status, keep_alive=True):
+        body = json.dumps({"status": status}).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                f"\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
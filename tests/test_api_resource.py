@@ -5,7 +5,12 @@ import requests
 
 import surge
 from surge.api_resource import APIResource
-from surge.errors import SurgeRequestError, SurgeMissingAPIKeyError
+from surge.errors import (
+    SurgeRequestError,
+    SurgeMissingAPIKeyError,
+    SurgeTimeoutError,
+)
+from surge.timeouts import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
 
 
 def test_raise_exception_if_missing_api_key():
@@ -28,7 +33,7 @@ def test_raise_exception_if_invalid_api_key():
 
 def test_passed_in_api_key():
     with mock.patch.object(requests, "get") as mock_request:
-        mock_request.return_value = mock.MagicMock()
+        mock_request.return_value = mock.MagicMock(content=b"{}")
         APIResource._base_request("get",
                                   surge.api_resource.PROJECTS_ENDPOINT,
                                   api_key="passed_api_key")
@@ -36,13 +41,14 @@ def test_passed_in_api_key():
             "https://app.surgehq.ai/api/projects",
             auth=("passed_api_key", ""),
             params=None,
+            timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
         )
 
 
 def test_passed_in_file():
     with mock.patch.object(requests, "post") as mock_request:
         files = {"file": StringIO()}
-        mock_request.return_value = mock.MagicMock()
+        mock_request.return_value = mock.MagicMock(content=b"{}")
         APIResource._base_request(
             "post",
             surge.api_resource.PROJECTS_ENDPOINT,
@@ -54,6 +60,7 @@ def test_passed_in_file():
             auth=("passed_api_key", ""),
             files=files,
             json=None,
+            timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
         )
 
 
@@ -71,3 +78,43 @@ def test_get_passed_in_file():
 def test_print_attrs():
     a1 = APIResource(id="ABC1234").print_attrs()
     assert a1 == 'id="ABC1234"'
+
+
+def test_configured_timeout_is_passed():
+    with mock.patch.object(requests, "get") as mock_request, \
+         mock.patch.object(surge, "timeout", 5):
+        mock_request.return_value.content = b"{}"
+        APIResource._base_request("get",
+                                  surge.api_resource.PROJECTS_ENDPOINT,
+                                  api_key="passed_api_key")
+        assert mock_request.call_args.kwargs["timeout"] == (5, 5)
+
+
+def test_deadline_caps_timeout():
+    with mock.patch.object(requests, "get") as mock_request:
+        mock_request.return_value.content = b"{}"
+        with surge.deadline(3):
+            APIResource._base_request("get",
+                                      surge.api_resource.PROJECTS_ENDPOINT,
+                                      api_key="passed_api_key")
+        connect, read = mock_request.call_args.kwargs["timeout"]
+        assert 2 < connect <= 3 and 2 < read <= 3
+
+
+def test_expired_deadline_fails_fast():
+    with mock.patch.object(requests, "get") as mock_request:
+        with pytest.raises(SurgeTimeoutError):
+            with surge.deadline(0):
+                APIResource._base_request("get",
+                                          surge.api_resource.PROJECTS_ENDPOINT,
+                                          api_key="passed_api_key")
+        mock_request.assert_not_called()
+
+
+def test_request_timeout_raises_timeout_error():
+    with mock.patch.object(requests, "get") as mock_request:
+        mock_request.side_effect = requests.exceptions.ReadTimeout("slow")
+        with pytest.raises(SurgeTimeoutError):
+            APIResource._base_request("get",
+                                      surge.api_resource.PROJECTS_ENDPOINT,
+                                      api_key="passed_api_key")
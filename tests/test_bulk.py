@@ -0,0 +1,212 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+import pytest
+
+from surge.bulk import (AdaptiveChunker, BulkResult, Checkpoint, bounded_map,
+                        pipelined_upload)
+from surge.errors import SurgeRequestError, SurgeTimeoutError
+from surge.timeouts import deadline
+
+
+def test_bounded_map_preserves_order_and_captures_errors():
+
+    def square(x):
+        if x == 3:
+            raise ValueError("bad")
+        time.sleep(0.001 * (5 - x))
+        return x * x
+
+    results = list(bounded_map(square, range(5), max_workers=4))
+    assert [item for item, _, _ in results] == [0, 1, 2, 3, 4]
+    assert [result for _, result, _ in results] == [0, 1, 4, None, 16]
+    assert isinstance(results[3][2], ValueError)
+
+
+def test_bounded_map_limits_concurrency_and_read_ahead():
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "read": 0}
+
+    def items():
+        for i in range(50):
+            state["read"] += 1
+            yield i
+
+    def work(x):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.001)
+        with lock:
+            state["active"] -= 1
+        return x
+
+    iterator = bounded_map(work, items(), max_workers=3)
+    next(iterator)
+    assert state["read"] <= 7
+    list(iterator)
+    assert state["peak"] <= 3
+
+
+def test_bulk_result_counts():
+    result = BulkResult()
+    result.add_success("a")
+    result.add_failure("b", ValueError())
+    result.finish()
+    assert result.total == 2
+    assert result.rate > 0
+
+
+def test_checkpoint_saves_periodically(tmp_path):
+    path = str(tmp_path / "checkpoint")
+    checkpoint = Checkpoint(path, save_every=2)
+    assert checkpoint.offset == 0
+    checkpoint.advance(1)
+    assert Checkpoint(path).offset == 0
+    checkpoint.advance(2)
+    assert Checkpoint(path).offset == 2
+
+
+def test_bounded_map_propagates_deadline():
+    import surge
+    from surge.timeouts import remaining
+
+    with surge.deadline(30):
+        results = list(bounded_map(lambda _: remaining(), range(3)))
+    assert all(0 < left <= 30 for _, left, _ in results)
+
+
+def test_adaptive_chunker_grows_additively_and_backs_off():
+    chunker = AdaptiveChunker(initial_rows=10, step=5, target_latency=1.0)
+    assert not chunker.record(10, 1000, 0.1)
+    assert chunker.chunk_rows == 15
+    assert not chunker.record(15, 1500, 2.0)
+    assert chunker.chunk_rows == 7
+    assert chunker.record(7, 700, 0.1, SurgeRequestError("413",
+                                                         status_code=413))
+    assert chunker.chunk_rows == 3 and chunker.chunk_bytes == 350
+    # Other errors don't say anything about the chunk size
+    assert not chunker.record(3, 300, 0.1, SurgeRequestError("bad row"))
+    assert chunker.chunk_rows == 3
+    assert chunker.to_dict()["overloads"] == 1
+    assert [d["outcome"]
+            for d in chunker.decisions] == ["ok", "slow", "overload", "error"]
+
+
+def test_adaptive_chunker_only_resends_rejected_chunks():
+    chunker = AdaptiveChunker(initial_rows=40)
+    # The server may have created the tasks of a chunk that timed out
+    for error in [
+            SurgeTimeoutError(),
+            SurgeRequestError("502", status_code=502),
+            SurgeRequestError("504", status_code=504)
+    ]:
+        assert not chunker.record(40, 4000, 0.1, error)
+    assert chunker.overloads == 3 and chunker.chunk_rows == 5
+    for status in [413, 429, 503]:
+        assert chunker.record(40, 4000, 0.1,
+                              SurgeRequestError("", status_code=status))
+
+    chunker = AdaptiveChunker(resend_timeouts=True)
+    assert chunker.record(40, 4000, 0.1, SurgeTimeoutError())
+
+
+def test_adaptive_chunker_ignores_deadline_errors():
+    chunker = AdaptiveChunker(initial_rows=40)
+    with deadline(0):
+        assert not chunker.record(40, 4000, 0.1, SurgeTimeoutError())
+    assert chunker.chunk_rows == 40 and chunker.overloads == 0
+    assert chunker.decisions[-1]["outcome"] == "deadline"
+
+
+def test_adaptive_chunker_takes_chunks_bounded_by_bytes():
+    chunker = AdaptiveChunker(initial_rows=10, max_bytes=100)
+    rows = iter([{"text": "x" * 30}] * 5 + [{"text": "x" * 200}, {"n": 1}])
+    pending = deque()
+    sizes = []
+    while True:
+        chunk = chunker.take(rows, pending)
+        if not chunk:
+            break
+        sizes.append(len(chunk))
+    # Oversized rows are sent alone
+    assert sizes == [2, 2, 1, 1, 1]
+
+
+def test_pipelined_upload_yields_everything_with_bounded_read_ahead():
+    state = {"read": 0, "uploaded": 0}
+
+    def rows():
+        for i in range(1000):
+            state["read"] += 1
+            yield {"n": i}
+
+    def upload(chunk):
+        time.sleep(0.001)
+        state["uploaded"] += len(chunk)
+        return [row["n"] for row in chunk]
+
+    chunker = AdaptiveChunker(initial_rows=10, step=0)
+    results = pipelined_upload(upload,
+                               rows(),
+                               chunker=chunker,
+                               max_workers=3,
+                               queue_size=2)
+    first = next(results)
+    # Chunks on the queue, in the workers and in the result queue
+    assert state["read"] - state["uploaded"] <= 10 * (2 + 3 + 1)
+    pairs = [first, *results]
+    assert all(row["n"] == result for row, result in pairs)
+    assert sorted(result for _, result in pairs) == list(range(1000))
+
+
+def test_pipelined_upload_stops_on_errors():
+    before = threading.active_count()
+
+    def upload(chunk):
+        if any(row["n"] == 55 for row in chunk):
+            raise SurgeRequestError("bad row", status_code=400)
+        return [row["n"] for row in chunk]
+
+    rows = ({"n": i} for i in itertools.count())
+    with pytest.raises(SurgeRequestError):
+        list(
+            pipelined_upload(upload,
+                             rows,
+                             chunker=AdaptiveChunker(initial_rows=10, step=0),
+                             max_workers=2))
+    assert threading.active_count() == before
+
+    # Abandoning the generator stops the pipeline too
+    results = pipelined_upload(lambda chunk: chunk, itertools.count())
+    next(results)
+    results.close()
+    assert threading.active_count() == before
+
+
+def test_pipelined_upload_yields_committed_results_before_raising():
+    committed = set()
+    lock = threading.Lock()
+
+    def upload(chunk):
+        if chunk[0]["n"] == 30:
+            raise SurgeRequestError("bad row", status_code=400)
+        # The other chunks are still in flight when the error is raised
+        time.sleep(0.05)
+        with lock:
+            committed.update(row["n"] for row in chunk)
+        return [row["n"] for row in chunk]
+
+    yielded = []
+    with pytest.raises(SurgeRequestError):
+        for row, result in pipelined_upload(upload, ({
+                "n": i
+        } for i in range(10_000)),
+                                            chunker=AdaptiveChunker(
+                                                initial_rows=10, step=0),
+                                            max_workers=4):
+            yielded.append(result)
+    assert committed and sorted(yielded) == sorted(committed)
+    assert 30 not in yielded
@@ -0,0 +1,216 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import pytest
+
+from surge.caching import ResponseCache, SingleFlight, TaskCache, TTLCache
+from surge.errors import SurgeTimeoutError
+
+
+def test_get_and_set_record_hits_and_misses():
+    cache = TTLCache(ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire():
+    cache = TTLCache(ttl=10)
+    with mock.patch("surge.caching.time.monotonic", return_value=100):
+        cache.set("a", 1)
+    with mock.patch("surge.caching.time.monotonic", return_value=105):
+        assert "a" in cache
+    with mock.patch("surge.caching.time.monotonic", return_value=111):
+        assert "a" not in cache
+        assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+
+def test_invalidate_where():
+    cache = TTLCache()
+    cache.set(("P1", "S1"), True)
+    cache.set(("P2", "S1"), False)
+    cache.set(("P2", "S2"), True)
+    cache.invalidate_where(lambda key: key[1] == "S1")
+    assert len(cache) == 1
+
+
+def _run_together(flights, fn, n, key="key"):
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        futures = [executor.submit(flights.do, key, fn) for _ in range(n)]
+        return [f.exception() or f.result() for f in futures]
+
+
+def test_single_flight_shares_one_call():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(1)
+        return {"id": "P1", "questions": [{"id": "Q1"}]}
+
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+    results = _run_together(flights, fn, 5)
+    assert len(calls) == 1
+    assert (flights.calls, flights.coalesced) == (1, 4)
+    assert all(r == {"id": "P1", "questions": [{"id": "Q1"}]} for r in results)
+    # Every caller gets its own copy
+    assert len({id(r["questions"]) for r in results}) == 5
+
+
+def test_single_flight_shares_errors_and_forgets_them():
+    flights = SingleFlight()
+    release = threading.Event()
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+
+    def fail():
+        release.wait(1)
+        raise ValueError("boom")
+
+    results = _run_together(flights, fail, 3)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flights.do("key", lambda: "ok") == "ok"
+
+
+def test_single_flight_follower_timeout():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(1)
+        return 1
+
+    leader = threading.Thread(target=flights.do, args=("key", slow))
+    leader.start()
+    started.wait(1)
+    with pytest.raises(SurgeTimeoutError):
+        flights.do("key", slow, timeout=0.01)
+    release.set()
+    leader.join()
+
+
+def _key(endpoint):
+    return ("https://surge.test/api", endpoint, "params", "key")
+
+
+def test_response_cache_only_caches_configured_routes():
+    cache = ResponseCache(ttls={"teams/{id}": 60})
+    cache.set("teams/{id}", _key("teams/1"), {"name": "A"})
+    cache.set("teams/list", _key("teams/list"), [])
+    assert len(cache) == 1
+
+    team = cache.get("teams/{id}", _key("teams/1"))
+    assert team == {"name": "A"}
+    # Callers get copies they are free to mutate
+    team["name"] = "B"
+    assert cache.get("teams/{id}", _key("teams/1")) == {"name": "A"}
+    assert cache.get("teams/{id}", _key("teams/2")) is None
+    assert cache.stats == {"teams/{id}": {"hits": 2, "misses": 1}}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_response_cache_entries_expire_per_route():
+    cache = ResponseCache(ttls={"teams/{id}": 10, "projects/{id}": 60})
+    with mock.patch("time.monotonic", return_value=0):
+        cache.set("teams/{id}", _key("teams/1"), {})
+        cache.set("projects/{id}", _key("projects/1"), {})
+    with mock.patch("time.monotonic", return_value=30):
+        assert cache.get("teams/{id}", _key("teams/1")) is None
+        assert cache.get("projects/{id}", _key("projects/1")) == {}
+
+
+def test_response_cache_writes_invalidate_affected_entries():
+    cache = ResponseCache()
+    for route, endpoint in [("teams/{id}", "teams/1a"),
+                            ("teams/{id}", "teams/2b"),
+                            ("teams/list", "teams/list"),
+                            ("projects/{id}", "projects/3c"),
+                            ("projects/{id}/copies", "projects/3c/copies"),
+                            ("projects/{id}", "projects/4d"),
+                            ("projects/blueprints", "projects/blueprints")]:
+        cache.set(route, _key(endpoint), {})
+
+    def cached():
+        return sorted(key[1] for key in cache._cache._entries)
+
+    cache.invalidate_for_write("teams/1a/add_surgers")
+    assert cached() == [
+        "projects/3c", "projects/3c/copies", "projects/4d",
+        "projects/blueprints", "teams/2b"
+    ]
+    cache.invalidate_for_write("projects/3c")
+    assert cached() == ["projects/4d", "teams/2b"]
+    # Questions belong to projects whose ids aren't in the endpoint
+    cache.invalidate_for_write("items/5e")
+    assert cached() == ["teams/2b"]
+
+
+def test_response_cache_ignores_responses_fetched_during_a_write():
+    cache = ResponseCache()
+    generation = cache.generation
+    cache.invalidate_for_write("teams/1a")
+    cache.set("teams/{id}", _key("teams/1a"), {}, generation=generation)
+    assert len(cache) == 0
+
+
+def _task(task_id, complete=True, text="x"):
+    return {
+        "id": task_id,
+        "project_id": "p1",
+        "is_complete": complete,
+        "fields": {
+            "text": text
+        }
+    }
+
+
+def test_task_cache_persists_completed_tasks(tmp_path):
+    path = str(tmp_path / "tasks.sqlite3")
+    cache = TaskCache(path)
+    assert cache.put(_task("t1"))
+    assert not cache.put(_task("t2", complete=False))
+    assert cache.put_many([_task("t3"), _task("t4", complete=False)]) == 1
+    cache.close()
+
+    cache = TaskCache(path)
+    assert cache.get("t1") == _task("t1")
+    assert cache.get("t2") is None
+    assert "t3" in cache and len(cache) == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.invalidate("t1")
+    assert "t1" not in cache
+
+
+def test_task_cache_evicts_least_recently_used(tmp_path):
+    cache = TaskCache(str(tmp_path / "tasks.sqlite3"))
+    cache.put(_task("t0"))
+    task_size = cache.size
+    cache.max_bytes = 3 * task_size
+
+    with mock.patch("time.time", side_effect=range(1, 100)):
+        cache.put_many([_task("t1"), _task("t2")])
+        cache.get("t0")
+        cache.put(_task("t3"))
+    assert [t for t in ["t0", "t1", "t2", "t3"]
+            if t in cache] == ["t0", "t2", "t3"]
+    assert cache.size == 3 * task_size
+    assert cache.evictions == 1
+
+    # Replacing a task doesn't count its old size twice
+    cache.put(_task("t3"))
+    assert cache.size == 3 * task_size
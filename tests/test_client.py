@@ -0,0 +1,244 @@
+import json
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+import pytest
+import requests
+
+import surge
+from surge.client import RateLimiter, SurgeClient
+from surge.errors import (SurgeMissingAPIKeyError, SurgeRequestError,
+                          SurgeTimeoutError)
+from surge.projects import Project
+from surge.questions import FreeResponseQuestion
+from surge.tasks import Task
+from surge.testing import FakeSurgeAPI
+from surge.timeouts import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+
+PROJECT_JSON = {
+    "id":
+    "P1",
+    "name":
+    "Bound project",
+    "questions": [{
+        "id": "Q1",
+        "type": "free_response",
+        "text": "Why?",
+        "label": "why",
+        "required": True,
+        "preexisting_annotations": None,
+        "shown_by_item_option_id": None,
+        "hidden_by_item_option_id": None,
+        "holistic": False,
+    }],
+}
+
+
+def json_response(data):
+    response = MagicMock()
+    response.content = json.dumps(data).encode("utf-8")
+    return response
+
+
+def test_client_uses_its_own_configuration():
+    surge.api_key = "global-key"
+    client = SurgeClient(api_key="tenant-key",
+                         base_url="https://example.com/api/",
+                         headers={"X-Tenant": "a"})
+    with patch.object(requests, "get") as global_get, \
+         patch.object(client.session, "get") as mock_get:
+        mock_get.return_value = json_response(PROJECT_JSON)
+        project = client.projects.retrieve("P1")
+
+    global_get.assert_not_called()
+    mock_get.assert_called_once_with("https://example.com/api/projects/P1",
+                                     auth=("tenant-key", ""),
+                                     params=None,
+                                     timeout=(DEFAULT_CONNECT_TIMEOUT,
+                                              DEFAULT_READ_TIMEOUT))
+    assert client.session.headers["X-Tenant"] == "a"
+    assert isinstance(project, Project)
+    assert project._client is client
+
+
+def test_objects_returned_by_a_client_stay_bound():
+    client = SurgeClient(api_key="tenant-key")
+    with patch.object(client.session, "get") as mock_get:
+        mock_get.return_value = json_response(PROJECT_JSON)
+        project = client.projects.retrieve("P1")
+        mock_get.return_value = json_response([{
+            "id": "T1",
+            "project_id": "P1"
+        }])
+        tasks = project.list_tasks()
+
+    assert isinstance(tasks[0], Task)
+    assert tasks[0]._client is client
+    question = project.questions[0]
+    assert isinstance(question, FreeResponseQuestion)
+    assert question._client is client
+
+
+def test_module_level_configuration_is_unchanged():
+    assert Project._client is None
+    assert surge.Project is Project
+
+
+def test_clients_are_isolated():
+    first = SurgeClient(api_key="a")
+    second = SurgeClient(api_key="b")
+    assert first.projects is not second.projects
+    assert first.projects.eligibility_cache is first.teams.eligibility_cache
+    assert first.projects.eligibility_cache is not Project.eligibility_cache
+    assert first.rubrics.cache is not second.rubrics.cache
+
+
+def test_client_without_api_key_raises():
+    surge.api_key = None
+    client = SurgeClient()
+    with pytest.raises(SurgeMissingAPIKeyError):
+        client.projects.retrieve("P1")
+
+
+def test_limiter_is_acquired_before_each_request():
+    limiter = MagicMock()
+    client = SurgeClient(api_key="key", limiter=limiter)
+    with patch.object(client.session, "get") as mock_get:
+        mock_get.return_value = json_response({"id": "T1", "project_id": "P1"})
+        client.tasks.retrieve("T1")
+        client.tasks.retrieve("T1")
+    assert limiter.acquire.call_count == 2
+
+
+def test_rate_limiter_allows_burst_then_waits():
+    limiter = RateLimiter(rate=1000, burst=2)
+    with patch("surge.client.time.sleep") as mock_sleep:
+        limiter.acquire()
+        limiter.acquire()
+        mock_sleep.assert_not_called()
+
+
+def test_rate_limiter_gives_up_at_the_deadline():
+    limiter = RateLimiter(rate=0.1, burst=1)
+    limiter.acquire()
+    started = time.monotonic()
+    with pytest.raises(SurgeTimeoutError):
+        with surge.deadline(0.5):
+            limiter.acquire()
+    assert time.monotonic() - started < 0.1
+
+
+def test_deadline_bounds_retries():
+    # Accepts connections (in the backlog) but never replies
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    host, port = server.getsockname()
+    client = SurgeClient(api_key="key",
+                         base_url=f"http://{host}:{port}",
+                         retry=3)
+    started = time.monotonic()
+    try:
+        with pytest.raises(SurgeTimeoutError):
+            with surge.deadline(0.5):
+                client.projects.retrieve("P1")
+        assert time.monotonic() - started < 0.9
+        # Running out of retries after read timeouts is a timeout too
+        client.timeout = 0.1
+        with pytest.raises(SurgeTimeoutError):
+            client.projects.retrieve("P1")
+    finally:
+        client.close()
+        server.close()
+
+
+def test_client_timeout():
+    client = SurgeClient(api_key="key", timeout=(1, 2))
+    with patch.object(client.session, "get") as mock_get:
+        mock_get.return_value = json_response({"id": "T1", "project_id": "P1"})
+        client.tasks.retrieve("T1")
+    assert mock_get.call_args.kwargs["timeout"] == (1, 2)
+
+
+def test_concurrent_identical_gets_are_coalesced():
+    with FakeSurgeAPI(latency=0.1) as api:
+        project_id = api.add_project("Shared")["id"]
+        client = SurgeClient(api_key="key", base_url=api.base_url)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            projects = list(
+                executor.map(lambda _: client.projects.retrieve(project_id),
+                             range(8)))
+        assert api.requests["GET projects/{id}"] == 1
+        assert client.single_flight.coalesced == 7
+        assert all(p.name == "Shared" for p in projects)
+        assert len({id(p.questions[0]) for p in projects}) == 8
+
+        # Different API keys are never coalesced
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(
+                executor.map(
+                    lambda key: client.projects.retrieve(project_id,
+                                                         api_key=key),
+                    ["key-1", "key-2"]))
+        assert api.requests["GET projects/{id}"] == 3
+
+
+def test_coalescing_can_be_disabled():
+    with FakeSurgeAPI(latency=0.05) as api:
+        project_id = api.add_project("Shared")["id"]
+        client = SurgeClient(api_key="key",
+                             base_url=api.base_url,
+                             coalesce_gets=False)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(
+                executor.map(lambda _: client.projects.retrieve(project_id),
+                             range(4)))
+        assert api.requests["GET projects/{id}"] == 4
+
+
+def test_response_cache_serves_reads_until_a_write():
+    with FakeSurgeAPI() as api:
+        project_id = api.add_project("Dashboard")["id"]
+        team_id = api.add_team("Reviewers")["id"]
+        client = SurgeClient(api_key="key",
+                             base_url=api.base_url,
+                             response_cache=True)
+        for _ in range(3):
+            project = client.projects.retrieve(project_id)
+            team = client.teams.retrieve(team_id)
+            client.teams.list()
+        assert api.requests["GET projects/{id}"] == 1
+        assert api.requests["GET teams/{id}"] == 1
+        assert api.requests["GET teams/list"] == 1
+        assert client.response_cache.stats["teams/{id}"] == {
+            "hits": 2,
+            "misses": 1
+        }
+
+        team.update(name="Senior reviewers")
+        assert client.teams.retrieve(team_id).name == "Senior reviewers"
+        client.teams.list()
+        assert api.requests["GET teams/list"] == 2
+        assert api.requests["GET projects/{id}"] == 1
+
+        project.questions[0].update(text="Updated")
+        client.projects.retrieve(project_id)
+        assert api.requests["GET projects/{id}"] == 2
+
+        # Clients don't share a cache unless given the same one
+        SurgeClient(api_key="key", base_url=api.base_url).teams.list()
+        assert api.requests["GET teams/list"] == 3
+
+
+def test_response_cache_is_invalidated_when_a_project_is_deleted():
+    with FakeSurgeAPI() as api:
+        client = SurgeClient(api_key="key",
+                             base_url=api.base_url,
+                             response_cache=True)
+        project = client.projects.create("Short lived")
+        assert client.projects.retrieve(project.id).name == "Short lived"
+        project.delete()
+        with pytest.raises(SurgeRequestError):
+            client.projects.retrieve(project.id)
+        assert api.requests["GET projects/{id}"] == 2
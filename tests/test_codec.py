@@ -0,0 +1,102 @@
+import json
+from unittest import mock
+import pytest
+
+import surge
+from surge.codec import (
+    CODECS,
+    StdlibJSONCodec,
+    available_codecs,
+    get_codec,
+)
+from surge.projects import Project
+from surge.responses import TaskResponse
+
+PAYLOAD = {
+    "id": "P1",
+    "name": "Ünïcode ✓",
+    "fields": [1, 2.5, None, True],
+    "nested": {
+        "key": "value"
+    },
+}
+
+
+@pytest.mark.parametrize("name", available_codecs())
+def test_codecs_round_trip(name):
+    codec = get_codec(name)
+    data = codec.dumps(PAYLOAD)
+    assert isinstance(data, bytes)
+    assert codec.loads(data) == PAYLOAD
+    assert codec.loads(codec.dumps_str(PAYLOAD)) == PAYLOAD
+    assert StdlibJSONCodec().loads(data) == PAYLOAD
+
+
+def test_default_codec_is_fastest_available():
+    assert available_codecs()[-1] == "json"
+    with mock.patch.object(surge, "json_codec", None):
+        assert get_codec().name == available_codecs()[0]
+    with mock.patch.object(surge, "json_codec", "json"):
+        assert get_codec().name == "json"
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("simplejson")
+
+
+@pytest.mark.parametrize("name", available_codecs())
+def test_codecs_fall_back_for_big_integers(name):
+    value = {"count": 2**70}
+    assert get_codec(name).loads(get_codec(name).dumps(value)) == value
+
+
+@pytest.mark.parametrize("name", available_codecs())
+def test_to_json_does_not_depend_on_codec(name):
+    with mock.patch.object(surge, "json_codec", name):
+        project = Project(id="P1", name="Ünïcode", questions=[])
+        assert project.to_json() == json.dumps(project.to_dict())
+        response = TaskResponse("R1", {"answer": "yes"},
+                                "2021-01-01T00:00:00Z")
+        assert response.to_json() == json.dumps(response.to_dict())
+
+
+@pytest.mark.parametrize("name", available_codecs())
+@pytest.mark.parametrize("value", [float("nan"), float("inf")])
+def test_codecs_reject_non_finite_floats(name, value):
+    with pytest.raises(ValueError):
+        get_codec(name).dumps({"fields": [{"score": value}, None]})
+
+
+def test_request_with_nan_is_not_sent():
+    surge.api_key = "key"
+    with mock.patch("requests.post") as mock_post:
+        with pytest.raises(surge.errors.SurgeRequestError) as e_info:
+            Project.post("projects", {"score": float("nan")})
+    assert not mock_post.called
+    assert "Invalid JSON in request body" in str(e_info.value)
+
+
+def test_request_body_is_encoded_with_codec():
+    surge.api_key = "key"
+    with mock.patch("requests.post") as mock_post, \
+         mock.patch.object(surge, "json_codec", "json"):
+        mock_post.return_value.content = b'{"id": "T1"}'
+        assert Project.post("projects", {"name": "x"}) == {"id": "T1"}
+    kwargs = mock_post.call_args.kwargs
+    assert kwargs["data"] == b'{"name": "x"}'
+    assert kwargs["headers"]["Content-Type"] == "application/json"
+    assert "json" not in kwargs
+
+
+def test_invalid_response_json():
+    surge.api_key = "key"
+    with mock.patch("requests.get") as mock_get:
+        mock_get.return_value.content = b"<html>"
+        with pytest.raises(surge.errors.SurgeRequestError) as e_info:
+            Project.get("projects")
+    assert "Invalid JSON" in str(e_info.value)
+
+
+def test_codecs_are_registered():
+    assert set(CODECS) == {"orjson", "ujson", "json"}
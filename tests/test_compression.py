@@ -0,0 +1,108 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+import pytest
+
+import surge
+from surge.api_resource import APIResource
+from surge.client import SurgeClient
+from surge.errors import SurgeRequestError
+from surge.instrumentation import MetricsCollector
+from surge.testing import FakeSurgeAPI
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """Decodes the request body like the API does and echoes what it received."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers["Content-Length"]))
+        encoding = self.headers.get("Content-Encoding")
+        data = gzip.decompress(raw) if encoding == "gzip" else raw
+        body = json.dumps({
+            "encoding": encoding,
+            "wire_bytes": len(raw),
+            "params": json.loads(data),
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=httpd.serve_forever,
+                              args=(0.05, ),
+                              daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/api"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+TASKS = {
+    "tasks": [{
+        "text": f"A fairly repetitive task text number {i} " * 5
+    } for i in range(200)]
+}
+
+
+def test_large_bodies_are_gzipped(server):
+    client = SurgeClient(api_key="key", base_url=server, gzip_threshold=1024)
+    metrics = MetricsCollector().install(client.hooks)
+
+    response = client.tasks.post("projects/P1/tasks", TASKS)
+
+    assert response["encoding"] == "gzip"
+    assert response["params"] == TASKS
+    event_metrics = metrics.snapshot()["POST projects/{id}/tasks"]
+    assert event_metrics["bytes_sent"] == response["wire_bytes"]
+    assert event_metrics["bytes_saved"] > 5 * event_metrics["bytes_sent"]
+    assert "surge_client_request_bytes_saved_total" in metrics.to_prometheus()
+
+
+def test_small_bodies_are_not_gzipped(server):
+    client = SurgeClient(api_key="key", base_url=server, gzip_threshold=1024)
+    events = []
+    client.hooks.register(after_response=events.append)
+
+    response = client.projects.post("projects", {"name": "Small"})
+
+    assert response["encoding"] is None
+    assert response["params"] == {"name": "Small"}
+    assert events[0].bytes_saved == 0
+    assert events[0].bytes_uncompressed == events[0].bytes_sent
+
+
+def test_compression_is_off_by_default(server):
+    client = SurgeClient(api_key="key", base_url=server)
+    assert client.tasks.post("projects/P1/tasks", TASKS)["encoding"] is None
+
+
+def test_module_level_threshold(server):
+    with mock.patch.object(surge, "base_url", server), \
+         mock.patch.object(surge, "api_key", "key"), \
+         mock.patch.object(surge, "gzip_threshold", 0):
+        response = APIResource.post("projects", {"name": "Small"})
+    assert response["encoding"] == "gzip"
+    assert response["params"] == {"name": "Small"}
+
+
+def test_failed_requests_save_nothing_without_compression():
+    with FakeSurgeAPI(error_rate=1.0) as api:
+        client = SurgeClient(api_key="key", base_url=api.base_url)
+        metrics = MetricsCollector().install(client.hooks)
+        with pytest.raises(SurgeRequestError):
+            client.tasks.create_many("P1", TASKS["tasks"][:50], False)
+    event_metrics = metrics.snapshot()["POST projects/{id}/tasks/create_tasks"]
+    assert event_metrics["errors"] == 1
+    assert event_metrics["bytes_sent"] > 5000
+    assert event_metrics["bytes_saved"] == 0
+    assert event_metrics["bytes_received"] > 0
@@ -0,0 +1,144 @@
+from unittest import mock
+
+import pytest
+
+from surge.bulk import AdaptiveChunker
+from surge.dedup import BloomFilter, Deduplicator, HashIndex, task_fingerprint
+from surge.errors import SurgeRequestError
+from surge.tasks import Task
+
+
+def test_fingerprint_ignores_key_order():
+    assert task_fingerprint({
+        "a": 1,
+        "b": "x"
+    }) == task_fingerprint({
+        "b": "x",
+        "a": 1
+    })
+    assert task_fingerprint({"a": 1}) != task_fingerprint({"a": "1"})
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    fingerprints = [task_fingerprint({"n": i}) for i in range(10_000)]
+    for f in fingerprints[:5_000]:
+        bloom.add(f)
+    assert all(f in bloom for f in fingerprints[:5_000])
+    false_positives = sum(f in bloom for f in fingerprints[5_000:])
+    assert false_positives < 5_000 * 0.01 * 2
+
+
+def test_deduplicator_counts_dropped_rows():
+    dedup = Deduplicator()
+    rows = [{"n": i % 3} for i in range(10)]
+    assert list(dedup.filter(rows)) == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert (dedup.rows, dedup.dropped) == (10, 7)
+
+
+def test_hash_index_persists_across_runs(tmp_path):
+    path = str(tmp_path / "seen.sqlite3")
+    with Deduplicator(HashIndex(path)) as dedup:
+        assert list(dedup.filter([{
+            "n": 1
+        }, {
+            "n": 2
+        }, {
+            "n": 1
+        }])) == [{
+            "n": 1
+        }, {
+            "n": 2
+        }]
+        # Only the rows that were uploaded are remembered
+        dedup.commit([{"n": 1}])
+
+    with Deduplicator(HashIndex(path)) as dedup:
+        assert list(dedup.filter([{
+            "n": 1
+        }, {
+            "n": 2
+        }, {
+            "n": 3
+        }])) == [{
+            "n": 2
+        }, {
+            "n": 3
+        }]
+        assert dedup.dropped == 1
+
+
+def test_deduplicator_rolls_back_pending_rows():
+    dedup = Deduplicator(BloomFilter(capacity=100))
+    assert list(dedup.filter([{"n": 1}, {"n": 1}])) == [{"n": 1}]
+    dedup.rollback()
+    assert list(dedup.filter([{"n": 1}])) == [{"n": 1}]
+    dedup.forget({"n": 1})
+    assert list(dedup.filter([{"n": 1}])) == [{"n": 1}]
+
+
+def test_create_in_chunks_drops_duplicates_and_forgets_failures():
+
+    def create_many(project_id, tasks_data, launch, api_key=None):
+        if any(t["n"] == 4 for t in tasks_data):
+            raise SurgeRequestError("400 Bad Request", status_code=400)
+        return [
+            Task(id=str(t["n"]), project_id=project_id) for t in tasks_data
+        ]
+
+    dedup = Deduplicator()
+    rows = [{"n": i % 5} for i in range(20)]
+    with mock.patch.object(Task, "create_many", side_effect=create_many):
+        result = Task.create_in_chunks("p1", iter(rows), dedup=dedup)
+    assert (len(result.succeeded), len(result.failed)) == (0, 5)
+    assert dedup.dropped == 15
+    assert list(dedup.filter([{"n": 4}])) == [{"n": 4}]
+
+
+def test_create_in_chunks_flushes_the_index(tmp_path):
+    path = str(tmp_path / "seen.sqlite3")
+    dedup = Deduplicator(HashIndex(path))
+
+    def create_many(project_id, tasks_data, launch, api_key=None):
+        return [
+            Task(id=str(t["n"]), project_id=project_id) for t in tasks_data
+        ]
+
+    with mock.patch.object(Task, "create_many", side_effect=create_many):
+        Task.create_in_chunks("p1", [{"n": 1}, {"n": 2}], dedup=dedup)
+    assert len(HashIndex(path)) == 2
+    dedup.close()
+
+
+def test_create_streaming_only_remembers_created_rows(tmp_path):
+    path = str(tmp_path / "seen.sqlite3")
+
+    def create_many(project_id, tasks_data, launch, api_key=None):
+        if any(t["n"] == 25 for t in tasks_data):
+            raise SurgeRequestError("400 Bad Request", status_code=400)
+        return [
+            Task(id=str(t["n"]), project_id=project_id) for t in tasks_data
+        ]
+
+    rows = [{"n": i} for i in range(1000)]
+    created = []
+    with Deduplicator(HashIndex(path)) as dedup, \
+         mock.patch.object(Task, "create_many", side_effect=create_many):
+        with pytest.raises(SurgeRequestError):
+            for row, _ in Task.create_streaming("p1",
+                                                iter(rows),
+                                                max_workers=2,
+                                                chunker=AdaptiveChunker(
+                                                    initial_rows=10, step=0),
+                                                dedup=dedup):
+                created.append(row)
+        assert len(HashIndex(path)) == len(created)
+
+    # The failed chunk and the rows read ahead are uploaded by the next run
+    with Deduplicator(HashIndex(path)) as dedup:
+        retried = list(dedup.filter(rows))
+    assert {row["n"]
+            for row in retried
+            } == {row["n"]
+                  for row in rows} - {row["n"]
+                                      for row in created}
@@ -16,7 +16,7 @@ class TestDefaultHeaders(unittest.TestCase):
     @patch("requests.get")
     def test_no_default_headers(self, mock_get):
         mock_response = MagicMock()
-        mock_response.json.return_value = {"id": "123"}
+        mock_response.content = b'{"id": "123"}'
         mock_response.raise_for_status = MagicMock()
         mock_get.return_value = mock_response
 
@@ -29,7 +29,7 @@ class TestDefaultHeaders(unittest.TestCase):
     @patch("requests.get")
     def test_actor_type_header_injected(self, mock_get):
         mock_response = MagicMock()
-        mock_response.json.return_value = {"id": "123"}
+        mock_response.content = b'{"id": "123"}'
         mock_response.raise_for_status = MagicMock()
         mock_get.return_value = mock_response
 
@@ -44,7 +44,7 @@ class TestDefaultHeaders(unittest.TestCase):
     @patch("requests.get")
     def test_default_headers_are_copied(self, mock_get):
         mock_response = MagicMock()
-        mock_response.json.return_value = {"id": "123"}
+        mock_response.content = b'{"id": "123"}'
         mock_response.raise_for_status = MagicMock()
         mock_get.return_value = mock_response
 
@@ -0,0 +1,148 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+import surge
+from surge.api_resource import APIResource
+from surge.client import SurgeClient
+from surge.codec import get_codec
+from surge.errors import SurgeRequestError
+from surge.instrumentation import (
+    Hooks,
+    MetricsCollector,
+    RequestEvent,
+    endpoint_route,
+    hooks,
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/api/missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({"id": "P1", "name": "Instrumented"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Runtime", "0.002")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self.rfile.read(length)
+        body = b'{"success": true}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever,
+                              args=(0.05, ),
+                              daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/api"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_endpoint_route():
+    assert endpoint_route("projects/076d207b-c207-41ca-b73a-5822fe2248ab/"
+                          "tasks") == "projects/{id}/tasks"
+    assert endpoint_route("teams/list") == "teams/list"
+
+
+def test_hooks_receive_timings_and_sizes(server):
+    client = SurgeClient(api_key="key", base_url=server)
+    events = []
+    client.hooks.register(before_request=lambda e: events.append(
+        ("before", e.status)),
+                          after_response=lambda e: events.append(("after", e)))
+
+    client.projects.retrieve("P1")
+    client.rubrics.evaluate("text", "rubric")
+
+    assert events[0] == ("before", None)
+    event = events[1][1]
+    assert isinstance(event, RequestEvent)
+    assert event.status == 200
+    assert event.route == "projects/{id}"
+    assert event.bytes_received > 0
+    assert event.timings["server"] == 0.002
+    assert set(event.timings) >= {"headers", "download", "decode", "total"}
+    assert event.timings["total"] >= event.timings["headers"]
+    assert events[3][1].bytes_sent == len(get_codec().dumps({
+        "text_for_grading":
+        "text",
+        "rubric_text":
+        "rubric"
+    }))
+
+
+def test_on_error_hook_and_metrics(server):
+    client = SurgeClient(api_key="key", base_url=server)
+    metrics = MetricsCollector().install(client.hooks)
+    errors = []
+    client.hooks.register(on_error=errors.append)
+
+    client.projects.retrieve("P1")
+    client.projects.retrieve("P2")
+    with pytest.raises(SurgeRequestError):
+        client.projects.get("missing/123")
+
+    assert len(errors) == 1
+    assert errors[0].status == 404
+    assert isinstance(errors[0].error, SurgeRequestError)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["GET projects/{id}"]["count"] == 2
+    assert snapshot["GET missing/{id}"]["errors"] == 1
+
+    text = metrics.to_prometheus()
+    assert ('surge_client_request_duration_seconds_count'
+            '{method="get",endpoint="projects/{id}"} 2') in text
+    assert ('surge_client_requests_total'
+            '{method="get",endpoint="missing/{id}",status="404"} 1') in text
+    assert "# TYPE surge_client_request_duration_seconds histogram" in text
+
+    metrics.uninstall()
+    assert not client.hooks.after_response
+
+
+def test_global_hooks_observe_module_level_requests(server, monkeypatch):
+    monkeypatch.setattr(surge, "base_url", server)
+    seen = []
+    hooks.register(after_response=seen.append)
+    try:
+        APIResource.get("projects/P1", api_key="key")
+    finally:
+        hooks.unregister(after_response=seen.append)
+    assert seen[0].method == "get"
+
+
+def test_failing_hook_does_not_break_request(server):
+    client = SurgeClient(api_key="key", base_url=server)
+
+    def broken(event):
+        raise ValueError("oops")
+
+    client.hooks.register(after_response=broken)
+    with pytest.warns(UserWarning):
+        project = client.projects.retrieve("P1")
+    assert project.id == "P1"
+
+
+def test_empty_hooks_are_falsy():
+    assert not Hooks()
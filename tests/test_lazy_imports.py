@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+import surge
+
+
+def run_python(code):
+    return subprocess.run([sys.executable, "-c", code],
+                          capture_output=True,
+                          text=True,
+                          check=True).stdout.strip()
+
+
+def test_import_surge_does_not_import_resources():
+    output = run_python("import sys, surge; "
+                        "print(sorted(m for m in ('requests', 'dateutil', "
+                        "'surge.projects') if m in sys.modules))")
+    assert output == "[]"
+
+
+def test_resources_resolve_on_first_access():
+    from surge.projects import Project
+    from surge.tasks import Task
+    assert surge.Project is Project
+    assert surge.Task is Task
+    assert "Rubric" in dir(surge)
+
+
+def test_submodules_resolve_on_attribute_access():
+    output = run_python("import surge; print(surge.errors.__name__)")
+    assert output == "surge.errors"
+
+
+def test_unknown_attribute_raises_attribute_error():
+    try:
+        surge.DoesNotExist
+    except AttributeError as err:
+        assert "DoesNotExist" in str(err)
+    else:
+        raise AssertionError("expected AttributeError")
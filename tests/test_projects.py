@@ -459,3 +459,75 @@ def test_update_with_fields_template():
             {"fields_text": "ABC"},
             api_key=None,
         )
+
+
+def test_set_gold_standards_from_csv(tmp_path):
+    csv_path = tmp_path / "gold.csv"
+    csv_path.write_text("task_id,sentiment,topic\nT1,positive,sports\n"
+                        "T2,negative,news\n")
+    project = Project(id="P1", name="Gold")
+
+    with patch.object(surge.tasks.Task, "post") as mock_post:
+        mock_post.return_value = {"is_gold_standard": True}
+        result = project.set_gold_standards_from_csv(str(csv_path))
+
+    assert [t.id for t in result.succeeded] == ["T1", "T2"]
+    assert result.failed == []
+    sent = sorted(call.args for call in mock_post.call_args_list)
+    assert sent[0][0] == "tasks/T1/gold-standards"
+    assert sent[0][1]["answers"] == ["positive", "sports"]
+
+
+def test_workable_by_surgers_batches_and_caches():
+    surge.caching.eligibility_cache.clear()
+    with patch.object(Project, "get") as mock_get:
+        mock_get.side_effect = lambda endpoint, params, api_key=None: {
+            "workable": params["surger_id"] == "S1"
+        }
+        first = Project.workable_by_surgers(["P1", "P2"], ["S1", "S2"])
+        second = Project.workable_by_surgers(["P1", "P2"], ["S1", "S2"])
+
+    assert first == second == {
+        ("P1", "S1"): True,
+        ("P1", "S2"): False,
+        ("P2", "S1"): True,
+        ("P2", "S2"): False,
+    }
+    assert mock_get.call_count == 4
+
+
+def test_workable_by_surgers_cache_is_scoped_by_api_key_and_base_url():
+    surge.caching.eligibility_cache.clear()
+    with patch.object(Project, "get") as mock_get:
+        mock_get.return_value = {"workable": True}
+        Project.workable_by_surgers(["P1"], ["S1"], api_key="key-a")
+        Project.workable_by_surgers(["P1"], ["S1"], api_key="key-a")
+        assert mock_get.call_count == 1
+        Project.workable_by_surgers(["P1"], ["S1"], api_key="key-b")
+        assert mock_get.call_count == 2
+        with patch.object(surge, "base_url", "http://localhost:9999/api"):
+            Project.workable_by_surgers(["P1"], ["S1"], api_key="key-a")
+        assert mock_get.call_count == 3
+
+
+def test_workable_by_surgers_cache_invalidated_by_writes():
+    surge.caching.eligibility_cache.clear()
+    project = Project(id="P1", name="Eligibility")
+    team = surge.Team(id="T1", description="")
+    with patch.object(Project, "get") as mock_get, \
+         patch.object(Project, "put") as mock_put, \
+         patch.object(surge.Team, "post") as mock_post:
+        mock_get.return_value = {"workable": True}
+        mock_put.return_value = {"id": "P1", "name": "Eligibility"}
+        mock_post.return_value = {"id": "T1", "description": ""}
+
+        Project.workable_by_surgers(["P1", "P2"], ["S1", "S2"])
+        assert mock_get.call_count == 4
+
+        team.add_surgers(["S1"])
+        Project.workable_by_surgers(["P1", "P2"], ["S1", "S2"])
+        assert mock_get.call_count == 6
+
+        project.update(name="Eligibility v2")
+        Project.workable_by_surgers(["P1", "P2"], ["S1", "S2"])
+        assert mock_get.call_count == 8
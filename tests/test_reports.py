@@ -10,3 +10,20 @@ def test_save_report_on_empty_project_raises_an_error():
         with pytest.raises(SurgeRequestError):
             Report.save_report("fake_project_id", "export_csv",
                                "my_report.csv")
+
+
+def test_save_report_polling_stops_at_deadline():
+    import time
+    import surge
+    from surge.errors import SurgeTimeoutError
+
+    with mock.patch.object(Report, "post") as mock_post, \
+         mock.patch("surge.reports.sleep", side_effect=time.sleep) as mock_sleep:
+        mock_post.return_value = {"status": "CREATING", "job_id": "J1"}
+        with pytest.raises(SurgeTimeoutError):
+            with surge.deadline(0.05):
+                Report.save_report("fake_project_id", "export_csv",
+                                   "my_report.csv")
+
+    # The sleep between polls is capped by the time left
+    assert all(call.args[0] <= 0.05 for call in mock_sleep.call_args_list)
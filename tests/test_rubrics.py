@@ -83,3 +83,153 @@ def test_evaluate_returns_dict():
 def test_rubric_inherits_from_api_resource():
     """Test that Rubric class inherits from APIResource"""
     assert issubclass(Rubric, APIResource)
+
+
+def test_evaluate_many_dedupes_and_preserves_order():
+    Rubric.cache.clear()
+    with patch.object(Rubric, "post") as mock_post:
+        mock_post.side_effect = lambda endpoint, params, api_key=None: {
+            "answer": "fox" in params["text_for_grading"],
+            "explanation": params["text_for_grading"],
+        }
+        results = Rubric.evaluate_many([
+            ("The quick brown fox", "Contains an animal"),
+            {
+                "text_for_grading": "A red car",
+                "rubric_text": "Contains an animal"
+            },
+            ("The quick brown fox", "Contains an animal"),
+            ("The quick brown fox", "Contains an animal", "Be strict"),
+        ])
+
+    assert [r["answer"] for r in results] == [True, False, True, True]
+    assert [r["explanation"] for r in results] == [
+        "The quick brown fox", "A red car", "The quick brown fox",
+        "The quick brown fox"
+    ]
+    assert mock_post.call_count == 3
+
+
+def test_evaluate_many_uses_disk_cache_across_runs(tmp_path):
+    from surge.caching import DiskCache
+
+    items = [("Sample text", "Sample rubric")]
+    with patch.object(Rubric, "post") as mock_post:
+        mock_post.return_value = {"answer": True, "explanation": "ok"}
+        first = Rubric.evaluate_many(items,
+                                     cache=DiskCache(str(tmp_path / "db")))
+        second = Rubric.evaluate_many(items,
+                                      cache=DiskCache(str(tmp_path / "db")))
+
+    assert first == second == [{"answer": True, "explanation": "ok"}]
+    assert mock_post.call_count == 1
+
+
+def test_evaluate_many_returns_errors_when_not_raising():
+    from surge.errors import SurgeRequestError
+
+    with patch.object(Rubric, "post") as mock_post:
+        mock_post.side_effect = SurgeRequestError("Rate limited")
+        results = Rubric.evaluate_many([("Sample text", "Sample rubric")],
+                                       cache=False,
+                                       raise_on_error=False)
+
+    assert isinstance(results[0], SurgeRequestError)
+
+
+def test_grade_jsonl_writes_in_order_and_resumes(tmp_path):
+    import json
+    from surge.errors import SurgeRequestError
+
+    input_path = tmp_path / "outputs.jsonl"
+    input_path.write_text("\n".join(
+        json.dumps({
+            "id": f"out-{i}",
+            "text": f"text {i}"
+        }) for i in range(6)) + "\n")
+    output_path = str(tmp_path / "grades.jsonl")
+    checkpoint_path = str(tmp_path / "grades.checkpoint")
+    rubrics = {"concise": "Is it concise?", "polite": "Is it polite?"}
+
+    def flaky_post(endpoint, params, api_key=None):
+        if params["text_for_grading"] == "text 3":
+            raise SurgeRequestError("Rate limited")
+        return {"answer": True, "explanation": params["rubric_text"]}
+
+    with patch.object(Rubric, "post", side_effect=flaky_post):
+        try:
+            Rubric.grade_jsonl(str(input_path),
+                               output_path,
+                               rubrics,
+                               max_workers=1,
+                               checkpoint_path=checkpoint_path,
+                               cache=False)
+        except SurgeRequestError:
+            pass
+
+    with open(output_path) as f:
+        assert [json.loads(l)["line"] for l in f] == [0, 1, 2]
+
+    with patch.object(Rubric, "post") as mock_post:
+        mock_post.return_value = {"answer": False, "explanation": "ok"}
+        graded = Rubric.grade_jsonl(str(input_path),
+                                    output_path,
+                                    rubrics,
+                                    max_workers=4,
+                                    checkpoint_path=checkpoint_path,
+                                    cache=False)
+
+    assert graded == 3
+    assert mock_post.call_count == 6
+    with open(output_path) as f:
+        records = [json.loads(l) for l in f]
+    assert [r["line"] for r in records] == [0, 1, 2, 3, 4, 5]
+    assert records[0] == {
+        "line":
+        0,
+        "id":
+        "out-0",
+        "results": [
+            {
+                "rubric": "concise",
+                "answer": True,
+                "explanation": "Is it concise?"
+            },
+            {
+                "rubric": "polite",
+                "answer": True,
+                "explanation": "Is it polite?"
+            },
+        ],
+    }
+    assert [r["rubric"]
+            for r in records[5]["results"]] == ["concise", "polite"]
+
+
+def test_evaluate_criteria_runs_concurrently_and_aggregates():
+    import time
+    from surge.rubrics import RubricScore
+
+    def slow_post(endpoint, params, api_key=None):
+        time.sleep(0.05)
+        return {
+            "answer": params["rubric_text"] != "Is it rude?",
+            "explanation": params["rubric_text"],
+        }
+
+    rubrics = {
+        "concise": "Is it concise?",
+        "polite": "Is it polite?",
+        "rude": "Is it rude?",
+        "accurate": "Is it accurate?",
+    }
+    with patch.object(Rubric, "post", side_effect=slow_post):
+        score = Rubric.evaluate_criteria("Thank you!", rubrics)
+
+    assert isinstance(score, RubricScore)
+    assert score.passed == ["concise", "polite", "accurate"]
+    assert score.failed == ["rude"]
+    assert score.score == 0.75
+    assert set(score.latencies) == set(rubrics)
+    assert all(latency >= 0.05 for latency in score.latencies.values())
+    assert score.elapsed < 0.05 * len(rubrics)
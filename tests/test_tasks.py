@@ -1,12 +1,20 @@
+import itertools
+import time
+from unittest import mock
 from datetime import datetime
 from dateutil.tz import tzutc
 import pytest
 
 import surge
+from surge.caching import TaskCache
+from surge.client import SurgeClient
+from surge.testing import FakeSurgeAPI
 from surge.api_resource import APIResource
 from surge.projects import Task
 from surge.responses import Response, TaskResponse
-from surge.errors import SurgeMissingIDError, SurgeMissingAttributeError
+from surge.bulk import AdaptiveChunker
+from surge.errors import (SurgeMissingIDError, SurgeMissingAttributeError,
+                          SurgeRequestError, SurgeTimeoutError)
 
 
 def test_raise_exception_if_missing_id():
@@ -116,3 +124,276 @@ def test_str():
              project_id="ABC1234",
              created_at='2021-01-22T19:49:03.185Z'))
     assert t_str == '<surge.Task#XYZ-123-ABC>'
+
+
+def test_set_gold_standards_updates_tasks():
+    task = Task(id="T1", project_id="P1")
+
+    def fake_post(endpoint, data, api_key=None):
+        if endpoint == "tasks/T3/gold-standards":
+            raise surge.errors.SurgeRequestError("Not found")
+        return {"is_gold_standard": True, "gold_standards_data": data}
+
+    with mock.patch.object(Task, "post", side_effect=fake_post):
+        result = Task.set_gold_standards("P1", {
+            task: ["Yes"],
+            "T2": {
+                "gold_standard_answers": ["No"],
+                "explanations": ["Because"]
+            },
+            "T3": ["Maybe"],
+        },
+                                         max_workers=2)
+
+    assert [t.id for t in result.succeeded] == ["T1", "T2"]
+    assert result.succeeded[0] is task
+    assert task.is_gold_standard
+    assert result.succeeded[1].gold_standards_data["explanations"] == [
+        "Because"
+    ]
+    assert [t for t, _ in result.failed] == ["T3"]
+
+
+def test_create_responses_resumes_from_checkpoint(tmp_path):
+    records_path = tmp_path / "predictions.jsonl"
+    records_path.write_text("\n".join(
+        f'{{"task_id": "T{i}", "answers": ["{i}"], "worker_id": "model"}}'
+        for i in range(10)))
+    checkpoint_path = str(tmp_path / "predictions.checkpoint")
+
+    with mock.patch.object(Task, "post") as mock_post:
+        mock_post.return_value = {"success": True}
+        records = itertools.islice(surge.utils.iter_jsonl(str(records_path)),
+                                   4)
+        first = Task.create_responses("P1",
+                                      records,
+                                      checkpoint_path=checkpoint_path)
+        second = Task.create_responses("P1",
+                                       str(records_path),
+                                       checkpoint_path=checkpoint_path)
+
+    assert first.total == 4
+    assert second.total == 6
+    endpoints = [call.args[0] for call in mock_post.call_args_list]
+    assert sorted(endpoints) == sorted(f"tasks/T{i}/create-response"
+                                       for i in range(10))
+    sent = {call.args[0]: call.args[1] for call in mock_post.call_args_list}
+    assert sent["tasks/T0/create-response"] == {
+        "answers": ["0"],
+        "worker_id": "model"
+    }
+    assert surge.bulk.Checkpoint(checkpoint_path).offset == 10
+
+
+def test_completed_tasks_are_served_from_the_task_cache(tmp_path):
+    with FakeSurgeAPI(tasks_per_project=3) as api:
+        project_id = api.add_project("History")["id"]
+        api.create_task(project_id, {"text": "pending"})
+        task_cache = TaskCache(str(tmp_path / "tasks.sqlite3"))
+        client = SurgeClient(api_key="key",
+                             base_url=api.base_url,
+                             task_cache=task_cache)
+
+        tasks = client.tasks.list(project_id)
+        assert len(tasks) == 4 and len(task_cache) == 3
+        for task in tasks:
+            assert client.tasks.retrieve(task.id).fields == task.fields
+        assert api.requests["GET tasks/{id}"] == 1
+
+        tasks[0].create_response(["yes"])
+        client.tasks.retrieve(tasks[0].id)
+        assert api.requests["GET tasks/{id}"] == 2
+
+
+def test_task_cache_is_scoped_by_api_key_and_base_url(tmp_path):
+    with FakeSurgeAPI(tasks_per_project=1) as api:
+        project_id = api.add_project("Tenant")["id"]
+        task_id = api.list_tasks(project_id, 1, 1)[0]["id"]
+        task_cache = TaskCache(str(tmp_path / "tasks.sqlite3"))
+        other_url = api.base_url.replace("127.0.0.1", "localhost")
+        clients = [
+            SurgeClient(api_key=key, base_url=base_url, task_cache=task_cache)
+            for key, base_url in [(
+                "key-a", api.base_url), ("key-b",
+                                         api.base_url), ("key-a", other_url)]
+        ]
+        for client in clients:
+            client.tasks.retrieve(task_id)
+            client.tasks.retrieve(task_id)
+        assert api.requests["GET tasks/{id}"] == 3
+        assert len(task_cache) == 3
+
+        clients[0].tasks.retrieve(task_id, api_key="key-c")
+        assert api.requests["GET tasks/{id}"] == 4
+
+
+def test_retrieve_many_dedupes_and_shares_task_objects():
+    with FakeSurgeAPI(tasks_per_project=5, latency=0.01) as api:
+        project_id = api.add_project("Callbacks")["id"]
+        task_ids = [t["id"] for t in api.list_tasks(project_id, 1, 5)]
+        client = SurgeClient(api_key="key", base_url=api.base_url)
+
+        requested = task_ids[::-1] + task_ids[:2]
+        tasks = client.tasks.retrieve_many(requested, max_workers=4)
+        assert [t.id for t in tasks] == requested
+        assert tasks[-2] is tasks[4] and tasks[-1] is tasks[3]
+        assert api.requests["GET tasks/{id}"] == 5
+
+        again = client.tasks.retrieve_many(task_ids[:3])
+        by_id = {t.id: t for t in tasks}
+        assert all(task is by_id[task.id] for task in again)
+        assert api.requests["GET tasks/{id}"] == 5
+
+        refreshed = client.tasks.retrieve_many(task_ids[:1], refresh=True)
+        assert refreshed[0] is again[0]
+        assert api.requests["GET tasks/{id}"] == 6
+
+
+def test_create_in_chunks_shrinks_chunks_that_are_too_large():
+    sent = []
+
+    def create_many(project_id, tasks_data, launch, api_key=None):
+        sent.append(len(tasks_data))
+        if len(tasks_data) > 30:
+            raise SurgeRequestError("413 Payload Too Large", status_code=413)
+        if any(t.get("bad") for t in tasks_data):
+            raise SurgeRequestError("400 Bad Request", status_code=400)
+        return [Task(id=str(i), project_id=project_id) for i in tasks_data]
+
+    rows = ({"n": i, "bad": i == 90} for i in range(100))
+    chunker = AdaptiveChunker(initial_rows=40, step=10)
+    with mock.patch.object(Task, "create_many", side_effect=create_many):
+        result = Task.create_in_chunks("p1", rows, chunker=chunker)
+
+    assert sent == [40, 20, 30, 40, 20, 30]
+    assert len(result.succeeded) == 70
+    # Other errors fail the whole chunk without resending it
+    assert [row["n"] for row, _ in result.failed] == list(range(70, 100))
+    assert chunker.overloads == 2
+
+
+def test_create_streaming_yields_the_created_task_ids():
+    with FakeSurgeAPI(tasks_per_project=0) as api:
+        project_id = api.add_project("Stream")["id"]
+        client = SurgeClient(api_key="key", base_url=api.base_url)
+        rows = ({"text": f"row {i}"} for i in range(250))
+        created = list(
+            client.tasks.create_streaming(
+                project_id,
+                rows,
+                max_workers=3,
+                chunker=AdaptiveChunker(initial_rows=20)))
+        assert sorted(row["text"]
+                      for row, _ in created) == sorted(f"row {i}"
+                                                       for i in range(250))
+        task_ids = [task_id for _, task_id in created]
+        assert len(set(task_ids)) == 250
+        assert set(task_ids) == set(api.project_task_ids[project_id])
+
+
+def test_create_responses_retries_failed_records_on_resume(tmp_path):
+    records = [{"task_id": f"T{i}", "answers": [str(i)]} for i in range(6)]
+    checkpoint_path = str(tmp_path / "predictions.checkpoint")
+
+    def post(endpoint, data, api_key=None):
+        if endpoint == "tasks/T2/create-response":
+            raise SurgeRequestError("503 Service Unavailable", status_code=503)
+        return {"success": True}
+
+    with mock.patch.object(Task, "post", side_effect=post):
+        first = Task.create_responses("P1",
+                                      records,
+                                      checkpoint_path=checkpoint_path)
+    assert [r["task_id"] for r, _ in first.failed] == ["T2"]
+    assert surge.bulk.Checkpoint(checkpoint_path).state == {
+        "failed": [2],
+        "completed": []
+    }
+
+    with mock.patch.object(Task, "post") as mock_post:
+        mock_post.return_value = {"success": True}
+        second = Task.create_responses("P1",
+                                       records,
+                                       checkpoint_path=checkpoint_path)
+    assert second.total == 1
+    assert mock_post.call_args.args[0] == "tasks/T2/create-response"
+    assert surge.bulk.Checkpoint(checkpoint_path).state == {
+        "failed": [],
+        "completed": []
+    }
+
+
+def test_create_responses_does_not_repost_after_an_interruption(tmp_path):
+    checkpoint_path = str(tmp_path / "predictions.checkpoint")
+    posted = []
+
+    def post(endpoint, data, api_key=None):
+        # Later records finish first, so completions are out of order
+        time.sleep(0.001 * (int(data["answers"][0]) % 4))
+        posted.append(endpoint)
+        return {"success": True}
+
+    def records(stop_at=None):
+        for i in range(300):
+            if i == stop_at:
+                raise KeyboardInterrupt
+            yield {"task_id": f"T{i}", "answers": [str(i)]}
+
+    with mock.patch.object(Task, "post", side_effect=post):
+        with pytest.raises(KeyboardInterrupt):
+            Task.create_responses("P1",
+                                  records(stop_at=250),
+                                  max_workers=8,
+                                  checkpoint_path=checkpoint_path)
+        first = len(posted)
+        Task.create_responses("P1",
+                              records(),
+                              max_workers=8,
+                              checkpoint_path=checkpoint_path)
+    assert first == 250
+    assert sorted(posted) == sorted(f"tasks/T{i}/create-response"
+                                    for i in range(300))
+    assert surge.bulk.Checkpoint(checkpoint_path).offset == 300
+
+
+def test_retrieve_many_does_not_share_tasks_across_api_keys():
+    with FakeSurgeAPI(tasks_per_project=2) as api:
+        project_id = api.add_project("Tenants")["id"]
+        task_ids = [t["id"] for t in api.list_tasks(project_id, 1, 2)]
+        with mock.patch.object(surge, "api_key", "key-a"), \
+             mock.patch.object(surge, "base_url", api.base_url):
+            first = Task.retrieve_many(task_ids)
+            assert Task.retrieve_many(task_ids)[0] is first[0]
+            other = Task.retrieve_many(task_ids, api_key="key-b")
+        assert other[0] is not first[0]
+        assert api.requests["GET tasks/{id}"] == 4
+
+
+def test_create_in_chunks_stops_when_the_deadline_expires():
+    sent = []
+
+    def create_many(project_id, tasks_data, launch, api_key=None):
+        sent.append(len(tasks_data))
+        time.sleep(0.05)
+        surge.timeouts.check_deadline()
+        return [
+            Task(id=str(t["n"]), project_id=project_id) for t in tasks_data
+        ]
+
+    read = []
+
+    def rows():
+        for i in range(20_000):
+            read.append(i)
+            yield {"n": i}
+
+    chunker = AdaptiveChunker(initial_rows=100)
+    with mock.patch.object(Task, "create_many", side_effect=create_many), \
+         surge.deadline(0.12):
+        result = Task.create_in_chunks("p1", rows(), chunker=chunker)
+
+    assert len(sent) <= 3
+    assert len(read) == sum(sent)
+    assert result.total == len(read)
+    assert isinstance(result.failed[-1][1], SurgeTimeoutError)
+    assert chunker.overloads == 0
@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+from surge.teams import Team
+
+
+def make_team(members):
+    return Team(id="TEAM1",
+                name="Raters",
+                description="",
+                members=members,
+                created_at="2021-01-22T19:49:03.185Z")
+
+
+def test_member_ids_accepts_ids_or_objects():
+    team = make_team(["A", {"id": "B", "name": "Bo"}])
+    assert team.member_ids() == {"A", "B"}
+
+
+def test_sync_members_sends_only_the_delta():
+    team = make_team(["A", "B", "C"])
+    with patch.object(Team, "post") as mock_post:
+        mock_post.return_value = {
+            "id": "TEAM1",
+            "description": "",
+            "members": ["B", "C", "D"]
+        }
+        synced = team.sync_members(["B", "C", "D"])
+
+    assert [call.args for call in mock_post.call_args_list] == [
+        ("teams/TEAM1/remove_surgers", {
+            "surger_ids": ["A"]
+        }),
+        ("teams/TEAM1/add_surgers", {
+            "surger_ids": ["D"]
+        }),
+    ]
+    assert synced.member_ids() == {"B", "C", "D"}
+
+
+def test_sync_members_chunks_large_deltas():
+    team = make_team([])
+    with patch.object(Team, "post") as mock_post:
+        mock_post.return_value = {"id": "TEAM1", "description": ""}
+        team.sync_members([f"S{i:03}" for i in range(250)],
+                          chunk_size=100,
+                          max_workers=3)
+
+    sizes = sorted(
+        len(call.args[1]["surger_ids"]) for call in mock_post.call_args_list)
+    assert sizes == [50, 100, 100]
+
+
+def test_sync_members_in_sync_makes_no_requests():
+    team = make_team(["A"])
+    with patch.object(Team, "post") as mock_post:
+        assert team.sync_members({"A"}) is team
+        mock_post.assert_not_called()
+
+
+def test_sync_members_refresh_retrieves_membership():
+    team = make_team(["A"])
+    with patch.object(Team, "get") as mock_get, \
+         patch.object(Team, "post") as mock_post:
+        mock_get.return_value = {
+            "id": "TEAM1",
+            "description": "",
+            "members": ["A", "B"]
+        }
+        mock_post.return_value = {"id": "TEAM1", "description": ""}
+        team.sync_members(["A"], refresh=True)
+
+    mock_get.assert_called_once()
+    mock_post.assert_called_once_with("teams/TEAM1/remove_surgers",
+                                      {"surger_ids": ["B"]},
+                                      api_key=None)
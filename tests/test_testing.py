@@ -0,0 +1,87 @@
+import pytest
+
+from surge.client import SurgeClient
+from surge.errors import SurgeRequestError
+from surge.instrumentation import MetricsCollector
+from surge.testing import FakeSurgeAPI
+
+
+@pytest.fixture
+def api():
+    with FakeSurgeAPI(tasks_per_project=150) as fake_api:
+        yield fake_api
+
+
+@pytest.fixture
+def client(api):
+    client = SurgeClient(api_key="key", base_url=api.base_url)
+    yield client
+    client.close()
+
+
+def test_projects_and_tasks(api, client):
+    project = client.projects.create("Benchmark")
+    assert client.projects.retrieve(project.id).name == "Benchmark"
+    assert len(project.questions) == api.questions_per_project
+
+    first_page = project.list_tasks(page=1, per_page=100)
+    second_page = project.list_tasks(page=2, per_page=100)
+    assert len(first_page) == 100 and len(second_page) == 50
+    task = client.tasks.retrieve(second_page[-1].id)
+    assert task.fields == second_page[-1].fields
+    assert len(task.responses) == 1
+
+    created = project.create_tasks([{"text": "a"}, {"text": "b"}])
+    assert [t.fields["text"] for t in created] == ["a", "b"]
+    assert len(project.list_tasks(page=2, per_page=100)) == 52
+    assert client.tasks.retrieve(created[0].id).fields == {"text": "a"}
+
+
+def test_report_download(client):
+    project = client.projects.create("Report")
+    results = project.download_json()
+    assert len(results) == 150
+    assert results[0]["responses"]
+
+
+def test_teams_and_rubrics(client):
+    team = client.teams.create("Team", ["a"])
+    team = team.add_surgers(["b", "c"]).remove_surgers(["a"])
+    assert team.member_ids() == {"b", "c"}
+    assert client.teams.retrieve(team.id).member_ids() == {"b", "c"}
+
+    result = client.rubrics.evaluate("Some text", "Is it text?")
+    assert set(result) == {"answer", "explanation"}
+
+
+def test_error_injection(client):
+    project = client.projects.create("Errors")
+    api = FakeSurgeAPI(error_rate=1.0, error_status=503).start()
+    try:
+        failing = SurgeClient(api_key="key", base_url=api.base_url)
+        with pytest.raises(SurgeRequestError) as e_info:
+            failing.projects.retrieve(project.id)
+        assert "503" in str(e_info.value)
+        assert api.errors_injected == 1
+    finally:
+        api.stop()
+
+
+def test_latency_and_request_counts():
+    with FakeSurgeAPI(latency=0.05) as api:
+        client = SurgeClient(api_key="key", base_url=api.base_url)
+        metrics = MetricsCollector().install(client.hooks)
+        events = []
+        client.hooks.register(after_response=events.append)
+        project = client.projects.create("Slow")
+        client.projects.retrieve(project.id)
+    assert events[-1].timings["server"] >= 0.05
+    assert events[-1].timings["total"] >= 0.05
+    assert api.requests == {"POST projects": 1, "GET projects/{id}": 1}
+    assert metrics.snapshot()["GET projects/{id}"]["count"] == 1
+
+
+def test_unknown_endpoint(client):
+    with pytest.raises(SurgeRequestError) as e_info:
+        client.tasks.retrieve("not-a-task")
+    assert "404" in str(e_info.value)
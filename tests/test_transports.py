@@ -0,0 +1,105 @@
+import time
+from unittest import mock
+import pytest
+
+import surge
+from surge.client import SurgeClient
+from surge.errors import SurgeRequestError
+from surge.testing import FakeSurgeAPI
+from surge.transports import (
+    Cassette,
+    RecordingTransport,
+    ReplayTransport,
+    Transport,
+)
+
+
+def workflow(client):
+    project = client.projects.create("Recorded")
+    tasks = project.list_tasks(page=1, per_page=20)
+    task = client.tasks.retrieve(tasks[0].id)
+    created = project.create_tasks([{"text": "a"}, {"text": "b"}])
+    return project, tasks, task, created
+
+
+@pytest.fixture
+def cassette_path(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    with FakeSurgeAPI(tasks_per_project=20, latency=0.02) as api:
+        with RecordingTransport(path) as recorder:
+            client = SurgeClient(api_key="key",
+                                 base_url=api.base_url,
+                                 transport=recorder)
+            workflow(client)
+            with pytest.raises(SurgeRequestError):
+                client.tasks.retrieve("missing")
+    return path
+
+
+def test_record_and_replay(cassette_path):
+    cassette = Cassette.load(cassette_path)
+    assert [i.method for i in cassette.interactions
+            ] == ["post", "get", "get", "post", "get"]
+    assert all(i.elapsed >= 0.02 for i in cassette.interactions)
+    assert cassette.interactions[-1].status == 404
+
+    transport = ReplayTransport(cassette_path)
+    client = SurgeClient(api_key="other-key",
+                         base_url="http://replay.invalid/api",
+                         transport=transport)
+    started = time.perf_counter()
+    project, tasks, task, created = workflow(client)
+    assert time.perf_counter() - started < 0.08
+    assert project.name == "Recorded"
+    assert len(tasks) == 20
+    assert task.fields == tasks[0].fields
+    assert [t.fields for t in created] == [{"text": "a"}, {"text": "b"}]
+    assert [route for route, *_ in transport.replayed] == [
+        "POST projects", "GET projects/{id}/tasks", "GET tasks/{id}",
+        "POST projects/{id}/tasks/create_tasks"
+    ]
+
+    with pytest.raises(SurgeRequestError) as e_info:
+        client.tasks.retrieve("missing")
+    assert "404" in str(e_info.value)
+
+
+def test_replay_with_latency(cassette_path):
+    transport = ReplayTransport(cassette_path, latency=True)
+    client = SurgeClient(api_key="key",
+                         base_url="http://replay.invalid/api",
+                         transport=transport)
+    started = time.perf_counter()
+    workflow(client)
+    assert time.perf_counter() - started >= 4 * 0.02
+
+
+def test_replay_matches_across_codecs_and_compression(cassette_path):
+    client = SurgeClient(api_key="key",
+                         base_url="http://replay.invalid/api",
+                         json_codec="json",
+                         gzip_threshold=0,
+                         transport=ReplayTransport(cassette_path))
+    assert workflow(client)[0].name == "Recorded"
+
+
+def test_unrecorded_request(cassette_path):
+    client = SurgeClient(api_key="key",
+                         base_url="http://replay.invalid/api",
+                         transport=ReplayTransport(cassette_path))
+    with pytest.raises(SurgeRequestError) as e_info:
+        client.teams.list()
+    assert "No recorded response" in str(e_info.value)
+
+
+def test_module_level_transport():
+    transport = Transport()
+    with FakeSurgeAPI() as api, \
+         mock.patch.object(surge, "base_url", api.base_url), \
+         mock.patch.object(surge, "api_key", "key"), \
+         mock.patch.object(surge, "transport", transport), \
+         mock.patch.object(transport, "request",
+                           wraps=transport.request) as request:
+        surge.Project.create("Through the transport")
+        url = f"{api.base_url}/projects"
+    assert request.call_args.args[1:] == ("post", url)
@@ -0,0 +1,90 @@
+from unittest.mock import patch
+import pytest
+
+from surge.errors import SurgeTaskDataError, SurgeTaskValidationError
+from surge.projects import Project
+from surge.questions import FreeResponseQuestion
+from surge.tasks import Task
+from surge.validation import TaskValidator
+
+
+def make_project():
+    project = Project(
+        id="ABC1234",
+        name="Hello World",
+        fields_template='<a href="{{website}}">{{ company }}</a>',
+    )
+    project.questions = [
+        FreeResponseQuestion("Describe the company",
+                             "description",
+                             preexisting_annotations="description")
+    ]
+    return project
+
+
+def test_fields_in_template():
+    assert TaskValidator.fields_in_template("{{a}} and {{ b }} and {{a}}") == {
+        "a", "b"
+    }
+    assert TaskValidator.fields_in_template(None) == set()
+
+
+def test_fields_in_template_skips_block_helpers():
+    template = ("{{#if image}}<img src=\"{{image}}\">{{else}}{{text}}{{/if}}"
+                "{{!a comment}}{{^missing}}{{/missing}}{{> footer}}")
+    assert TaskValidator.fields_in_template(template) == {"image", "text"}
+    validator = TaskValidator(TaskValidator.fields_in_template(template))
+    assert validator.validate([{"image": "a.png", "text": "a"}]) == []
+
+
+def test_from_project_collects_template_and_annotation_fields():
+    validator = make_project().task_validator()
+    assert validator.required_fields == {"website", "company", "description"}
+
+
+def test_validate_reports_every_invalid_row():
+    validator = make_project().task_validator()
+    rows = [
+        {
+            "website": "surgehq.ai",
+            "company": "Surge",
+            "description": ""
+        },
+        {
+            "website": "twitch.tv"
+        },
+        "not a dict",
+    ]
+    errors = validator.validate(iter(rows))
+    assert errors == [
+        (1, ["missing field 'company'", "missing field 'description'"]),
+        (2, ["expected a dict, got str"]),
+    ]
+
+
+def test_create_many_validates_before_request():
+    validator = TaskValidator({"website"})
+    with patch.object(Task, "post") as mock_post:
+        with pytest.raises(SurgeTaskValidationError) as e_info:
+            Task.create_many("ABC1234", [{
+                "website": "a"
+            }, {}, {}],
+                             launch=False,
+                             validator=validator)
+        mock_post.assert_not_called()
+
+    assert isinstance(e_info.value, SurgeTaskDataError)
+    assert [index for index, _ in e_info.value.errors] == [1, 2]
+
+
+def test_create_tasks_with_validate():
+    project = make_project()
+    with patch.object(Task, "post") as mock_post:
+        mock_post.return_value = [{"id": "T1", "project_id": project.id}]
+        tasks = project.create_tasks([{
+            "website": "surgehq.ai",
+            "company": "Surge",
+            "description": "Data labeling"
+        }],
+                                     validate=True)
+    assert tasks[0].id == "T1"
@@ -0,0 +1,156 @@
+import asyncio
+import json
+
+from surge.responses import TaskResponse
+from surge.tasks import Task
+from surge.webhooks import WebhookReceiver
+
+TASK_JSON = {
+    "id":
+    "eaa44510-c8f6-4480-b746-28a6c8defd4c",
+    "project_id":
+    "A1B2C3-abcd-1234-wxyz-5823gd2238ac",
+    "status":
+    "completed",
+    "created_at":
+    "2021-01-22T19:49:42.000Z",
+    "fields": {
+        "website": "surgehq.ai"
+    },
+    "responses": [{
+        "id": "6db8b28d-bddc-491f-81ba-dbeb9e9f4399",
+        "data": {
+            "What is this website?": "Labeling"
+        },
+        "completed_at": "2021-01-22T20:57:13.273Z",
+        "worker_id": "J14X3BTCZX3M"
+    }]
+}
+
+
+async def post(receiver, payload, path=None):
+    reader, writer = await asyncio.open_connection(receiver.host,
+                                                   receiver.port)
+    body = payload if isinstance(
+        payload, bytes) else json.dumps(payload).encode("utf-8")
+    writer.write((f"POST {path or receiver.path} HTTP/1.1\r\n"
+                  f"Host: localhost\r\n"
+                  f"Content-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n"
+                  f"Connection: close\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+def test_receive_parses_task_and_responses():
+
+    async def run():
+        async with WebhookReceiver(path="/surge") as receiver:
+            assert await post(receiver, TASK_JSON) == 200
+            event = await asyncio.wait_for(receiver.queue.get(), 1)
+            return event
+
+    event = asyncio.run(run())
+    assert isinstance(event.task, Task)
+    assert event.task.id == TASK_JSON["id"]
+    assert isinstance(event.response, TaskResponse)
+    assert event.response.worker_id == "J14X3BTCZX3M"
+
+
+def test_redeliveries_are_deduplicated():
+
+    async def run():
+        async with WebhookReceiver() as receiver:
+            statuses = await asyncio.gather(
+                *[post(receiver, TASK_JSON) for _ in range(5)])
+            return statuses, receiver.queue.qsize(), receiver.stats
+
+    statuses, qsize, stats = asyncio.run(run())
+    assert statuses == [200] * 5
+    assert qsize == 1
+    assert stats["accepted"] == 1
+    assert stats["duplicates"] == 4
+
+
+def test_new_response_is_not_a_duplicate():
+    second = dict(TASK_JSON)
+    second["responses"] = TASK_JSON["responses"] + [{
+        "id":
+        "7ec9c39e-cee0-4a2f-92bf-ecfaf0f05500",
+        "data": {},
+        "completed_at":
+        "2021-01-22T21:00:00.000Z",
+    }]
+
+    async def run():
+        async with WebhookReceiver() as receiver:
+            await post(receiver, TASK_JSON)
+            await post(receiver, second)
+            return receiver.queue.qsize()
+
+    assert asyncio.run(run()) == 2
+
+
+def test_full_queue_returns_503_and_allows_redelivery():
+    other = dict(TASK_JSON, id="other-task")
+
+    async def run():
+        async with WebhookReceiver(queue_size=1) as receiver:
+            first = await post(receiver, TASK_JSON)
+            rejected = await post(receiver, other)
+            await receiver.queue.get()
+            redelivered = await post(receiver, other)
+            return first, rejected, redelivered
+
+    assert asyncio.run(run()) == (200, 503, 200)
+
+
+def test_handler_receives_events():
+    received = []
+
+    async def handler(event):
+        received.append(event.task.id)
+
+    async def run():
+        async with WebhookReceiver(handler=handler) as receiver:
+            await post(receiver, TASK_JSON)
+
+    asyncio.run(run())
+    assert received == [TASK_JSON["id"]]
+
+
+def test_invalid_payloads_are_rejected():
+
+    async def run():
+        async with WebhookReceiver(path="/surge") as receiver:
+            bad_json = await post(receiver, b"not json")
+            missing_id = await post(receiver, {"status": "completed"})
+            wrong_path = await post(receiver, TASK_JSON, path="/other")
+            return bad_json, missing_id, wrong_path
+
+    assert asyncio.run(run()) == (400, 400, 404)
+
+
+def test_invalid_content_length_is_rejected():
+
+    async def send(receiver, content_length):
+        reader, writer = await asyncio.open_connection(receiver.host,
+                                                       receiver.port)
+        writer.write((f"POST {receiver.path} HTTP/1.1\r\n"
+                      f"Host: localhost\r\n"
+                      f"Content-Length: {content_length}\r\n"
+                      f"Connection: close\r\n\r\n{{}}").encode("latin-1"))
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        writer.close()
+        return int(status_line.split()[1])
+
+    async def run():
+        async with WebhookReceiver(path="/surge") as receiver:
+            return (await send(receiver, "abc"), await send(receiver, "-1"))
+
+    assert asyncio.run(run()) == (400, 400)